@@ -10,31 +10,49 @@ __author__ = 'vsjha18'
 class Style(object):
     """ class for containing all the color information """
 
-    def __init__(self):
+    def __init__(self,
+                 text_color='white',
+                 label_color='white',
+                 spine_color='#5998ff',
+                 axis_bg_color='#293035',
+                 face_color='#293035',
+                 tick_color='white',
+                 grid_color='white',
+                 grid_alpha=0.2,
+                 edge_color='white',
+                 fill_color='deepskyblue',
+                 cdl_up_color='#96E309',
+                 cdl_down_color='red'):
+        """ the global colors are passed on to the styles of every panel
+        which do not set their own """
         # GLOBAL STYLES
-        self.text_color = 'white'
-        self.label_color = 'white'
-        self.spine_color = '#5998ff'
-        self.axis_bg_color = '#293035'
-        self.face_color = '#293035'
-        self.tick_color = 'white'
-        self.grid_color = 'white'
-        self.grid_alpha = 0.2
-        self.edge_color = 'white'
+        self.text_color = text_color
+        self.label_color = label_color
+        self.spine_color = spine_color
+        self.axis_bg_color = axis_bg_color
+        self.face_color = face_color
+        self.tick_color = tick_color
+        self.grid_color = grid_color
+        self.grid_alpha = grid_alpha
+        self.edge_color = edge_color
         self.legend_text_x = 0.015
         self.legend_text_y = 0.95
-        self.fill_color='deepskyblue'
+        self.fill_color = fill_color
 
         # CANDLESTICK STYLES
-        self.cdl_up_color = '#96E309'
-        self.cdl_down_color = 'red'
+        self.cdl_up_color = cdl_up_color
+        self.cdl_down_color = cdl_down_color
 
         # VOLUME OVERLAY STYLES
-        self.volume_fill_color = self.fill_color
-        self.volume_line_width = 2
-        self.volume_line_color = 'red'
-        self.volume_edge_color = self.fill_color
-        self.volume_fill_alpha = 0.5
+        self.volume_up_color = self.cdl_up_color
+        self.volume_down_color = self.cdl_down_color
+        self.volume_alpha = 0.5
+        self.volume_height = 0.125
+        self.volume_width = 0.8
+
+        # THUMBNAIL STYLES
+        self.thumbnail_line_color = self.fill_color
+        self.thumbnail_volume_alpha = 0.35
 
         # SMA STYLES
         self.sma_linewidth = 1.5
@@ -0,0 +1,106 @@
+"""
+    Batch rendering of candlestick charts for many symbols.
+
+    Symbols are fanned out over a pool of worker processes. Each worker
+    switches matplotlib to the Agg backend once when it starts, keeps a
+    single figure which is cleared and reused for every chart it draws,
+    and writes the images straight to disk. A failing symbol is reported
+    in the results instead of aborting the whole batch.
+
+    Since the pool uses the spawn start method, scripts calling
+    render_many must guard their entry point with
+    ``if __name__ == '__main__':``.
+"""
+import os
+import time
+import traceback
+import multiprocessing
+from urllib.parse import quote
+
+# per process figure reused across all the charts a worker renders
+_figure = None
+
+
+def _init_worker():
+    """ select the Agg backend and import the chart code once per worker """
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    import finplots.candlestick  # noqa: F401
+
+
+def _filename(symbol, fmt):
+    """ file name of a symbol's image, with path separators and other
+    characters unsafe in file names percent encoded, e.g. BRK%2FB.png """
+    return '%s.%s' % (quote(str(symbol), safe=' -_.^=+@'), fmt)
+
+
+def _render_one(task):
+    """ render a single symbol to disk
+    :param task: (symbol, df, path, fmt, dpi, plot_kwargs) tuple
+    :return: result dict
+    """
+    global _figure
+    symbol, df, path, fmt, dpi, plot_kwargs = task
+    started = time.perf_counter()
+    try:
+        from finplots.candlestick import candlestick_plot
+        from finplots.render import new_figure
+
+        if _figure is None:
+            _figure = new_figure()
+        fig = candlestick_plot(df, fig=_figure, show=False, **plot_kwargs)
+        fig.savefig(path, format=fmt, dpi=dpi, facecolor=fig.get_facecolor())
+        error = None
+    except Exception:
+        path = None
+        error = traceback.format_exc()
+    return dict(symbol=symbol,
+                path=path,
+                seconds=time.perf_counter() - started,
+                error=error)
+
+
+def render_many(frames, out_dir, workers=None, fmt='png', dpi=100, chunksize=4, **plot_kwargs):
+    """ render one candlestick chart per symbol into out_dir
+
+    :param frames: dict of symbol -> dataframe, or iterable of (symbol, dataframe)
+    :param out_dir: directory receiving <symbol>.<fmt> files, characters
+        of the symbol which are unsafe in file names percent encoded
+    :param workers: number of worker processes, defaults to the cpu count.
+        Use 1 to render in the calling process.
+    :param fmt: image format understood by savefig
+    :param dpi: resolution of the images
+    :param chunksize: number of symbols handed to a worker at once
+    :param plot_kwargs: passed on to candlestick_plot
+    :return: list of dicts with symbol, path, seconds and error keys,
+        error being None or the formatted traceback of the failure
+    """
+    if hasattr(frames, 'items'):
+        frames = frames.items()
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    tasks = [(symbol, df, os.path.join(out_dir, _filename(symbol, fmt)), fmt, dpi, plot_kwargs)
+             for symbol, df in frames]
+
+    if workers == 1:
+        # the charts are drawn on figures from new_figure, so the backend
+        # of the calling process is left alone
+        return [_render_one(task) for task in tasks]
+
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers, initializer=_init_worker) as pool:
+        return list(pool.imap_unordered(_render_one, tasks, chunksize=chunksize))
+
+
+def summarize(results):
+    """ aggregate timings and failures of a render_many run
+    :param results: list returned by render_many
+    :return: dict
+    """
+    seconds = [r['seconds'] for r in results]
+    failed = [r['symbol'] for r in results if r['error'] is not None]
+    return dict(rendered=len(results) - len(failed),
+                failed=failed,
+                total_seconds=sum(seconds),
+                max_seconds=max(seconds) if seconds else 0.0)
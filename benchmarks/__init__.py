@@ -0,0 +1,11 @@
+"""
+    Benchmarks for finplots. Run them as modules, e.g.
+
+        python -m finplots.benchmarks.memory
+
+    finplots.benchmarks.suite times indicators, panels and whole charts
+    at 1k to 1M bars and compares runs saved as JSON.
+
+    finplots.benchmarks.imports measures the cold start of a fresh
+    interpreter: importing the chart code and rendering a first chart.
+"""
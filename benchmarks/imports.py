@@ -0,0 +1,139 @@
+"""
+    Cold start benchmark. Every case runs in a fresh interpreter, as a
+    command line render or a serverless worker would, and reports the
+    time spent importing the chart code, or importing it and rendering
+    a first chart, together with the heavy modules which got imported
+    on the way. The interpreter start up itself is not counted.
+
+        python -m finplots.benchmarks.imports --output imports.json
+        python -m finplots.benchmarks.imports --compare imports.json
+
+    With --compare the script exits with status 1 when a case got
+    slower than the threshold allows or imports a heavy module which
+    the earlier run did not.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from finplots.benchmarks.suite import MIN_DELTA
+from finplots.benchmarks.suite import THRESHOLD
+
+# modules whose import is worth knowing about
+HEAVY = ('pandas',
+         'matplotlib.pyplot',
+         'matplotlib.figure',
+         'matplotlib.backends.backend_agg',
+         'tkinter',
+         'PyQt5',
+         'PySide6')
+
+# a first chart from plain arrays, which needs neither pandas nor pyplot
+_RENDER = '''
+import numpy as np
+from finplots.candlestick import render_candlestick
+close = 100 + np.cumsum(np.random.RandomState(0).normal(0, 0.5, 1000))
+render_candlestick(dict(date=np.datetime64('2000-01-03') + np.arange(1000).astype('timedelta64[m]'),
+                        open=close, high=close + 0.5, low=close - 0.5, close=close))
+'''
+
+CASES = (
+    ('import finplots', 'import finplots'),
+    ('import candlestick', 'import finplots.candlestick'),
+    ('import chart', 'import finplots.chart'),
+    ('render 1k bars', _RENDER),
+)
+
+_TEMPLATE = '''
+import json, sys, time
+started = time.perf_counter()
+%s
+seconds = time.perf_counter() - started
+print(json.dumps(dict(seconds=seconds, modules=[m for m in %r if m in sys.modules])))
+'''
+
+
+def run_case(code):
+    """ run code in a fresh interpreter which can import finplots like
+    this one
+    :return: (seconds, heavy modules imported)
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    out = subprocess.check_output([sys.executable, '-c', _TEMPLATE % (code, HEAVY)], env=env)
+    result = json.loads(out.decode().strip().splitlines()[-1])
+    return result['seconds'], result['modules']
+
+
+def run_imports(repeat=5, verbose=True):
+    """ time every case, best of `repeat` fresh interpreters
+    :return: dict with meta, results (case -> seconds) and modules
+        (case -> heavy modules) entries, as saved to JSON
+    """
+    results = {}
+    modules = {}
+    for name, code in CASES:
+        runs = [run_case(code) for _ in range(repeat)]
+        results[name] = min(seconds for seconds, _ in runs)
+        modules[name] = runs[0][1]
+        if verbose:
+            print('%-20s %10.4f  %s' % (name, results[name], ' '.join(modules[name])))
+    return dict(meta=dict(python=platform.python_version(),
+                          machine=platform.machine(),
+                          repeat=repeat),
+                results=results,
+                modules=modules)
+
+
+def compare(baseline, current, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """ print the change of every case present in both runs
+    :return: list of (case, reason) regressions
+    """
+    regressions = []
+    print('%-20s %10s %10s %8s' % ('case', 'before', 'after', 'change'))
+    for name, seconds in sorted(current['results'].items()):
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = seconds / before - 1.0 if before else 0.0
+        slower = change > threshold and seconds - before > min_delta
+        added = sorted(set(current['modules'][name]) - set(baseline['modules'].get(name, [])))
+        if slower:
+            regressions.append((name, 'slower'))
+        if added:
+            regressions.append((name, 'imports %s' % ', '.join(added)))
+        print('%-20s %10.4f %10.4f %+7.0f%% %s%s' % (name, before, seconds, 100 * change,
+                                                    'REGRESSION' if slower else '',
+                                                    ' new imports: %s' % ' '.join(added) if added else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='finplots cold start benchmark')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='save the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slow down counted as a regression')
+    args = parser.parse_args(argv)
+
+    current = run_imports(repeat=args.repeat)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(current, fp, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        print('')
+        regressions = compare(baseline, current, threshold=args.threshold)
+        if regressions:
+            print('\n%d regression(s)' % len(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
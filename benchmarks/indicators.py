@@ -0,0 +1,80 @@
+"""
+    Throughput benchmark of finplots.indicators. Every indicator is
+    timed on 1M bars and reported in bars per second, followed by all
+    the indicators of a chart computed one by one and by compute_all,
+    which take about the same time. Their accuracy against pandas is checked by
+    tests/test_indicators.py.
+
+        python -m finplots.benchmarks.indicators [rows]
+"""
+import sys
+import time
+
+import numpy as np
+
+from finplots import indicators
+
+# indicator setup of the default candlestick chart
+CHART = dict(smas=(100, 50, 5, 10),
+             rsi_setup=dict(period=14),
+             macd_setup=dict(slow=26, fast=12, ema=8),
+             bbands_setup=dict(period=20, multiplier=2),
+             sstoch_setup=dict(period=14, smoothing=3))
+
+
+def make_prices(rows, seed=0):
+    rng = np.random.RandomState(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    high = close + rng.uniform(0, 1, rows)
+    low = close - rng.uniform(0, 1, rows)
+    return low, high, close
+
+
+def _separately(low, high, close):
+    """ the compute_all columns computed with the single indicator functions """
+    columns = dict(('sma_%s' % period, indicators.simple_moving_average(close, period))
+                   for period in CHART['smas'])
+    columns['bb_lower'], columns['bb_middle'], columns['bb_upper'] = indicators.bollinger_bands(
+        close, **CHART['bbands_setup'])
+    columns['rsi'] = indicators.relative_strength_index(close, CHART['rsi_setup']['period'])
+    macd_setup = CHART['macd_setup']
+    _, _, columns['macd'] = indicators.moving_average_convergence_divergence(
+        close, macd_setup['slow'], macd_setup['fast'])
+    columns['macd_signal'] = indicators.exponential_moving_average(columns['macd'], macd_setup['ema'])
+    columns['sstoch_k'], columns['sstoch_d'] = indicators.slow_stochastic(
+        low, high, close, **CHART['sstoch_setup'])
+    return columns
+
+
+def throughput(rows=1000000, repeat=3):
+    """ print the bars per second of every indicator """
+    low, high, close = make_prices(rows)
+    cases = [
+        ('sma', lambda: indicators.simple_moving_average(close, 50)),
+        ('ema', lambda: indicators.exponential_moving_average(close, 9)),
+        ('bbands', lambda: indicators.bollinger_bands(close, 20, 2)),
+        ('rsi', lambda: indicators.relative_strength_index(close, 14)),
+        ('macd', lambda: indicators.moving_average_convergence_divergence(close, 26, 12)),
+        ('slow stochastic', lambda: indicators.slow_stochastic(low, high, close, 14, 3)),
+        ('chart, separate', lambda: _separately(low, high, close)),
+        ('chart, all', lambda: indicators.compute_all(low, high, close, **CHART)),
+    ]
+    print('%-16s %12s %16s' % ('indicator', 'seconds', 'bars/second'))
+    for name, func in cases:
+        best = min(_timed(func) for _ in range(repeat))
+        print('%-16s %12.4f %16.0f' % (name, best, rows / best))
+
+
+def _timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main(rows=1000000):
+    throughput(rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000))
@@ -0,0 +1,80 @@
+"""
+    Memory benchmark of the chart input path.
+
+    Measures the peak memory allocated while the price data is brought
+    into chart shape (date conversion, ordering, volume column) and
+    aggregated to the pixel width, relative to the size of the input.
+    The input path only creates views on the price columns, so the
+    peak stays below one extra copy of the input (a ratio below 1.0).
+
+        python -m finplots.benchmarks.memory [rows]
+
+    The input is given newest row first, as the charts usually receive
+    it, so the benchmark includes reordering the data.
+"""
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from finplots.candlestick import _prepare_frame
+from finplots.lod import resample_ohlcv
+
+
+def make_inputs(rows):
+    """ the same synthetic price data as DataFrame, structured array and dict """
+    rng = np.random.RandomState(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    open = close + rng.normal(0, 0.5, rows)
+    high = np.maximum(open, close) + rng.uniform(0, 1, rows)
+    low = np.minimum(open, close) - rng.uniform(0, 1, rows)
+    volume = rng.uniform(0, 1e6, rows)
+    date = pd.date_range('2000-01-03', periods=rows, freq='min').values[::-1].copy()
+    columns = dict(date=date,
+                   open=open[::-1].copy(),
+                   high=high[::-1].copy(),
+                   low=low[::-1].copy(),
+                   close=close[::-1].copy(),
+                   volume=volume[::-1].copy())
+
+    record = np.empty(rows, dtype=[('date', 'M8[ns]')] + [(name, 'f8') for name in
+                                                         ['open', 'high', 'low', 'close', 'volume']])
+    for name, values in columns.items():
+        record[name] = values
+
+    return dict(dataframe=pd.DataFrame(columns),
+                structured=record,
+                dict=columns)
+
+
+def input_nbytes(data):
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(index=False).sum())
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    return sum(v.nbytes for v in data.values())
+
+
+def measure(data, max_bars=1500):
+    """ peak bytes allocated while preparing and aggregating data """
+    tracemalloc.start()
+    try:
+        frame, _ = _prepare_frame(data)
+        resample_ohlcv(frame, max_bars)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def main(rows=1000000):
+    print('%-12s %12s %12s %8s' % ('input', 'input MB', 'peak MB', 'ratio'))
+    for name, data in make_inputs(rows).items():
+        size = input_nbytes(data)
+        peak = measure(data)
+        print('%-12s %12.1f %12.1f %8.2f' % (name, size / 1e6, peak / 1e6, float(peak) / size))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,255 @@
+"""
+    Benchmark suite of the chart code at 1k, 10k, 100k and 1M bars.
+
+    For every size the suite times
+    - every indicator wrapper (the _*_data functions behind the plot
+      functions, decimation included) and compute_all
+    - every panel renderer (the plot_* functions drawn on their own
+      headless axes, canvas draw included)
+    - candlestick_plot end to end, rendered to PNG on the Agg canvas
+    and records the peak RSS of the process after the size is done.
+    The sizes run smallest first, so the peak RSS of a size is the one
+    reached while running it.
+
+    The indicator cache is disabled so that repeats measure the maths.
+    Every case reports the best of `repeat` runs.
+
+        python -m finplots.benchmarks.suite --output run.json
+        python -m finplots.benchmarks.suite --compare run.json
+
+    With --compare the results are checked against an earlier run and
+    the script exits with status 1 when a case got slower, or the peak
+    RSS of a size grew, by more than the threshold allows.
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from finplots.cache import indicator_cache
+from finplots.candlestick import _prepare_frame
+from finplots.candlestick import plot_candlestick
+from finplots.candlestick import _candle_width
+from finplots.candlestick import render_candlestick
+from finplots.indicators import compute_all
+from finplots.lod import resample_ohlcv
+from finplots.overlays import plot_sma, _sma_data
+from finplots.overlays import plot_volume, _volume_data
+from finplots.overlays import plot_bollinger_bands, _bollinger_data
+from finplots.rsi import plot_rsi, _rsi_data
+from finplots.macd import plot_macd, _macd_data
+from finplots.stochastics import plot_slow_stochastic, _sstoch_data
+
+SIZES = (1000, 10000, 100000, 1000000)
+
+# pixel columns of the price axis of a default 18 inch wide chart
+MAX_POINTS = 1620
+
+# a case is a regression when it is this much slower than the baseline,
+# a size when its peak rss is this much larger
+THRESHOLD = 0.25
+
+# differences below this many seconds are noise
+MIN_DELTA = 0.002
+
+# peak rss differences below this many bytes are noise
+MIN_RSS_DELTA = 16 * 1024 * 1024
+
+
+def synthetic_ohlcv(rows, seed=0):
+    """ random walk minute bars with consistent open, high, low, close
+    :param rows: number of bars
+    :param seed: random seed, the same seed gives the same data
+    :return: DataFrame with date, open, high, low, close and volume
+    """
+    rng = np.random.RandomState(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, rows))
+    open = np.concatenate([close[:1], close[:-1]]) + rng.normal(0, 0.1, rows)
+    high = np.maximum(open, close) + rng.uniform(0, 0.5, rows)
+    low = np.minimum(open, close) - rng.uniform(0, 0.5, rows)
+    return pd.DataFrame(dict(date=pd.date_range('2000-01-03', periods=rows, freq='min'),
+                             open=open,
+                             high=high,
+                             low=low,
+                             close=close,
+                             volume=rng.uniform(1e3, 1e6, rows)))
+
+
+def _panel(plot):
+    """ a case drawing one panel on its own headless axes """
+    def setup():
+        fig = Figure(figsize=(18, 3))
+        FigureCanvasAgg(fig)
+        return fig, fig.add_subplot(1, 1, 1)
+
+    def run(state):
+        fig, ax = state
+        plot(ax)
+        fig.canvas.draw()
+    return setup, run
+
+
+def cases(df):
+    """ (name, setup, run) of every case for one input frame. setup is
+    not timed, its result is passed to run. """
+    frame, _ = _prepare_frame(df)
+    bars = resample_ohlcv(frame, MAX_POINTS)
+    width = _candle_width(bars.date)
+    m = MAX_POINTS
+
+    indicators = [
+        ('indicator sma', lambda: _sma_data(frame, 50, m)),
+        ('indicator bbands', lambda: _bollinger_data(frame, 20, 2, m)),
+        ('indicator volume', lambda: _volume_data(frame, m)),
+        ('indicator rsi', lambda: _rsi_data(frame, 14, m)),
+        ('indicator macd', lambda: _macd_data(frame, 26, 12, 8, m)),
+        ('indicator sstoch', lambda: _sstoch_data(frame, 14, 3, m)),
+        ('indicator compute_all', lambda: compute_all(frame.low, frame.high, frame.close)),
+    ]
+    panels = [
+        ('panel candles', lambda ax: plot_candlestick(ax, bars, width=width)),
+        ('panel sma', lambda ax: plot_sma(ax, frame, 50, max_points=m)),
+        ('panel bbands', lambda ax: plot_bollinger_bands(ax, frame, max_points=m)),
+        ('panel volume', lambda ax: plot_volume(ax, frame, max_points=m)),
+        ('panel rsi', lambda ax: plot_rsi(ax, frame, max_points=m)),
+        ('panel macd', lambda ax: plot_macd(ax, frame, ema=8, max_points=m)),
+        ('panel sstoch', lambda ax: plot_slow_stochastic(ax, frame, max_points=m)),
+    ]
+    result = [(name, None, lambda _, func=func: func()) for name, func in indicators]
+    result += [(name,) + _panel(plot) for name, plot in panels]
+    result.append(('candlestick_plot', None, lambda _: render_candlestick(df)))
+    return result
+
+
+def _best(setup, run, repeat):
+    best = None
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        started = time.perf_counter()
+        run(state)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def peak_rss():
+    """ peak resident set size of the process in bytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_suite(sizes=SIZES, repeat=3, verbose=True):
+    """ time every case at every size
+    :return: dict with meta, results (case -> size -> seconds) and
+        peak_rss (size -> bytes) entries, as saved to JSON
+    """
+    enabled = indicator_cache.enabled
+    indicator_cache.enabled = False
+    results = {}
+    rss = {}
+    try:
+        for rows in sizes:
+            df = synthetic_ohlcv(rows)
+            for name, setup, run in cases(df):
+                seconds = _best(setup, run, repeat)
+                results.setdefault(name, {})[str(rows)] = seconds
+                if verbose:
+                    print('%-24s %9d %12.4f' % (name, rows, seconds))
+            rss[str(rows)] = peak_rss()
+            if verbose:
+                print('%-24s %9d %12.1f MB' % ('peak rss', rows, rss[str(rows)] / 1e6))
+    finally:
+        indicator_cache.enabled = enabled
+
+    return dict(meta=dict(python=platform.python_version(),
+                          numpy=np.__version__,
+                          pandas=pd.__version__,
+                          matplotlib=matplotlib.__version__,
+                          machine=platform.machine(),
+                          repeat=repeat),
+                results=results,
+                peak_rss=rss)
+
+
+def compare(baseline, current, threshold=THRESHOLD, min_delta=MIN_DELTA,
+            min_rss_delta=MIN_RSS_DELTA):
+    """ print the change of every case and peak rss present in both runs
+    :param baseline: results of an earlier run_suite
+    :param current: results of this run
+    :param threshold: relative slow down or memory growth counted as a
+        regression
+    :param min_delta: absolute slow down in seconds below which a
+        change is treated as noise
+    :param min_rss_delta: absolute peak rss growth in bytes below which
+        a change is treated as noise
+    :return: list of (case, size, baseline, current) regressions, in
+        seconds, or in bytes for the 'peak rss' case
+    """
+    regressions = []
+    print('%-24s %9s %10s %10s %8s' % ('case', 'rows', 'before', 'after', 'change'))
+    for name, sizes in sorted(current['results'].items()):
+        for rows, seconds in sorted(sizes.items(), key=lambda item: int(item[0])):
+            before = baseline['results'].get(name, {}).get(rows)
+            if before is None:
+                continue
+            change = seconds / before - 1.0 if before else 0.0
+            regressed = change > threshold and seconds - before > min_delta
+            if regressed:
+                regressions.append((name, int(rows), before, seconds))
+            print('%-24s %9s %10.4f %10.4f %+7.0f%% %s' % (name, rows, before, seconds,
+                                                          100 * change,
+                                                          'REGRESSION' if regressed else ''))
+
+    print('\n%-24s %9s %10s %10s %8s' % ('peak rss', 'rows', 'before MB', 'after MB', 'change'))
+    for rows, nbytes in sorted(current.get('peak_rss', {}).items(), key=lambda item: int(item[0])):
+        before = baseline.get('peak_rss', {}).get(rows)
+        if before is None:
+            continue
+        change = nbytes / float(before) - 1.0 if before else 0.0
+        regressed = change > threshold and nbytes - before > min_rss_delta
+        if regressed:
+            regressions.append(('peak rss', int(rows), before, nbytes))
+        print('%-24s %9s %10.1f %10.1f %+7.0f%% %s' % ('peak rss', rows, before / 1e6, nbytes / 1e6,
+                                                      100 * change,
+                                                      'REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='finplots benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='save the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slow down counted as a regression')
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.sizes, repeat=args.repeat)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(current, fp, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        print('')
+        regressions = compare(baseline, current, threshold=args.threshold)
+        if regressions:
+            print('\n%d regression(s)' % len(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
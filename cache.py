@@ -0,0 +1,121 @@
+"""
+    Cache for computed indicator series. The plot wrappers look up
+    their indicators here before calling into the indicator functions,
+    so re-rendering the same data (another timeframe of the same
+    symbol, a different style, ...) does not repeat the maths.
+
+    Entries are keyed on a content hash of the input series together
+    with the indicator parameters, and the least recently used entries
+    are evicted once the cached results exceed the byte budget.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def fingerprint(value):
+    """ content hash of an indicator argument
+    :param value: array like series or a scalar parameter
+    :return: hex digest
+    """
+    if value is None or np.isscalar(value):
+        return repr(value)
+    array = np.ascontiguousarray(np.asarray(value))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(array.dtype).encode())
+    digest.update(str(array.shape).encode())
+    if array.dtype == object:
+        digest.update(repr(array.tolist()).encode())
+    else:
+        digest.update(array.reshape(-1).view(np.uint8))
+    return digest.hexdigest()
+
+
+def _nbytes(value):
+    """ approximate memory held by a cached result """
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=False)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return 64
+
+
+class IndicatorCache(object):
+    """ LRU cache of indicator results bounded by a byte budget """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, func, *args, **params):
+        """ return func(*args, **params), computing it only on a miss
+        :param func: indicator function
+        :param args: input series and positional parameters
+        :param params: keyword parameters of the indicator
+        :return: indicator result
+        """
+        if not self.enabled:
+            return func(*args, **params)
+
+        key = (func.__module__, func.__name__,
+               tuple(fingerprint(a) for a in args),
+               tuple(sorted((k, fingerprint(v)) for k, v in params.items())))
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        result = func(*args, **params)
+        self.put(key, result)
+        return result
+
+    def put(self, key, result):
+        """ store a result and evict old entries beyond the byte budget """
+        size = _nbytes(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self):
+        """ drop all entries and reset the counters """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ hit/miss counters and memory usage of the cache
+        :return: dict
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return dict(hits=self.hits,
+                        misses=self.misses,
+                        hit_rate=float(self.hits) / total if total else 0.0,
+                        entries=len(self._entries),
+                        nbytes=self.nbytes,
+                        max_bytes=self.max_bytes)
+
+
+indicator_cache = IndicatorCache()
@@ -4,31 +4,64 @@ Created on 05-Apr-2015
 @author: vivejha
 """
 #from . import log
-import pandas as pd
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 import matplotlib
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import matplotlib.ticker as mticker
-from matplotlib.finance import candlestick_ohlc
+import matplotlib.colors as mcolors
+from matplotlib.collections import LineCollection
+from matplotlib.collections import PolyCollection
 
-from finplots.overlays import plot_sma
-from finplots.overlays import plot_volume
-from finplots.overlays import plot_bollinger_bands
+from finplots.overlays import _plot_sma, _sma_data, _sma_kwargs
+from finplots.overlays import _plot_volume, _volume_data, _volume_kwargs
+from finplots.overlays import _plot_bollinger_bands, _bollinger_data, _bollinger_kwargs
 
-from finplots.macd import plot_macd
-from finplots.rsi import plot_rsi
-from finplots.stochastics import plot_slow_stochastic
+from finplots.macd import _plot_macd, _macd_data, _macd_kwargs
+from finplots.rsi import _plot_rsi, _rsi_data, _rsi_kwargs
+from finplots.stochastics import _plot_slow_stochastic, _sstoch_data, _sstoch_kwargs
 
 from finplots import style
-
-# global settings
+from finplots.cache import indicator_cache
+from finplots.indicators import compute_all
+from finplots.lod import auto_max_bars
+from finplots.lod import resample_ohlcv
+from finplots.profiling import NULL_PROFILER
+from finplots.profiling import Profiler
+from finplots.render import new_figure
+from finplots.render import render_figure
+from finplots.themes import compile_style
+from finplots.themes import style_panel
+from finplots.dates import BarDateFormatter
+from finplots.dates import to_mpl_dates
+from finplots.ohlcv import OHLCV
+from finplots.ohlcv import as_ohlcv
+
+# matplotlib settings in effect while a chart is built, applied through
+# chart_rc instead of changing the global rcParams
 # plt.style.use('dark_background')
 # plt.style.use('ggplot')
-# changes the fontsize
-matplotlib.rcParams.update({'font.size':10})
+RC_PARAMS = {'font.size': 10}
+
+# position of the axes grid inside the figure
+LAYOUT = dict(left=0.07, bottom=0.10, right=0.97, top=0.95, wspace=0.20, hspace=0.0)
+
 
+def chart_rc(func):
+    """ decorator running func with RC_PARAMS in effect. Text and ticks
+    take their font sizes when they are created, so charts built under
+    it keep them without the global rcParams being touched. """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with matplotlib.rc_context(RC_PARAMS):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@chart_rc
 def candlestick_plot(df,
                      smas=[100, 50, 5 , 10],
                      style=style,
@@ -36,105 +69,119 @@ def candlestick_plot(df,
                      rsi_setup = dict(period=14),
                      macd_setup = dict(slow=26, fast=12, ema=8),
                      bbands_setup = dict(period=20, multiplier=2),
-                     sstoch_setup = dict(period=14, smoothing=3)
+                     sstoch_setup = dict(period=14, smoothing=3),
+                     max_bars='auto',
+                     fig=None,
+                     show=True,
+                     bar_positions=False,
+                     workers=None,
+                     profile=False
                      ):
-    """ plot candlestick chart """
-
-    fig = plt.figure(figsize=figsize, facecolor=style.face_color)  # 18, 10 for full screen
-
-    # create main axis for charting prices
-    ax1 = plt.subplot2grid((10,4), (0,0),
-                           rowspan=6,
-                           colspan=4,
-                           axisbg=style.axis_bg_color)
-
-    if 'volume' not in df:
-        df['volume'] = np.zeros(len(df))
-#   times = pd.date_range('2014-01-01', periods=l, freq='1d')
-    df.date = pd.to_datetime(df.date)
-    df.date = [mdates.date2num(d) for d in df.date]
-
-    df = df[::-1]
-
-    payload = df[['date', 'open', 'high', 'low', 'close', 'volume']].values
-    candlestick_ohlc(ax1, payload, width=0.5, colorup=style.cdl_up_color, colordown=style.cdl_down_color)
-
-    annotate_max(ax1, df)
-
-    ax1.grid(True, alpha=style.grid_alpha, color=style.grid_color)
-    plt.ylabel('Stock Price', color=style.label_color)
-
-    # determines number of points to be displayed on x axis
-    ax1.xaxis.set_major_locator(mticker.MaxNLocator(50))
-    ax1.yaxis.set_major_locator(mticker.MaxNLocator(15))
-
-    # determines format of markers on the xaxis
-    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%d-%m-%y'))
-
-    # label color
-    ax1.yaxis.label.set_color(style.label_color)
-
-    # tick params color
-    ax1.tick_params(axis='y', colors=style.tick_color)
-
-    # spine colors
-    ax1.spines['bottom'].set_color(style.spine_color)
-    ax1.spines['top'].set_color(style.spine_color)
-    ax1.spines['left'].set_color(style.spine_color)
-    ax1.spines['right'].set_color(style.spine_color)
-
-    # make the x tick label invisible
-    plt.setp(ax1.get_xticklabels(), visible=False)
+    """ plot candlestick chart
+
+    :param style: Style, CompiledStyle or the name of a registered
+        theme, see finplots.themes
+    :param max_bars: maximum number of candles to draw. Larger frames are
+        aggregated into OHLCV bars and the indicators, which are still
+        computed on the full frame, are decimated to the same resolution.
+        'auto' uses one bar per pixel column of the main axis, None
+        draws every row.
+    :param fig: existing figure to clear and draw into instead of creating
+        a new one, useful when rendering many charts in a row. The
+        figure may come from pyplot or from finplots.render.new_figure.
+        New figures are created through pyplot.
+    :param show: call plt.show() once the chart is ready
+    :param bar_positions: place bars at consecutive integer positions
+        instead of their dates, so that weekends, holidays and nights
+        do not leave gaps in the chart
+    :param workers: number of threads preparing the panels concurrently,
+        see prepare_panels. None does all the work on the calling thread.
+    :param profile: True or a finplots.profiling.Profiler to time every
+        stage of the chart, including a final canvas draw. The figure is
+        then returned together with the ProfileReport.
+    :return: figure, or (figure, ProfileReport) when profiling
+    """
+
+    profiler = NULL_PROFILER
+    if profile:
+        profiler = profile if isinstance(profile, Profiler) else Profiler()
+    style = compile_style(style)
+
+    with profiler.stage('layout'):
+        if fig is None:
+            import matplotlib.pyplot as plt
+            fig = plt.figure(figsize=figsize, facecolor=style.face_color)  # 18, 10 for full screen
+        else:
+            fig.clf()
+            fig.set_size_inches(figsize)
+            fig.set_facecolor(style.face_color)
+
+        ax1, ax_sstoch, ax_macd, ax_rsi = create_layout(fig, style=style)
+
+    with profiler.stage('prepare'):
+        df, dates = _prepare_frame(df, bar_positions=bar_positions)
+    if bar_positions:
+        ax1.xaxis.set_major_formatter(BarDateFormatter(dates))
+
+    # LEVEL OF DETAIL
+    if max_bars == 'auto':
+        max_bars = auto_max_bars(fig, left=LAYOUT['left'], right=LAYOUT['right'])
+
+    # NUMERICAL WORK OF EVERY PANEL, CONCURRENTLY WHEN workers IS SET
+    data = prepare_panels(df, smas, rsi_setup, macd_setup, bbands_setup, sstoch_setup,
+                          max_bars=max_bars,
+                          style=style,
+                          workers=workers,
+                          profiler=profiler)
+
+    # only the artists are created from here on
+    with profiler.stage('candles artists'):
+        bars, candles = data['candles']
+        _add_candlestick_collections(ax1, *candles)
+
+        annotate_max(ax1, bars)
 
     # OVERLAY SIMPLE MOVING AVERAGES
     for idx, period in enumerate(smas):
-        ax1 = plot_sma(ax1, df,
-                       period=period,
-                       color=style.sma_colors[idx])
+        with profiler.stage('sma_%s artists' % period):
+            _plot_sma(ax1, *data['sma_%s' % period],
+                      color=style.sma_colors[idx],
+                      legend_text='%s SMA' % str(period),
+                      **_sma_kwargs(style))
 
     # OVERLAY BOLLINGER BAND
-    ax1 = plot_bollinger_bands(ax1, df, period=bbands_setup['period'], multiplier=bbands_setup['multiplier'])
+    with profiler.stage('bbands artists'):
+        _plot_bollinger_bands(ax1, *data['bbands'],
+                              legend_text='Bollinger Bands (%s, %s)' % (str(bbands_setup['period']),
+                                                                        str(bbands_setup['multiplier'])),
+                              **_bollinger_kwargs(style))
 
     # OVERLAY VOLUME
-    # it is important to plot volume after the simple moving
-    # average to avoid a warning message 'no labelled objects found'
-    if 'volume' in df:
-        ax1 = plot_volume(ax1, df)
-
-    # show tick params on right axis as well
-    ax1.tick_params(labelright=True)
+    # bars along the bottom of the price axis, below the candles
+    if 'volume' in data:
+        with profiler.stage('volume artists'):
+            _plot_volume(ax1, *data['volume'], **_volume_kwargs(style))
 
     # RELATIVE STRENGTH INDEX
-    ax_rsi = plt.subplot2grid((10,4), (9,0),
-                           rowspan=1,
-                           colspan=4,
-                           sharex=ax1,
-                           axisbg=style.axis_bg_color)
-    plot_rsi(ax_rsi, df, period=rsi_setup['period'])
+    with profiler.stage('rsi artists'):
+        _plot_rsi(ax_rsi, *data['rsi'],
+                  legend_text='RSI %s' % str(rsi_setup['period']),
+                  **_rsi_kwargs(style))
 
     # MOVING AVERAGE CONVERGENCE DIVERGENCE
-    ax_macd = plt.subplot2grid((10,4), (8,0),
-                           rowspan=1,
-                           colspan=4,
-                           sharex=ax1,
-                           axisbg=style.axis_bg_color)
-
-    ax_macd = plot_macd(ax_macd, df,
-                        slow=macd_setup['slow'],
-                        fast=macd_setup['fast'],
-                        ema=macd_setup['ema'])
+    with profiler.stage('macd artists'):
+        _plot_macd(ax_macd, *data['macd'],
+                   legend_text='MACD %s, %s, %s' % (str(macd_setup['slow']),
+                                                    str(macd_setup['fast']),
+                                                    str(macd_setup['ema'])),
+                   **_macd_kwargs(style))
 
     # SLOW STOCHASTIC
-    # create axis for charting prices
-    ax_sstoch = plt.subplot2grid((10,4), (6,0),
-                           rowspan=2,
-                           colspan=4,
-                           sharex=ax1,
-                           axisbg=style.axis_bg_color)
-
-    ax_sstoch = plot_slow_stochastic(ax_sstoch, df,
-                                     period=sstoch_setup['period'],
-                                     smoothing=sstoch_setup['smoothing'])
+    with profiler.stage('sstoch artists'):
+        _plot_slow_stochastic(ax_sstoch, *data['sstoch'],
+                              legend_text='SLOW STOCH %s, %s' % (str(sstoch_setup['period']),
+                                                                 str(sstoch_setup['smoothing'])),
+                              **_sstoch_kwargs(style))
 
     #
     # ema_fast, ema_slow, macd = moving_average_convergence_divergence(df.close)
@@ -196,26 +243,423 @@ def candlestick_plot(df,
 
 
 
+    if profiler.enabled:
+        # the canvas draw is where matplotlib spends most of its time
+        with profiler.stage('draw'):
+            fig.canvas.draw()
+
+    if show:
+        import matplotlib.pyplot as plt
+        plt.show()
+
+    if profiler.enabled:
+        return fig, profiler.report()
+    return fig
+
+
+def create_layout(fig, style=style):
+    """ create the price, slow stochastic, macd and rsi axes of a
+    candlestick chart and apply the styling which does not depend
+    on the plotted data.
+
+    :param fig: figure in which the axes are created
+    :param style: style object or theme name
+    :return: (ax_price, ax_sstoch, ax_macd, ax_rsi)
+    """
+    style = compile_style(style)
+
+    # rows of the panels on a 10 x 4 grid
+    grid = fig.add_gridspec(10, 4)
+
+    # create main axis for charting prices
+    ax1 = fig.add_subplot(grid[0:6, 0:4],
+                          facecolor=style.axis_bg_color)
+
+    # determines number of points to be displayed on x axis
+    ax1.xaxis.set_major_locator(mticker.MaxNLocator(50))
+    ax1.yaxis.set_major_locator(mticker.MaxNLocator(15))
+
+    # determines format of markers on the xaxis
+    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%d-%m-%y'))
+
+    # label, spine, tick and grid colors, tick labels on the right as well
+    style_panel(ax1, 'Stock Price',
+                label_color=style.label_color,
+                spine_color=style.spine_color,
+                tick_color=style.tick_color,
+                tick_axis='y',
+                grid_color=style.grid_color,
+                grid_alpha=style.grid_alpha)
+
+    # make the x tick label invisible
+    ax1.tick_params(labelbottom=False)
+
+    # RELATIVE STRENGTH INDEX
+    ax_rsi = fig.add_subplot(grid[9:10, 0:4],
+                             sharex=ax1,
+                             facecolor=style.axis_bg_color)
+
     # make the labels a bit rotated for better visibility
-    for label in ax_rsi.xaxis.get_ticklabels():
-        label.set_rotation(45)
+    ax_rsi.tick_params(axis='x', labelrotation=45)
+
+    # MOVING AVERAGE CONVERGENCE DIVERGENCE
+    ax_macd = fig.add_subplot(grid[8:9, 0:4],
+                              sharex=ax1,
+                              facecolor=style.axis_bg_color)
+
+    # SLOW STOCHASTIC
+    ax_sstoch = fig.add_subplot(grid[6:8, 0:4],
+                                sharex=ax1,
+                                facecolor=style.axis_bg_color)
 
     # adjust the size of the plot
     #plt.subplots_adjust(left=0.10, bottom=0.19, right=0.93, top=0.95, wspace=0.20, hspace=0.0)
-    plt.subplots_adjust(left=0.07, bottom=0.10, right=0.97, top=0.95, wspace=0.20, hspace=0.0)
+    fig.subplots_adjust(**LAYOUT)
 
     # plt.xlabel('Date', color=style.label_color)
-    plt.suptitle('Stock Price Chart', color=style.label_color)
-
-    plt.show()
+    fig.suptitle('Stock Price Chart', color=style.label_color)
+
+    return ax1, ax_sstoch, ax_macd, ax_rsi
+
+
+def _prepare_frame(df, bar_positions=False):
+    """ bring the price data into the shape used for charting, without
+    touching the caller's data: oldest row first, a volume column and
+    the x coordinate of every bar both in the date column and as index,
+    so that candles and indicators share the same x axis. Price columns
+    are reordered through views, only an unsorted input needs a copy.
+
+    :param df: DataFrame, structured array or dict of arrays with open,
+        high, low, close and optionally volume columns, and a date column
+        or a DatetimeIndex
+    :param bar_positions: use integer bar positions as x coordinate
+        instead of matplotlib date numbers, which skips non trading gaps
+    :return: (OHLCV, date numbers in chart order)
+    """
+    data = as_ohlcv(df)
+    if data.date is None:
+        raise ValueError('price data needs a date column or a DatetimeIndex')
+    dates = to_mpl_dates(data.date)
+
+    # charts expect the oldest bar first, data usually comes newest first
+    order = slice(None)
+    if len(dates) > 1 and not np.all(dates[1:] >= dates[:-1]):
+        order = slice(None, None, -1)
+        if not np.all(dates[1:] <= dates[:-1]):
+            order = np.argsort(dates, kind='mergesort')
+    dates = dates[order]
+
+    x = np.arange(len(dates), dtype=float) if bar_positions else dates
+    volume = data.volume[order] if 'volume' in data else np.zeros(len(dates))
+    frame = OHLCV(date=x, index=x,
+                  open=data.open[order],
+                  high=data.high[order],
+                  low=data.low[order],
+                  close=data.close[order],
+                  volume=volume)
+    return frame, dates
+
+
+def compute_indicators(df,
+                       smas=[100, 50, 5, 10],
+                       rsi_setup=dict(period=14),
+                       macd_setup=dict(slow=26, fast=12, ema=8),
+                       bbands_setup=dict(period=20, multiplier=2),
+                       sstoch_setup=dict(period=14, smoothing=3)):
+    """ every indicator of the chart, computed by compute_all and kept
+    in the indicator cache as one entry
+    :param df: price data accepted by as_ohlcv
+    :return: IndicatorSet
+    """
+    df = as_ohlcv(df)
+    return indicator_cache.get(compute_all, df.low, df.high, df.close,
+                               smas=tuple(smas),
+                               rsi_setup=rsi_setup,
+                               macd_setup=macd_setup,
+                               bbands_setup=bbands_setup,
+                               sstoch_setup=sstoch_setup)
+
+
+def prepare_panels(df,
+                   smas=[100, 50, 5, 10],
+                   rsi_setup=dict(period=14),
+                   macd_setup=dict(slow=26, fast=12, ema=8),
+                   bbands_setup=dict(period=20, multiplier=2),
+                   sstoch_setup=dict(period=14, smoothing=3),
+                   max_bars=None,
+                   style=style,
+                   workers=None,
+                   profiler=NULL_PROFILER):
+    """ all the numerical work behind the chart panels: the aggregated
+    bars with their candle vertices and every indicator series,
+    decimated to max_bars. No artists are created, so the work can run
+    off the main thread.
+
+    With workers the panels are prepared concurrently in a thread pool.
+    NumPy releases the GIL inside its array loops, so the latency drops
+    towards that of the slowest panel; every panel then computes its own
+    indicators. Without workers the indicators come from one
+    compute_indicators call and the panels are prepared one after
+    another.
+
+    :param df: OHLCV as returned by _prepare_frame
+    :param max_bars: level of detail, see candlestick_plot
+    :param style: style object, for the candle colors
+    :param workers: number of threads, None to work on the calling thread
+    :param profiler: finplots.profiling.Profiler timing every task
+    :return: dict with candles ((bars, (segments, vertices, colors))),
+        sma_<period> (x, sma), bbands (x, lower, middle, upper),
+        volume (x, volume, up), rsi (x, rsi), macd (x, macd, signal) and
+        sstoch (x, k, d) entries
+    """
+    indicators = None
+    if not workers:
+        with profiler.stage('indicators'):
+            indicators = compute_indicators(df, smas, rsi_setup, macd_setup, bbands_setup, sstoch_setup)
+
+    tasks = [('candles', _candle_data, (df, max_bars, style))]
+    tasks += [('sma_%s' % period, _sma_data, (df, period, max_bars, indicators))
+              for period in smas]
+    tasks += [('bbands', _bollinger_data, (df, bbands_setup['period'], bbands_setup['multiplier'],
+                                           max_bars, indicators)),
+              ('rsi', _rsi_data, (df, rsi_setup['period'], max_bars, indicators)),
+              ('macd', _macd_data, (df, macd_setup['slow'], macd_setup['fast'], macd_setup['ema'],
+                                    max_bars, indicators)),
+              ('sstoch', _sstoch_data, (df, sstoch_setup['period'], sstoch_setup['smoothing'],
+                                        max_bars, indicators))]
+    if 'volume' in df:
+        tasks.append(('volume', _volume_data, (df, max_bars)))
+
+    if not workers:
+        return dict((name, _run_task(profiler, name, func, args)) for name, func, args in tasks)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(name, pool.submit(_run_task, profiler, name, func, args))
+                   for name, func, args in tasks]
+        return dict((name, future.result()) for name, future in futures)
+
+
+def _run_task(profiler, name, func, args):
+    with profiler.stage('%s data' % name):
+        return func(*args)
+
+
+def _candle_data(df, max_bars, style=style):
+    """ aggregate the bars to the level of detail and compute the
+    vertices of their candles
+    :return: (bars, (wick segments, body vertices, colors))
+    """
+    bars = resample_ohlcv(df, max_bars)
+    return bars, _candlestick_vertices(bars.date, bars.open, bars.high, bars.low, bars.close,
+                                       width=_candle_width(bars.date),
+                                       up_color=style.cdl_up_color,
+                                       down_color=style.cdl_down_color)
+
+
+def render_candlestick(df, fmt='png', dpi=100, fp=None, **kwargs):
+    """ render a candlestick chart without showing it, for use in
+    servers and other headless processes. Unless a fig is passed, the
+    chart is drawn on a figure from new_figure, so pyplot is neither
+    imported nor asked for a backend. The figure is closed before
+    returning.
+
+    :param df: dataframe as accepted by candlestick_plot
+    :param fmt: image format, e.g. 'png' or 'svg'
+    :param dpi: resolution of the image
+    :param fp: writable binary file object, when None the image bytes
+        are returned
+    :param cache: finplots.rendercache.RenderCache to look the image up
+        in before drawing it, and to store it in afterwards. Not used
+        when profiling.
+    :param kwargs: passed on to candlestick_plot
+    :return: image bytes, or None when written to fp. With profile the
+        ProfileReport, which also times the encoding, comes along:
+        (image, report)
+    """
+    cache = kwargs.pop('cache', None)
+    if cache is not None and not kwargs.get('profile'):
+        return cache.render(df, fmt=fmt, dpi=dpi, fp=fp, **kwargs)
+    profile = kwargs.pop('profile', False)
+    if kwargs.get('fig') is None:
+        # draw on Agg without involving pyplot
+        kwargs['fig'] = new_figure()
+    if not profile:
+        fig = candlestick_plot(df, show=False, **kwargs)
+        return render_figure(fig, fmt=fmt, dpi=dpi, fp=fp)
+
+    profiler = profile if isinstance(profile, Profiler) else Profiler()
+    fig, _ = candlestick_plot(df, show=False, profile=profiler, **kwargs)
+    with profiler.stage('render'):
+        image = render_figure(fig, fmt=fmt, dpi=dpi, fp=fp)
+    return image, profiler.report()
+
+
+def _candle_width(x, fraction=0.5):
+    """ candle body width as a fraction of the typical bar spacing """
+    if len(x) < 2:
+        return fraction
+    return fraction * np.median(np.diff(x))
+
+
+def plot_candlestick(ax, df, width=0.5, style=style):
+    """ plot candlesticks for the ohlc data in the dataframe
+    :param ax: axis on which candles are drawn
+    :param df: dataframe, OHLCV or other price data accepted by as_ohlcv,
+        the date column holding the x coordinates
+    :param width: width of the candle body in x units
+    :param style: style object
+    :return: axis
+    """
+    df = as_ohlcv(df)
+    ax = _plot_candlestick(ax, df.date,
+                           df.open,
+                           df.high,
+                           df.low,
+                           df.close,
+                           width=width,
+                           up_color=style.cdl_up_color,
+                           down_color=style.cdl_down_color)
+    return ax
+
+
+def _plot_candlestick(ax, x, open, high, low, close,
+                      width=0.5,
+                      up_color='green',
+                      down_color='red',
+                      alpha=1.0):
+    """ draw all candles with two collections, one for the wicks
+    and one for the bodies. This keeps the number of artists
+    constant no matter how many bars are plotted.
+
+    :param ax: axis on which candles are drawn
+    :param x: x coordinates of the candles
+    :param open: open prices
+    :param high: high prices
+    :param low: low prices
+    :param close: close prices
+    :param width: width of the candle body in x units
+    :param up_color: color for candles closing above open
+    :param down_color: color for candles closing below open
+    :param alpha: alpha value for bodies and wicks
+    :return: axis
+    """
+    _candlestick_collections(ax, x, open, high, low, close,
+                             width=width,
+                             up_color=up_color,
+                             down_color=down_color,
+                             alpha=alpha)
+    return ax
+
+
+def candlestick_ohlc(ax, quotes, width=0.2, colorup='k', colordown='r', alpha=1.0):
+    """ drop in replacement for the removed matplotlib.finance.candlestick_ohlc
+
+    :param ax: axis on which candles are drawn
+    :param quotes: sequence of (time, open, high, low, close, ...) rows
+    :param width: width of the candle body in x units
+    :param colorup: color for candles closing above open
+    :param colordown: color for candles closing below open
+    :param alpha: alpha value for bodies and wicks
+    :return: (wicks, bodies) collections
+    """
+    quotes = np.asarray(quotes, dtype=float)
+    return _candlestick_collections(ax, quotes[:, 0], quotes[:, 1], quotes[:, 2],
+                                    quotes[:, 3], quotes[:, 4],
+                                    width=width,
+                                    up_color=colorup,
+                                    down_color=colordown,
+                                    alpha=alpha)
+
+
+def _candlestick_collections(ax, x, open, high, low, close,
+                             width=0.5,
+                             up_color='green',
+                             down_color='red',
+                             alpha=1.0):
+    """ build the wick and body collections from plain arrays
+    :return: (wicks, bodies) collections
+    """
+    wick_segments, body_verts, colors = _candlestick_vertices(
+        x, open, high, low, close,
+        width=width,
+        up_color=up_color,
+        down_color=down_color,
+        alpha=alpha)
+    return _add_candlestick_collections(ax, wick_segments, body_verts, colors)
+
+
+def _add_candlestick_collections(ax, wick_segments, body_verts, colors, autoscale=True):
+    """ add the wick and body collections built from precomputed vertices
+    :param autoscale: include the candles in the data limits and rescale
+        the axis, skipped for callers which set the limits themselves
+    :return: (wicks, bodies) collections
+    """
+    wicks = LineCollection(wick_segments,
+                           colors=colors,
+                           linewidths=0.5,
+                           antialiaseds=False,
+                           zorder=2)
+    bodies = PolyCollection(body_verts,
+                            facecolors=colors,
+                            edgecolors=colors,
+                            linewidths=0.5,
+                            antialiaseds=False,
+                            zorder=3)
+    ax.add_collection(wicks, autolim=autoscale)
+    ax.add_collection(bodies, autolim=autoscale)
+    if autoscale:
+        ax.autoscale_view()
+    return wicks, bodies
+
+
+def _candlestick_vertices(x, open, high, low, close,
+                          width=0.5,
+                          up_color='green',
+                          down_color='red',
+                          alpha=1.0):
+    """ compute wick segments, body vertices and per candle colors
+    :return: (n, 2, 2) segments, (n, 4, 2) vertices, (n, 4) rgba colors
+    """
+    x = np.asarray(x, dtype=float)
+    open = np.asarray(open, dtype=float)
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    half = width / 2.0
+    left = x - half
+    right = x + half
+    bottom = np.minimum(open, close)
+    top = np.maximum(open, close)
+
+    wick_segments = np.empty((len(x), 2, 2))
+    wick_segments[:, 0, 0] = x
+    wick_segments[:, 0, 1] = low
+    wick_segments[:, 1, 0] = x
+    wick_segments[:, 1, 1] = high
+
+    body_verts = np.empty((len(x), 4, 2))
+    body_verts[:, 0, 0] = left
+    body_verts[:, 0, 1] = bottom
+    body_verts[:, 1, 0] = left
+    body_verts[:, 1, 1] = top
+    body_verts[:, 2, 0] = right
+    body_verts[:, 2, 1] = top
+    body_verts[:, 3, 0] = right
+    body_verts[:, 3, 1] = bottom
+
+    up = close >= open
+    colors = np.where(up[:, np.newaxis],
+                      np.array(mcolors.to_rgba(up_color, alpha)),
+                      np.array(mcolors.to_rgba(down_color, alpha)))
+    return wick_segments, body_verts, colors
 
 
 def annotate_max(ax, df, text='Max'):
     #import ipdb; ipdb.set_trace()
-    max = df.high.max()
-    idx = df.high.tolist().index(max)
-    ax.annotate(text,
-                xy=(df.date[idx], df['high'][idx]),  # theta, radius
+    high = np.asarray(df.high)
+    idx = int(np.argmax(high))
+    return ax.annotate(text,
+                xy=(np.asarray(df.date)[idx], high[idx]),  # theta, radius
                 xytext=(0.5, 1),    # fraction, fraction
                 xycoords='data',
                 textcoords='axes fraction',
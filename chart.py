@@ -0,0 +1,307 @@
+"""
+    Persistent candlestick chart for dashboards which re-render the
+    same layout over and over. The axes, their styling, locators and
+    formatters and every artist are created once. Rendering new data
+    only replaces the data of the existing lines and collections and
+    rescales the axes, which is much cheaper than rebuilding the whole
+    figure through candlestick_plot.
+"""
+import numpy as np
+from matplotlib.path import Path
+
+from finplots import style
+from finplots.candlestick import LAYOUT
+from finplots.candlestick import chart_rc
+from finplots.candlestick import create_layout
+from finplots.candlestick import annotate_max
+from finplots.candlestick import _prepare_frame
+from finplots.candlestick import prepare_panels
+from finplots.candlestick import _candle_width
+from finplots.candlestick import _candlestick_collections
+from finplots.candlestick import _candlestick_vertices
+from finplots.lod import auto_max_bars
+from finplots.ohlcv import OHLCV
+from finplots.overlays import _plot_sma, _sma_kwargs
+from finplots.overlays import _plot_bollinger_bands, _bollinger_kwargs
+from finplots.overlays import _plot_volume, _volume_kwargs, _volume_vertices
+from finplots.rsi import _plot_rsi, _rsi_kwargs
+from finplots.macd import _plot_macd, _macd_kwargs
+from finplots.stochastics import _plot_slow_stochastic, _sstoch_kwargs
+from finplots.render import render_figure
+from finplots.themes import compile_style
+
+
+def _capture(ax, draw):
+    """ run draw() and return the lines and collections it added to ax """
+    n_lines, n_collections = len(ax.lines), len(ax.collections)
+    draw()
+    return list(ax.lines)[n_lines:], list(ax.collections)[n_collections:]
+
+
+def _fill_verts(x, y1, y2):
+    """ polygon enclosing the area between y1 and y2, NaN positions dropped
+    :return: (m, 2) vertex array
+    """
+    x = np.asarray(x, dtype=float)
+    y1 = np.broadcast_to(np.asarray(y1, dtype=float), x.shape)
+    y2 = np.broadcast_to(np.asarray(y2, dtype=float), x.shape)
+    valid = np.isfinite(y1) & np.isfinite(y2)
+    x, y1, y2 = x[valid], y1[valid], y2[valid]
+    return np.column_stack([np.concatenate([x, x[::-1]]),
+                            np.concatenate([y1, y2[::-1]])])
+
+
+def _fill_runs(x, y1, y2, where):
+    """ one fill polygon per contiguous run of positions where `where`
+    holds, all in a single compound path so that drawing them costs one
+    path no matter how many runs there are
+    :return: (vertices, path codes) for PolyCollection.set_verts_and_codes
+    """
+    x = np.asarray(x, dtype=float)
+    y1 = np.asarray(y1, dtype=float)
+    y2 = np.broadcast_to(np.asarray(y2, dtype=float), x.shape)
+    flags = np.concatenate([[False], np.asarray(where, dtype=bool), [False]])
+    edges = np.flatnonzero(np.diff(flags.astype(np.int8)))
+    starts, stops = edges[0::2], edges[1::2]
+    lengths = stops - starts
+    if len(lengths) == 0:
+        return np.zeros((0, 2)), np.zeros(0, dtype=np.uint8)
+
+    # every run is laid out as its points along y1, back along y2, and a
+    # closing vertex: 2 * length + 1 vertices starting at offset
+    offsets = np.concatenate([[0], np.cumsum(2 * lengths + 1)[:-1]])
+    idx = np.flatnonzero(flags[1:-1])
+    run = np.repeat(np.arange(len(lengths)), lengths)
+    pos = idx - starts[run]
+
+    verts = np.empty((offsets[-1] + 2 * lengths[-1] + 1, 2))
+    forward = offsets[run] + pos
+    backward = offsets[run] + 2 * lengths[run] - 1 - pos
+    verts[forward, 0] = x[idx]
+    verts[forward, 1] = y1[idx]
+    verts[backward, 0] = x[idx]
+    verts[backward, 1] = y2[idx]
+    close = offsets + 2 * lengths
+    verts[close] = verts[offsets]
+
+    codes = np.full(len(verts), Path.LINETO, dtype=np.uint8)
+    codes[offsets] = Path.MOVETO
+    codes[close] = Path.CLOSEPOLY
+    return verts, codes
+
+
+def _span(*arrays):
+    """ finite (min, max) over all arrays, padded by a small margin """
+    values = np.concatenate([np.asarray(a, dtype=float).ravel() for a in arrays])
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return 0.0, 1.0
+    lo, hi = values.min(), values.max()
+    pad = (hi - lo) * 0.05 or 1.0
+    return lo - pad, hi + pad
+
+
+class CandlestickChart(object):
+    """ candlestick chart whose layout is built once and re-used
+
+        chart = CandlestickChart()
+        chart.update(df)
+        png = chart.render()
+    """
+
+    @chart_rc
+    def __init__(self,
+                 smas=[100, 50, 5, 10],
+                 style=style,
+                 figsize=(18, 10),
+                 rsi_setup=dict(period=14),
+                 macd_setup=dict(slow=26, fast=12, ema=8),
+                 bbands_setup=dict(period=20, multiplier=2),
+                 sstoch_setup=dict(period=14, smoothing=3),
+                 max_bars='auto',
+                 fig=None,
+                 workers=None):
+        self.smas = list(smas)
+        self.style = style = compile_style(style)
+        self.rsi_setup = rsi_setup
+        self.macd_setup = macd_setup
+        self.bbands_setup = bbands_setup
+        self.sstoch_setup = sstoch_setup
+        self.max_bars = max_bars
+        self.workers = workers
+
+        if fig is None:
+            import matplotlib.pyplot as plt
+            fig = plt.figure(figsize=figsize, facecolor=style.face_color)
+        self.fig = fig
+        self.ax_price, self.ax_sstoch, self.ax_macd, self.ax_rsi = create_layout(fig, style=style)
+        self._create_artists()
+
+    def _create_artists(self):
+        """ draw every panel once on placeholder data to obtain styled artists """
+        style = self.style
+        x = np.zeros(1)
+        y = np.zeros(1)
+        ax = self.ax_price
+
+        self.wicks, self.bodies = _candlestick_collections(ax, x, y, y, y, y,
+                                                           up_color=style.cdl_up_color,
+                                                           down_color=style.cdl_down_color)
+        self.annotation = annotate_max(ax, OHLCV(y, y, y, y, date=x))
+
+        self.sma_lines = []
+        for idx, period in enumerate(self.smas):
+            lines, _ = _capture(ax, lambda: _plot_sma(ax, x, y,
+                                                      color=style.sma_colors[idx],
+                                                      legend_text='%s SMA' % str(period),
+                                                      **_sma_kwargs(style)))
+            self.sma_lines.append(lines[0])
+
+        legend_text = 'Bollinger Bands (%s, %s)' % (str(self.bbands_setup['period']),
+                                                    str(self.bbands_setup['multiplier']))
+        lines, collections = _capture(ax, lambda: _plot_bollinger_bands(ax, x, y, y, y,
+                                                                         legend_text=legend_text,
+                                                                         **_bollinger_kwargs(style)))
+        self.bbands_mid_line, self.bbands_fill = lines[0], collections[0]
+
+        _, collections = _capture(ax, lambda: _plot_volume(ax, x, y, **_volume_kwargs(style)))
+        self.volume_bars = collections[0]
+
+        ax = self.ax_rsi
+        legend_text = 'RSI %s' % str(self.rsi_setup['period'])
+        lines, collections = _capture(ax, lambda: _plot_rsi(ax, x, y + 50,
+                                                            legend_text=legend_text,
+                                                            **_rsi_kwargs(style)))
+        self.rsi_line = lines[0]
+        self.rsi_overbought_fill, self.rsi_oversold_fill = collections
+
+        ax = self.ax_macd
+        legend_text = 'MACD %s, %s, %s' % (str(self.macd_setup['slow']),
+                                           str(self.macd_setup['fast']),
+                                           str(self.macd_setup['ema']))
+        lines, collections = _capture(ax, lambda: _plot_macd(ax, x, y, y,
+                                                             legend_text=legend_text,
+                                                             **_macd_kwargs(style)))
+        self.macd_line, self.macd_signal_line = lines
+        self.macd_div_fill = collections[0]
+
+        ax = self.ax_sstoch
+        legend_text = 'SLOW STOCH %s, %s' % (str(self.sstoch_setup['period']),
+                                             str(self.sstoch_setup['smoothing']))
+        lines, _ = _capture(ax, lambda: _plot_slow_stochastic(ax, x, y, y,
+                                                              legend_text=legend_text,
+                                                              **_sstoch_kwargs(style)))
+        self.sstoch_k_line, self.sstoch_d_line = lines[:2]
+
+    def update(self, df):
+        """ replace the data shown by the chart
+        :param df: dataframe as accepted by candlestick_plot
+        :return: figure
+        """
+        df, _ = _prepare_frame(df)
+
+        data = prepare_panels(df, self.smas, self.rsi_setup, self.macd_setup,
+                              self.bbands_setup, self.sstoch_setup,
+                              max_bars=self._max_bars(),
+                              style=self.style,
+                              workers=self.workers)
+        bars, candles = data['candles']
+        series = dict(smas=[data['sma_%s' % period] for period in self.smas],
+                      bbands=data['bbands'],
+                      rsi=data['rsi'],
+                      macd=data['macd'],
+                      sstoch=data['sstoch'])
+        return self._set_data(bars, series, candles=candles)
+
+    def _max_bars(self):
+        if self.max_bars == 'auto':
+            return auto_max_bars(self.fig, left=LAYOUT['left'], right=LAYOUT['right'])
+        return self.max_bars
+
+    def _set_data(self, bars, series, candles=None, autoscale_x=True):
+        """ push candles and indicator series into the existing artists
+
+        :param bars: dataframe with date, open, high, low, close columns
+        :param series: dict with smas (list of (x, sma)), bbands
+            (x, lower, middle, upper), rsi (x, rsi), macd (x, macd,
+            signal) and sstoch (x, k, d) entries. The volume is taken
+            from the bars.
+        :param candles: precomputed (segments, vertices, colors) of the
+            bars, computed when None
+        :param autoscale_x: fit the x axis to the data, otherwise only
+            the y axes are rescaled
+        :return: figure
+        """
+        style = self.style
+
+        # CANDLES
+        if candles is None:
+            candles = _candlestick_vertices(bars.date,
+                                            bars.open,
+                                            bars.high,
+                                            bars.low,
+                                            bars.close,
+                                            width=_candle_width(bars.date),
+                                            up_color=style.cdl_up_color,
+                                            down_color=style.cdl_down_color)
+        segments, verts, colors = candles
+        self.wicks.set_segments(segments)
+        self.wicks.set_color(colors)
+        self.bodies.set_verts(verts)
+        self.bodies.set_facecolor(colors)
+        self.bodies.set_edgecolor(colors)
+
+        idx = int(np.argmax(bars.high))
+        self.annotation.xy = (bars.date[idx], bars.high[idx])
+
+        # OVERLAYS
+        price_series = [bars.low, bars.high]
+        for line, (x, sma) in zip(self.sma_lines, series['smas']):
+            line.set_data(x, sma)
+            price_series.append(sma)
+
+        x, lower, middle, upper = series['bbands']
+        self.bbands_mid_line.set_data(x, middle)
+        self.bbands_fill.set_verts([_fill_verts(x, upper, lower)])
+        price_series.extend([lower, upper])
+
+        volume = bars.volume if 'volume' in bars else np.zeros(len(bars))
+        verts, colors = _volume_vertices(bars.date, volume, bars.close >= bars.open,
+                                         **_volume_kwargs(style))
+        self.volume_bars.set_verts(verts)
+        self.volume_bars.set_facecolor(colors)
+
+        # PANELS
+        x, rsi_data = series['rsi']
+        self.rsi_line.set_data(x, rsi_data)
+        verts, codes = _fill_runs(x, rsi_data, 70, rsi_data >= 70)
+        self.rsi_overbought_fill.set_verts_and_codes([verts], [codes])
+        verts, codes = _fill_runs(x, rsi_data, 30, rsi_data <= 30)
+        self.rsi_oversold_fill.set_verts_and_codes([verts], [codes])
+
+        x, macd, signal = series['macd']
+        div = np.nan_to_num(macd - signal)
+        self.macd_line.set_data(x, macd)
+        self.macd_signal_line.set_data(x, signal)
+        self.macd_div_fill.set_verts([_fill_verts(x, div, 0)])
+
+        x, k, d = series['sstoch']
+        self.sstoch_k_line.set_data(x, k)
+        self.sstoch_d_line.set_data(x, d)
+
+        # RESCALE
+        if autoscale_x:
+            self.ax_price.set_xlim(*_span(bars.date, x))
+        self.ax_price.set_ylim(*_span(*price_series))
+        self.ax_macd.set_ylim(*_span(macd, signal, div))
+        return self.fig
+
+    def draw(self):
+        """ schedule a redraw of the figure on its canvas """
+        self.fig.canvas.draw_idle()
+
+    def render(self, fmt='png', dpi=100, fp=None):
+        """ encode the current state of the chart, keeping the figure open
+        :return: image bytes, or None when written to fp
+        """
+        return render_figure(self.fig, fmt=fmt, dpi=dpi, fp=fp, close=False)
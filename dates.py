@@ -0,0 +1,72 @@
+"""
+    Vectorized date handling for the charts. Dates are converted to
+    matplotlib date numbers (float days) with array arithmetic instead
+    of calling date2num once per row.
+"""
+import numpy as np
+import matplotlib.dates as mdates
+import matplotlib.ticker as mticker
+
+NS_PER_DAY = 86400 * 10 ** 9
+
+
+def to_mpl_dates(values):
+    """ convert dates to matplotlib date numbers
+    :param values: datetime64 array, DatetimeIndex, Series of datetimes
+        or strings, or numbers which are taken to be date numbers already
+    :return: float64 array
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype(float)
+    if not np.issubdtype(values.dtype, np.datetime64):
+        import pandas as pd
+        index = pd.DatetimeIndex(pd.to_datetime(values))
+        if index.tz is not None:
+            index = index.tz_convert(None)
+        values = index.values
+    ns = values.astype('datetime64[ns]', copy=False).view(np.int64)
+    epoch = mdates.date2num(np.datetime64('1970-01-01T00:00:00'))
+    return epoch + ns / float(NS_PER_DAY)
+
+
+def from_mpl_dates(values):
+    """ convert matplotlib date numbers back to dates
+    :param values: float array of date numbers
+    :return: datetime64[ns] array
+    """
+    epoch = mdates.date2num(np.datetime64('1970-01-01T00:00:00'))
+    days = np.asarray(values, dtype=float) - epoch
+    return np.round(days * NS_PER_DAY).astype(np.int64).view('datetime64[ns]')
+
+
+def frame_dates(df):
+    """ the dates of a price frame, taken from its date column or,
+    when there is none, from a DatetimeIndex
+    :return: array like of dates
+    """
+    if 'date' in df:
+        return df['date'].values
+    import pandas as pd
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index.values
+    raise ValueError('dataframe needs a date column or a DatetimeIndex')
+
+
+class BarDateFormatter(mticker.Formatter):
+    """ label integer bar positions with the date of the bar, so that
+    non trading periods do not leave gaps on the x axis """
+
+    def __init__(self, dates, fmt='%d-%m-%y'):
+        """
+        :param dates: matplotlib date numbers, one per bar position
+        :param fmt: strftime format of the labels
+        """
+        self.dates = np.asarray(dates)
+        self.fmt = fmt
+
+    def __call__(self, x, pos=None):
+        idx = int(round(x))
+        if idx < 0 or idx >= len(self.dates):
+            return ''
+        return mdates.num2date(self.dates[idx]).strftime(self.fmt)
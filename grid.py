@@ -0,0 +1,324 @@
+"""
+    Small multiples: a wall of mini candlestick charts, one cell per
+    symbol, each with its own indicator panels, drawn in one figure.
+
+    Giving every cell axes of its own would make the figure pay for the
+    ticks, spines and artists of hundreds of axes. Instead the grid is a
+    single axes spanning the figure in which every cell, and every panel
+    of a cell, is a box in data coordinates. The candles, indicator
+    lines, fills, guide lines and panel backgrounds of all the symbols
+    go into one collection per kind, so a draw costs a handful of
+    collections and a label per cell whatever the number of symbols.
+
+    The indicators of a symbol come from one compute_all call through
+    the indicator cache and the colors from the same style bundles as
+    the panels of the full chart. Cells can be prepared concurrently.
+
+        png = render_grid(dict(INFY=infy, TCS=tcs, WIPRO=wipro))
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import matplotlib.colors as mcolors
+from matplotlib.collections import LineCollection
+from matplotlib.collections import PolyCollection
+
+from finplots import style
+from finplots.candlestick import chart_rc
+from finplots.candlestick import compute_indicators
+from finplots.candlestick import _prepare_frame
+from finplots.candlestick import _add_candlestick_collections
+from finplots.candlestick import _candlestick_vertices
+from finplots.chart import _fill_runs
+from finplots.lod import decimate_minmax
+from finplots.lod import resample_ohlcv
+from finplots.macd import _macd_kwargs
+from finplots.ohlcv import OHLCV
+from finplots.overlays import _sma_kwargs
+from finplots.render import new_figure
+from finplots.render import render_figure
+from finplots.rsi import _rsi_kwargs
+from finplots.stochastics import _sstoch_kwargs
+from finplots.themes import compile_style
+
+# relative heights of the panels of a cell
+PANEL_HEIGHTS = dict(price=3, rsi=1, macd=1, sstoch=1)
+
+# fractions of a cell taken by the label strip at its top and by the
+# padding around its panels
+LABEL_HEIGHT = 0.14
+PADDING = 0.03
+
+# line widths of the full chart are scaled by this in the cells
+LINE_SCALE = 0.5
+
+
+def _unit(values, lo, hi):
+    """ map values from [lo, hi] to [0, 1] """
+    span = hi - lo
+    return (np.asarray(values, dtype=float) - lo) / (span if span > 0 else 1.0)
+
+
+def _line(x, y, color, width):
+    """ (xy, color, width) of a line with its NaN positions dropped """
+    keep = np.isfinite(y)
+    return np.column_stack([x[keep], y[keep]]), color, width * LINE_SCALE
+
+
+def _cell_data(df, panels, last, max_bars, smas, rsi_setup, macd_setup, sstoch_setup, style):
+    """ geometry of one cell in unit coordinates, x and y in [0, 1] for
+    every panel
+    :return: dict with label ((last close, change) or None) and one
+        entry per panel holding candles ((segments, vertices, colors) or
+        None), lines [(xy, color, width)], fills [(vertices, codes,
+        color)] and guides [(y, color)]
+    """
+    frame, _ = _prepare_frame(df)
+    data = dict(label=None)
+    if len(frame) == 0:
+        return data
+    indicators = compute_indicators(frame, smas,
+                                    rsi_setup=rsi_setup,
+                                    macd_setup=macd_setup,
+                                    sstoch_setup=sstoch_setup)
+
+    start = max(len(frame) - last, 0) if last else 0
+    window = frame[start:]
+    columns = dict((name, values[start:]) for name, values in indicators.columns.items())
+    n = len(window)
+    positions = np.arange(n, dtype=float)
+    data['label'] = (window.close[-1], window.close[-1] / window.close[0] - 1.0)
+
+    def series(*names):
+        values = decimate_minmax(positions, max_bars, *[columns[name] for name in names])
+        return ((values[0] + 0.5) / n,) + values[1:]
+
+    for panel in panels:
+        geometry = dict(candles=None, lines=[], fills=[], guides=[])
+        data[panel] = geometry
+
+        if panel == 'price':
+            bars = resample_ohlcv(OHLCV(open=window.open,
+                                        high=window.high,
+                                        low=window.low,
+                                        close=window.close,
+                                        index=positions), max_bars)
+            step = n / float(len(bars))
+            x = (bars.index + 0.5 * step) / n
+            lo, hi = np.nanmin(bars.low), np.nanmax(bars.high)
+            geometry['candles'] = _candlestick_vertices(x,
+                                                        _unit(bars.open, lo, hi),
+                                                        _unit(bars.high, lo, hi),
+                                                        _unit(bars.low, lo, hi),
+                                                        _unit(bars.close, lo, hi),
+                                                        width=0.6 / len(bars),
+                                                        up_color=style.cdl_up_color,
+                                                        down_color=style.cdl_down_color)
+            width = _sma_kwargs(style)['line_width']
+            for idx, period in enumerate(smas):
+                x, sma = series('sma_%s' % period)
+                geometry['lines'].append(_line(x, np.clip(_unit(sma, lo, hi), 0, 1),
+                                               style.sma_colors[idx], width))
+
+        elif panel == 'rsi':
+            kw = _rsi_kwargs(style)
+            x, rsi = series('rsi')
+            y = rsi / 100.0
+            geometry['lines'].append(_line(x, y, kw['line_color'], kw['line_width']))
+            geometry['fills'].append(_fill_runs(x, y, 0.7, y >= 0.7) + (kw['overbought_color'],))
+            geometry['fills'].append(_fill_runs(x, y, 0.3, y <= 0.3) + (kw['oversold_color'],))
+            guide = mcolors.to_rgba(kw['signal_line_color'], kw['signal_line_alpha'])
+            geometry['guides'] = [(0.3, guide), (0.5, guide), (0.7, guide)]
+
+        elif panel == 'macd':
+            kw = _macd_kwargs(style)
+            x, macd, signal = series('macd', 'macd_signal')
+            div = macd - signal
+            scale = 2.1 * (np.nanmax(np.abs(np.concatenate([macd, signal]))) or 1.0)
+            geometry['lines'].append(_line(x, 0.5 + macd / scale,
+                                           kw['macd_line_color'], kw['macd_line_width']))
+            geometry['lines'].append(_line(x, 0.5 + signal / scale,
+                                           kw['signal_line_color'], kw['signal_line_width']))
+            y = 0.5 + div / scale
+            geometry['fills'].append(_fill_runs(x, y, 0.5, np.isfinite(y)) +
+                                     (mcolors.to_rgba(kw['fill_color'], kw['div_alpha']),))
+            geometry['guides'] = [(0.5, mcolors.to_rgba(kw['edge_color'], 0.3))]
+
+        elif panel == 'sstoch':
+            kw = _sstoch_kwargs(style)
+            x, k, d = series('sstoch_k', 'sstoch_d')
+            geometry['lines'].append(_line(x, k / 100.0, kw['k_line_color'], kw['k_line_width']))
+            geometry['lines'].append(_line(x, d / 100.0, kw['d_line_color'], kw['d_line_width']))
+            guide = mcolors.to_rgba(kw['hline_color'], kw['hline_alpha'])
+            geometry['guides'] = [(0.2, guide), (0.8, guide)]
+
+        else:
+            raise ValueError('unknown panel %r, choose from %s' % (panel, ', '.join(PANEL_HEIGHTS)))
+    return data
+
+
+def _panel_boxes(panels):
+    """ (x0, y0, width, height) of every panel inside a unit cell, the
+    first panel at the top """
+    weights = [PANEL_HEIGHTS[panel] for panel in panels]
+    height = 1.0 - LABEL_HEIGHT - PADDING
+    top = 1.0 - LABEL_HEIGHT
+    boxes = []
+    for weight in weights:
+        h = height * weight / float(sum(weights))
+        boxes.append((PADDING, top - h, 1.0 - 2 * PADDING, h))
+        top -= h
+    return boxes
+
+
+def _place(xy, box, x0, y0):
+    """ map unit coordinates into the box of a panel of the cell at x0, y0 """
+    bx, by, bw, bh = box
+    out = np.array(xy, dtype=float)
+    out[..., 0] = x0 + bx + out[..., 0] * bw
+    out[..., 1] = y0 + by + out[..., 1] * bh
+    return out
+
+
+@chart_rc
+def grid_plot(frames,
+              columns=None,
+              panels=('price', 'rsi', 'macd'),
+              last=120,
+              smas=(20,),
+              rsi_setup=dict(period=14),
+              macd_setup=dict(slow=26, fast=12, ema=8),
+              sstoch_setup=dict(period=14, smoothing=3),
+              style=style,
+              cell_size=(2.4, 1.8),
+              fig=None,
+              workers=None):
+    """ plot a grid of mini candlestick charts, one cell per symbol
+
+    :param frames: dict of symbol -> price data, or iterable of
+        (symbol, price data), price data as accepted by candlestick_plot
+    :param columns: number of cells per row, about square when None
+    :param panels: panels of every cell from the top, any of 'price',
+        'rsi', 'macd' and 'sstoch'
+    :param last: number of most recent bars shown per symbol, all when
+        None. The indicators are computed over the whole history.
+    :param smas: periods of the simple moving averages on the prices
+    :param style: Style, CompiledStyle or theme name
+    :param cell_size: (width, height) of a cell in inches
+    :param fig: existing figure to clear and draw into, a new pyplot
+        figure when None
+    :param workers: number of threads preparing the cells, None to
+        prepare them on the calling thread
+    :return: figure
+    """
+    style = compile_style(style)
+    items = list(frames.items()) if hasattr(frames, 'items') else list(frames)
+    count = max(len(items), 1)
+    columns = columns or int(math.ceil(math.sqrt(count)))
+    rows = int(math.ceil(count / float(columns)))
+
+    figsize = (columns * cell_size[0], rows * cell_size[1])
+    if fig is None:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=figsize, facecolor=style.face_color)
+    else:
+        fig.clf()
+        fig.set_size_inches(figsize)
+        fig.set_facecolor(style.face_color)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+
+    # one bar per pixel column of a panel
+    max_bars = max(int(cell_size[0] * fig.dpi * (1 - 2 * PADDING)), 1)
+    args = (panels, last, max_bars, list(smas), rsi_setup, macd_setup, sstoch_setup, style)
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            cells = list(pool.map(lambda item: _cell_data(item[1], *args), items))
+    else:
+        cells = [_cell_data(df, *args) for _, df in items]
+
+    boxes = _panel_boxes(panels)
+    backgrounds, guides, guide_colors = [], [], []
+    wicks, bodies, candle_colors = [], [], []
+    lines, line_colors, line_widths = [], [], []
+    fill_verts, fill_codes, fill_colors = [], [], []
+    for idx, ((symbol, _), cell) in enumerate(zip(items, cells)):
+        x0 = idx % columns
+        y0 = rows - 1 - idx // columns
+
+        for panel, box in zip(panels, boxes):
+            backgrounds.append(_place([[0, 0], [0, 1], [1, 1], [1, 0]], box, x0, y0))
+            geometry = cell.get(panel)
+            if geometry is None:
+                continue
+            if geometry['candles'] is not None:
+                segments, verts, colors = geometry['candles']
+                wicks.append(_place(segments, box, x0, y0))
+                bodies.append(_place(verts, box, x0, y0))
+                candle_colors.append(colors)
+            for xy, color, width in geometry['lines']:
+                lines.append(_place(xy, box, x0, y0))
+                line_colors.append(color)
+                line_widths.append(width)
+            for verts, codes, color in geometry['fills']:
+                if len(verts):
+                    fill_verts.append(_place(verts, box, x0, y0))
+                    fill_codes.append(codes)
+                    fill_colors.append(color)
+            for y, color in geometry['guides']:
+                guides.append(_place([[0, y], [1, y]], box, x0, y0))
+                guide_colors.append(color)
+
+        # LABEL, a single text per cell as texts are drawn one by one
+        label, color = symbol, style.text_color
+        if cell['label'] is not None:
+            close, change = cell['label']
+            label = '%s  %.2f  %+.2f%%' % (symbol, close, 100 * change)
+            color = style.cdl_up_color if change >= 0 else style.cdl_down_color
+        ax.text(x0 + PADDING, y0 + 1.0 - LABEL_HEIGHT / 2.0, label,
+                va='center', ha='left', fontsize=7, color=color)
+
+    # the limits are set below, so the collections skip the data limits
+    ax.add_collection(PolyCollection(backgrounds,
+                                     facecolors=style.axis_bg_color,
+                                     edgecolors=style.spine_color,
+                                     linewidths=0.5,
+                                     zorder=0), autolim=False)
+    if guides:
+        ax.add_collection(LineCollection(guides, colors=guide_colors, linewidths=0.5, zorder=1),
+                          autolim=False)
+    if fill_verts:
+        fills = PolyCollection([], facecolors=fill_colors, edgecolors='none', zorder=1)
+        fills.set_verts_and_codes(fill_verts, fill_codes)
+        ax.add_collection(fills, autolim=False)
+    if wicks:
+        _add_candlestick_collections(ax, np.concatenate(wicks),
+                                     np.concatenate(bodies),
+                                     np.concatenate(candle_colors),
+                                     autoscale=False)
+    if lines:
+        ax.add_collection(LineCollection(lines, colors=line_colors, linewidths=line_widths, zorder=4),
+                          autolim=False)
+
+    ax.set_xlim(0, columns)
+    ax.set_ylim(0, rows)
+    return fig
+
+
+def render_grid(frames, fmt='png', dpi=100, fp=None, **kwargs):
+    """ render a grid of mini charts without showing it, drawn on a
+    figure from new_figure unless a fig is passed
+
+    :param frames: see grid_plot
+    :param fmt: image format, e.g. 'png' or 'svg'
+    :param dpi: resolution of the image
+    :param fp: writable binary file object, when None the image bytes
+        are returned
+    :param kwargs: passed on to grid_plot
+    :return: image bytes, or None when written to fp
+    """
+    if kwargs.get('fig') is None:
+        kwargs['fig'] = new_figure()
+    fig = grid_plot(frames, **kwargs)
+    return render_figure(fig, fmt=fmt, dpi=dpi, fp=fp)
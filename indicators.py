@@ -0,0 +1,468 @@
+"""
+    Vectorized technical indicators used by the plot modules.
+
+    All functions take array likes, return float64 arrays of the same
+    length as their input and pad the positions for which there is not
+    enough history yet with NaN. The conventions match the incremental
+    versions in finplots.rolling, so a streamed chart and a chart drawn
+    from the full history show the same values:
+
+    - moving averages and bands cover the last `period` values,
+      bollinger bands use the population standard deviation. A NaN
+      only makes the windows holding it NaN, like pandas rolling
+    - ema starts at the first value and uses alpha = 2 / (period + 1)
+    - rsi uses Wilder smoothing (alpha = 1 / period) of the gains and
+      losses, seeded with their mean over the first `period` changes,
+      and is defined from bar `period` on
+
+    compute_all computes every indicator of a chart and returns them
+    together as an IndicatorSet, the columns the charts take as a whole.
+"""
+from itertools import accumulate
+
+import numpy as np
+
+
+def _as_float(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def _cumsum(x):
+    """ cumulative sum with a leading zero, the sum of x[i:j] being
+    csum[j] - csum[i] """
+    csum = np.empty(len(x) + 1)
+    csum[0] = 0.0
+    np.cumsum(x, out=csum[1:])
+    return csum
+
+
+def _window_means(csum, period):
+    """ means of every window of `period` values from a cumulative sum
+    :return: array of len(csum) - period means
+    """
+    return (csum[period:] - csum[:-period]) / period
+
+
+def _centered(x):
+    """ the values centered on the mean of the finite ones, which keeps
+    cumulative sums over them small and their differences accurate. NaNs
+    are replaced by zero and counted instead, so that they only spoil
+    the windows holding them, see _drop_nan_windows.
+    :return: (centered values, reference value, cumulative NaN count or
+        None when there are no NaNs)
+    """
+    nan = np.isnan(x)
+    if not nan.any():
+        ref = x.mean() if len(x) else 0.0
+        return x - ref, ref, None
+    ref = x[~nan].mean() if not nan.all() else 0.0
+    return np.where(nan, 0.0, x - ref), ref, _cumsum(nan)
+
+
+def _drop_nan_windows(values, nans, period):
+    """ set the values of the windows of `period` values holding a NaN to
+    NaN, in place
+    :param values: one value per window, len(nans) - period of them
+    :param nans: cumulative NaN count from _centered, None for no NaNs
+    :return: values
+    """
+    if nans is not None:
+        values[nans[period:] - nans[:-period] > 0] = np.nan
+    return values
+
+
+def _window_sums(x, period):
+    """ sums of every window of `period` values, computed from a single
+    cumulative sum of the centered values
+    :return: array of len(x) - period + 1 sums
+    """
+    centered, ref, nans = _centered(x)
+    csum = _cumsum(centered)
+    return _drop_nan_windows(csum[period:] - csum[:-period] + period * ref, nans, period)
+
+
+def _ewm(x, alpha, initial):
+    """ exponentially weighted recursion y[i] = y[i-1] + alpha * (x[i] - y[i-1])
+    starting from y[-1] = initial.
+
+    The values are cut into blocks. Within a block the recursion has the
+    closed form
+    y[j] = d**(j+1) * (s + alpha * sum_i<=j x[i] / d**(i+1)), d = 1 - alpha,
+    s being the value before the block, which is evaluated for all the
+    blocks at once with a cumulative sum, from s = 0. The values before
+    every block then follow from the block ends with the scalar
+    recurrence s' = end + d**block * s, and d**(j+1) * s is added back.
+    Blocks are kept short enough for d**-j to stay well inside float64
+    precision.
+
+    Several series of the same length run in one pass when x is a
+    (k, n) array, alpha and initial then holding one value per row. The
+    block length is set by the fastest decaying row.
+    :return: float array shaped like x
+    """
+    x = np.asarray(x, dtype=np.float64)
+    rows = np.atleast_2d(x)
+    k, n = rows.shape
+    out = np.empty((k, n))
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), (k,))
+    initial = np.broadcast_to(np.asarray(initial, dtype=np.float64), (k,))
+    d = 1.0 - alpha
+    # alpha of 1 or more simply follows x
+    follow = d <= 0.0
+    out[follow] = rows[follow]
+    if n == 0 or follow.all():
+        return out if x.ndim == 2 else out[0]
+    if follow.any():
+        rows, alpha, initial, d = rows[~follow], alpha[~follow], initial[~follow], d[~follow]
+
+    decaying = d[d < 1.0]
+    block = max(int(12.0 / -np.log10(decaying.max())), 1) if len(decaying) else n
+    block = min(block, n)
+    blocks = -(-n // block)
+    powers = d[:, None, None] ** np.arange(1, block + 1)
+    padded = np.zeros((len(rows), blocks * block))
+    padded[:, :n] = rows
+    y = padded.reshape(len(rows), blocks, block)
+    y *= alpha[:, None, None] / powers
+    np.cumsum(y, axis=2, out=y)
+    y *= powers
+
+    starts = np.empty((len(rows), blocks))
+    for row, (ends, decay, first) in enumerate(zip(y[:, :-1, -1].tolist(), powers[:, 0, -1].tolist(),
+                                                   initial.tolist())):
+        starts[row] = list(accumulate(ends, lambda state, end: end + decay * state, initial=first))
+    y += powers * starts[:, :, None]
+
+    result = y.reshape(len(rows), -1)[:, :n]
+    if follow.any():
+        out[~follow] = result
+    else:
+        out[:] = result
+    return out if x.ndim == 2 else out[0]
+
+
+def _pad(values, n):
+    """ right align values in an array of n elements, NaN padded """
+    out = np.full(n, np.nan)
+    if len(values):
+        out[n - len(values):] = values
+    return out
+
+
+def rolling_max(values, period):
+    """ maximum over the last `period` values, with the van Herk/Gil-Werman
+    scheme: block wise prefix and suffix maxima give every window in
+    O(1), without a python level loop.
+    """
+    return _rolling_extreme(_as_float(values), period, np.maximum, -np.inf)
+
+
+def rolling_min(values, period):
+    """ minimum over the last `period` values, see rolling_max """
+    return _rolling_extreme(_as_float(values), period, np.minimum, np.inf)
+
+
+def _rolling_extreme(x, period, ufunc, fill):
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < period:
+        return out
+    blocks = np.concatenate([x, np.full((-n) % period, fill)]).reshape(-1, period)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    out[period - 1:] = ufunc(suffix[:n - period + 1], prefix[period - 1:n])
+    return out
+
+
+def simple_moving_average(prices, period=20):
+    """ simple moving average
+    :param prices: price series
+    :param period: number of values averaged
+    :return: float array, NaN for the first period - 1 values
+    """
+    x = _as_float(prices)
+    if len(x) < period:
+        return np.full(len(x), np.nan)
+    return _pad(_window_sums(x, period) / period, len(x))
+
+
+def exponential_moving_average(prices, period=9):
+    """ exponential moving average with alpha = 2 / (period + 1),
+    seeded with the first value
+    :param prices: price series
+    :param period: span of the average
+    :return: float array
+    """
+    x = _as_float(prices)
+    if len(x) == 0:
+        return x.copy()
+    out = np.empty(len(x))
+    out[0] = x[0]
+    out[1:] = _ewm(x[1:], 2.0 / (period + 1), x[0])
+    return out
+
+
+def bollinger_bands(prices, period=20, multiplier=2):
+    """ bollinger bands, the rolling mean and variance coming from one
+    pass of cumulative sums over the values and their squares
+    :param prices: price series
+    :param period: window of the moving average
+    :param multiplier: width of the bands in standard deviations
+    :return: (lower, middle, upper)
+    """
+    x = _as_float(prices)
+    if len(x) < period:
+        nans = np.full(len(x), np.nan)
+        return nans, nans.copy(), nans.copy()
+    centered, ref, nans = _centered(x)
+    return _bands(_cumsum(centered), _cumsum(centered * centered), ref, period, multiplier, nans)
+
+
+def _bands(csum, csum_sq, ref, period, multiplier, nans=None):
+    """ bollinger bands from the cumulative sums of the values centered
+    on ref and of their squares, and the cumulative NaN count """
+    n = len(csum) - 1
+    mean = _drop_nan_windows(_window_means(csum, period), nans, period)
+    mean_sq = _window_means(csum_sq, period)
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+    middle = mean + ref
+    return (_pad(middle - multiplier * std, n),
+            _pad(middle, n),
+            _pad(middle + multiplier * std, n))
+
+
+def relative_strength_index(prices, n=14):
+    """ relative strength index with Wilder smoothing, the averages of
+    the gains and losses being seeded with their mean over the first n
+    changes
+    :param prices: price series
+    :param n: period of the rsi
+    :return: float array, NaN for the first n values
+    """
+    x = _as_float(prices)
+    if len(x) <= n:
+        return np.full(len(x), np.nan)
+    return _rsi(np.diff(x), n)
+
+
+def _rsi(change, n):
+    """ rsi from the bar to bar price changes, the averages of the gains
+    and losses running in one pass """
+    avg_gain, avg_loss = _ewm(_wilder_inputs(change, n), 1.0 / n, 0.0)
+    return _rsi_from_averages(avg_gain, avg_loss, n)
+
+
+def _wilder_inputs(change, n):
+    """ gains and losses of at least n price changes, stacked, arranged
+    so that an _ewm pass with alpha 1 / n starting from zero gives
+    wilder's averages seeded with the mean of the first n: the first
+    n - 1 values are zeroed and the n-th holds the sum of the first n,
+    which the recursion scales down to their mean
+    :return: (2, len(change)) array
+    """
+    rows = np.stack([np.maximum(change, 0.0), np.maximum(-change, 0.0)])
+    rows[:, n - 1] = rows[:, :n].sum(axis=1)
+    rows[:, :n - 1] = 0.0
+    return rows
+
+
+def _rsi_from_averages(avg_gain, avg_loss, n):
+    """ rsi from wilder's averages of the gains and losses """
+    out = np.full(len(avg_gain) + 1, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi)
+    out[n:] = rsi[n - 1:]
+    return out
+
+
+def moving_average_convergence_divergence(prices, slow=26, fast=12):
+    """ macd line
+    :param prices: price series
+    :param slow: period of the slow ema
+    :param fast: period of the fast ema
+    :return: (fast ema, slow ema, macd)
+    """
+    x = _as_float(prices)
+    ema_fast, ema_slow = _emas(x, [fast, slow])
+    return ema_fast, ema_slow, ema_fast - ema_slow
+
+
+def _emas(x, periods, extra=None):
+    """ emas of the prices x for several periods in one _ewm pass, each
+    seeded with the first value
+    :param extra: optional (rows, alpha, initial) of more recursions over
+        n - 1 values, run in the same pass and returned after the emas
+    :return: list of float arrays
+    """
+    n = len(x)
+    if n == 0:
+        return [x.copy() for _ in periods]
+    values = np.broadcast_to(x[1:], (len(periods), n - 1))
+    alpha = [2.0 / (period + 1) for period in periods]
+    initial = [x[0]] * len(periods)
+    if extra is not None:
+        values = np.concatenate([values, extra[0]])
+        alpha = alpha + list(extra[1])
+        initial = initial + list(extra[2])
+    smoothed = _ewm(values, alpha, initial)
+    emas = []
+    for row in smoothed[:len(periods)]:
+        ema = np.empty(n)
+        ema[0] = x[0]
+        ema[1:] = row
+        emas.append(ema)
+    return emas + list(smoothed[len(periods):])
+
+
+def slow_stochastic(low, high, close, period=14, smoothing=3):
+    """ slow stochastic oscillator
+    :param low: low prices
+    :param high: high prices
+    :param close: close prices
+    :param period: look back of the fast stochastic
+    :param smoothing: moving average period used for %K and %D
+    :return: (%K, %D)
+    """
+    return _stochastic(_as_float(close), rolling_min(low, period), rolling_max(high, period),
+                       period, smoothing)
+
+
+def _stochastic(close, lowest, highest, period, smoothing):
+    """ slow stochastic from the rolling extremes of the lows and highs """
+    n = len(close)
+    spread = highest - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fast_k = np.where(spread == 0, 50.0, 100.0 * (close - lowest) / spread)
+    fast_k = fast_k[period - 1:]
+    k = simple_moving_average(fast_k, smoothing)
+    d = simple_moving_average(k[smoothing - 1:], smoothing) if len(k) >= smoothing else k
+    return _pad(k, n), _pad(d, n)
+
+
+class IndicatorSet(object):
+    """ columnar result of compute_all
+
+    `columns` maps the column names of finplots.rolling.IndicatorState
+    (sma_<period>, bb_lower, bb_middle, bb_upper, rsi, macd, macd_signal,
+    sstoch_k, sstoch_d) to float arrays of the length of the input. The
+    lookup methods return the series of a given setup, or None when the
+    set was computed with another one.
+    """
+
+    def __init__(self, columns, smas, rsi_setup, macd_setup, bbands_setup, sstoch_setup):
+        self.columns = columns
+        self.smas = tuple(smas)
+        self.rsi_setup = dict(rsi_setup)
+        self.macd_setup = dict(macd_setup)
+        self.bbands_setup = dict(bbands_setup)
+        self.sstoch_setup = dict(sstoch_setup)
+
+    def __len__(self):
+        return len(self.columns['rsi'])
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values())
+
+    def sma(self, period):
+        """ :return: sma array or None """
+        return self.columns.get('sma_%s' % period)
+
+    def bollinger_bands(self, period, multiplier):
+        """ :return: (lower, middle, upper) or None """
+        if self.bbands_setup != dict(period=period, multiplier=multiplier):
+            return None
+        return self.columns['bb_lower'], self.columns['bb_middle'], self.columns['bb_upper']
+
+    def rsi(self, period):
+        """ :return: rsi array or None """
+        if self.rsi_setup != dict(period=period):
+            return None
+        return self.columns['rsi']
+
+    def macd(self, slow, fast, ema):
+        """ :return: (macd, signal) or None """
+        if self.macd_setup != dict(slow=slow, fast=fast, ema=ema):
+            return None
+        return self.columns['macd'], self.columns['macd_signal']
+
+    def slow_stochastic(self, period, smoothing):
+        """ :return: (%K, %D) or None """
+        if self.sstoch_setup != dict(period=period, smoothing=smoothing):
+            return None
+        return self.columns['sstoch_k'], self.columns['sstoch_d']
+
+    def to_frame(self, index=None):
+        """ copy the columns into a DataFrame """
+        import pandas as pd
+        return pd.DataFrame(self.columns, index=index)
+
+
+def compute_all(low, high, close,
+                smas=(100, 50, 5, 10),
+                rsi_setup=dict(period=14),
+                macd_setup=dict(slow=26, fast=12, ema=8),
+                bbands_setup=dict(period=20, multiplier=2),
+                sstoch_setup=dict(period=14, smoothing=3)):
+    """ compute every indicator of a candlestick chart into one
+    IndicatorSet. The moving averages and the bollinger bands share one
+    cumulative sum of the closes, and the macd emas and rsi averages one
+    _ewm call. Every step is bound by memory bandwidth, so this takes
+    about as long as calling the single indicator functions; what it
+    saves is the bookkeeping of the chart code, which caches and passes
+    around a single object.
+
+    The results are the same as those of the single indicator functions.
+
+    :param low: low prices
+    :param high: high prices
+    :param close: close prices
+    :param smas: periods of the simple moving averages
+    :param rsi_setup: dict with the rsi period
+    :param macd_setup: dict with the slow, fast and ema (signal) periods
+    :param bbands_setup: dict with the bollinger period and multiplier
+    :param sstoch_setup: dict with the stochastic period and smoothing
+    :return: IndicatorSet
+    """
+    close = _as_float(close)
+    n = len(close)
+    centered, ref, nans = _centered(close)
+    csum = _cumsum(centered)
+
+    columns = {}
+    for period in smas:
+        columns['sma_%s' % period] = _pad(_drop_nan_windows(_window_means(csum, period) + ref,
+                                                            nans, period), n)
+
+    columns['bb_lower'], columns['bb_middle'], columns['bb_upper'] = _bands(
+        csum, _cumsum(centered * centered), ref,
+        bbands_setup['period'], bbands_setup['multiplier'], nans)
+
+    # the fast and slow emas and wilder's averages of the gains and
+    # losses all run over the n - 1 close to close steps, in one pass
+    period = rsi_setup['period']
+    periods = [macd_setup['fast'], macd_setup['slow']]
+    if n > period:
+        ema_fast, ema_slow, avg_gain, avg_loss = _emas(
+            close, periods,
+            extra=(_wilder_inputs(np.diff(close), period), [1.0 / period] * 2, [0.0, 0.0]))
+        columns['rsi'] = _rsi_from_averages(avg_gain, avg_loss, period)
+    else:
+        ema_fast, ema_slow = _emas(close, periods)
+        columns['rsi'] = np.full(n, np.nan)
+    columns['macd'] = ema_fast - ema_slow
+    columns['macd_signal'] = exponential_moving_average(columns['macd'], macd_setup['ema'])
+
+    period = sstoch_setup['period']
+    columns['sstoch_k'], columns['sstoch_d'] = _stochastic(
+        close, rolling_min(low, period), rolling_max(high, period),
+        period, sstoch_setup['smoothing'])
+
+    return IndicatorSet(columns, smas, rsi_setup, macd_setup, bbands_setup, sstoch_setup)
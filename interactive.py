@@ -0,0 +1,169 @@
+"""
+    Candlestick chart for panning and zooming through long histories.
+
+    The full history and its indicators are computed once. Whenever the
+    x range changes only the bars inside it are aggregated to the pixel
+    width of the axis, so a frame costs the same at 20k or 2M bars.
+
+    The dense layers (candles, indicator lines and fills, volume) are
+    animated artists: a canvas draw only renders the static layer
+    (axes, spines, grids, the rsi and stochastic guide lines, labels),
+    whose bitmap is cached, and the dense layers are blitted on top of
+    it. Their collections are rasterized in vector output as well.
+"""
+import numpy as np
+
+from finplots.chart import CandlestickChart
+from finplots.chart import _span
+from finplots.candlestick import _prepare_frame
+from finplots.candlestick import compute_indicators
+from finplots.lod import decimate_minmax
+from finplots.lod import resample_ohlcv
+
+
+class InteractiveChart(CandlestickChart):
+    """ candlestick chart which re-aggregates the visible window on
+    pan and zoom
+
+        chart = InteractiveChart(df)
+        plt.show()
+    """
+
+    def __init__(self, df=None, **kwargs):
+        """
+        :param df: price data as accepted by candlestick_plot
+        :param kwargs: passed on to CandlestickChart
+        """
+        CandlestickChart.__init__(self, **kwargs)
+        self.frame = None
+        self.indicators = None
+        self._background = None
+        self._updating = False
+        # x limits of the window shown last
+        self._shown = None
+
+        for artist in self._dense_artists():
+            artist.set_animated(True)
+        for artist in self._collections():
+            artist.set_rasterized(True)
+
+        # finding the 'best' legend location scans all the data on every
+        # draw, which would dominate the frame time
+        legend = self.ax_price.get_legend()
+        if legend is not None:
+            legend.set_loc('upper right')
+
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        # a change of the x limits runs the callbacks of every axes sharing
+        # x, so listening on the price axes alone sees all of them once
+        self.ax_price.callbacks.connect('xlim_changed', self._on_xlim_changed)
+        if df is not None:
+            self.update(df)
+
+    def _collections(self):
+        return [self.wicks, self.bodies, self.bbands_fill, self.volume_bars,
+                self.rsi_overbought_fill, self.rsi_oversold_fill, self.macd_div_fill]
+
+    def _dense_artists(self):
+        return self._collections() + self.sma_lines + [self.bbands_mid_line,
+                                                       self.rsi_line,
+                                                       self.macd_line,
+                                                       self.macd_signal_line,
+                                                       self.sstoch_k_line,
+                                                       self.sstoch_d_line]
+
+    def update(self, df):
+        """ replace the history and show all of it
+        :param df: price data as accepted by candlestick_plot
+        :return: figure
+        """
+        self.frame, _ = _prepare_frame(df)
+        self.indicators = compute_indicators(self.frame, self.smas, self.rsi_setup,
+                                             self.macd_setup, self.bbands_setup,
+                                             self.sstoch_setup)
+        # setting the limits shows the window through _on_xlim_changed
+        self._shown = None
+        self.ax_price.set_xlim(*_span(self.frame.index))
+        self.fig.canvas.draw_idle()
+        return self.fig
+
+    def _on_xlim_changed(self, ax):
+        # set_xlim notifies even when the limits did not change
+        window = ax.get_xlim()
+        if self._updating or window == self._shown:
+            return
+        self._shown = window
+        self.show_window(*window)
+
+    def show_window(self, left, right):
+        """ aggregate the bars between left and right to the width of the
+        axis and push them into the dense artists. The x limits are left
+        alone, the y limits follow the visible data.
+        :param left: left x limit
+        :param right: right x limit
+        """
+        frame = self.frame
+        if frame is None:
+            return
+        n = len(frame)
+        # one bar beyond each edge, so that the lines leave the axes
+        start = max(np.searchsorted(frame.index, left, side='left') - 1, 0)
+        end = min(np.searchsorted(frame.index, right, side='right') + 1, n)
+        if end - start < 1:
+            return
+        columns = dict((name, values[start:end]) for name, values in self.indicators.columns.items())
+        self._show(frame[start:end], columns)
+
+    def _show(self, window, columns):
+        """ aggregate the bars of the window and their indicator columns
+        to the width of the axis and push them into the dense artists
+        :param window: OHLCV of the bars to show
+        :param columns: indicator columns of the window, by IndicatorSet name
+        """
+        max_bars = self._max_bars()
+        x = window.index
+        bars = resample_ohlcv(window, max_bars)
+        series = dict(smas=[decimate_minmax(x, max_bars, columns['sma_%s' % period])
+                            for period in self.smas],
+                      bbands=decimate_minmax(x, max_bars, columns['bb_lower'],
+                                             columns['bb_middle'], columns['bb_upper']),
+                      rsi=decimate_minmax(x, max_bars, columns['rsi']),
+                      macd=decimate_minmax(x, max_bars, columns['macd'], columns['macd_signal']),
+                      sstoch=decimate_minmax(x, max_bars, columns['sstoch_k'], columns['sstoch_d']))
+        self._updating = True
+        try:
+            self._set_data(bars, series, autoscale_x=False)
+        finally:
+            self._updating = False
+
+    def _on_draw(self, event):
+        """ cache the static layer just drawn and put the dense layers on top """
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_dense()
+
+    def _draw_dense(self):
+        for artist in self._dense_artists():
+            artist.axes.draw_artist(artist)
+
+    def blit(self):
+        """ redraw the dense layers over the cached static layer, e.g.
+        after show_window was called without a change of the x range """
+        canvas = self.fig.canvas
+        if self._background is None:
+            canvas.draw()
+            return
+        canvas.restore_region(self._background)
+        self._draw_dense()
+        canvas.blit(self.fig.bbox)
+
+    def render(self, fmt='png', dpi=100, fp=None):
+        """ encode the chart including the animated dense layers """
+        artists = self._dense_artists()
+        for artist in artists:
+            artist.set_animated(False)
+        try:
+            return CandlestickChart.render(self, fmt=fmt, dpi=dpi, fp=fp)
+        finally:
+            for artist in artists:
+                artist.set_animated(True)
+            self._background = None
@@ -0,0 +1,259 @@
+"""
+    Lazily loaded candlestick chart for histories which are too long to
+    keep in memory or expensive to fetch.
+
+    The history is read from a data source in fixed chunks of time, and
+    only the chunks around the visible x range are read. Every pan or
+    zoom loads the visible window plus a margin on each side and enough
+    earlier bars to warm up the indicators, which are then recomputed
+    for the window alone. When zoomed out beyond one bar per pixel
+    column, every chunk is aggregated as soon as it is loaded, into
+    buckets of a level of detail: the bar spacing times the largest
+    power of two which still fits into a pixel column. Recently used
+    chunks are kept in a byte bounded LRU cache, keyed by chunk and
+    level, so zooming within a factor of two reuses the aggregated
+    chunks. Memory use therefore follows the size of the screen instead
+    of the length of the history.
+
+    Sources provide bounds() and load(start, end) in matplotlib date
+    numbers. FrameSource, StoreSource and CallableSource cover price
+    data in memory, symbols of an OHLCVStore and arbitrary loaders.
+
+        chart = LazyChart(OHLCVStore('/data/bars'), symbol='INFY')
+        plt.show()
+"""
+import numpy as np
+
+from finplots.cache import IndicatorCache
+from finplots.candlestick import _prepare_frame
+from finplots.dates import from_mpl_dates
+from finplots.dates import to_mpl_dates
+from finplots.indicators import compute_all
+from finplots.interactive import InteractiveChart
+from finplots.lod import aggregate_ohlcv
+from finplots.ohlcv import OHLCV
+from finplots.ohlcv import concat
+from finplots.store import OHLCVStore
+
+
+def _datetime64(date):
+    import pandas as pd
+    return pd.Timestamp(date).to_datetime64()
+
+
+class FrameSource(object):
+    """ source over price data held in memory """
+
+    def __init__(self, df):
+        """
+        :param df: price data as accepted by candlestick_plot
+        """
+        self.data, _ = _prepare_frame(df)
+
+    def bounds(self):
+        """ :return: (first, last) date number of the history """
+        return float(self.data.index[0]), float(self.data.index[-1])
+
+    def load(self, start, end):
+        """ bars with start <= date < end, as views
+        :return: OHLCV indexed by date number
+        """
+        lo, hi = np.searchsorted(self.data.index, [start, end])
+        return self.data[lo:hi]
+
+
+class StoreSource(object):
+    """ source over a symbol of an OHLCVStore, read from the mapped files """
+
+    def __init__(self, store, symbol):
+        """
+        :param store: OHLCVStore
+        :param symbol: symbol name
+        """
+        self.data = store.open(symbol)
+
+    def bounds(self):
+        first, last = to_mpl_dates(self.data.date[[0, -1]])
+        return float(first), float(last)
+
+    def load(self, start, end):
+        lo, hi = np.searchsorted(self.data.date, from_mpl_dates([start, end]))
+        part = self.data[lo:hi]
+        x = to_mpl_dates(part.date)
+        return OHLCV(date=x, index=x,
+                     open=part.open,
+                     high=part.high,
+                     low=part.low,
+                     close=part.close,
+                     volume=part.volume)
+
+
+class CallableSource(object):
+    """ source calling a loader function, e.g. a database query """
+
+    def __init__(self, func, start, end):
+        """
+        :param func: func(start, end) returning the price data, as
+            accepted by candlestick_plot, of the bars with
+            start <= date < end, both given as numpy datetime64
+        :param start: first date of the history
+        :param end: last date of the history
+        """
+        self.func = func
+        self.start, self.end = to_mpl_dates([_datetime64(start), _datetime64(end)])
+
+    def bounds(self):
+        return float(self.start), float(self.end)
+
+    def load(self, start, end):
+        data, _ = _prepare_frame(self.func(*from_mpl_dates([start, end])))
+        lo, hi = np.searchsorted(data.index, [start, end])
+        return data[lo:hi]
+
+
+def as_source(data, symbol=None):
+    """ wrap data into a source
+    :param data: a source (anything with bounds and load), an OHLCVStore
+        together with symbol, or price data as accepted by candlestick_plot
+    :param symbol: symbol to read from an OHLCVStore
+    :return: source
+    """
+    if hasattr(data, 'bounds') and hasattr(data, 'load'):
+        return data
+    if isinstance(data, OHLCVStore):
+        if symbol is None:
+            raise ValueError('a symbol is needed to read from an OHLCVStore')
+        return StoreSource(data, symbol)
+    return FrameSource(data)
+
+
+class LazyChart(InteractiveChart):
+    """ interactive candlestick chart which only loads the bars around
+    the visible x range from a data source """
+
+    def __init__(self, source, symbol=None, start=None, end=None,
+                 chunks=256,
+                 max_bytes=64 * 1024 * 1024,
+                 margin=0.5,
+                 warmup=300,
+                 **kwargs):
+        """
+        :param source: data source, see as_source
+        :param symbol: symbol, when source is an OHLCVStore
+        :param start: first date shown initially, the start of the
+            history when None
+        :param end: last date shown initially, the end of the history
+            when None
+        :param chunks: number of chunks the history is divided into
+        :param max_bytes: memory budget of the chunk cache
+        :param margin: bars loaded beyond each edge of the view, as a
+            fraction of the visible range, so that small pans do not
+            need another load
+        :param warmup: number of bars loaded before the window for the
+            indicators to settle
+        :param kwargs: passed on to CandlestickChart
+        """
+        self.source = as_source(source, symbol)
+        self.chunk_cache = IndicatorCache(max_bytes=max_bytes)
+        self.chunks = chunks
+        self.margin = margin
+        self.warmup = warmup
+        InteractiveChart.__init__(self, **kwargs)
+        self._reset(start, end)
+
+    def update(self, source, symbol=None, start=None, end=None):
+        """ switch to another source and show it
+        :return: figure
+        """
+        self.source = as_source(source, symbol)
+        self.chunk_cache.clear()
+        self._reset(start, end)
+        return self.fig
+
+    def _reset(self, start, end):
+        first, last = self.source.bounds()
+        self.origin = first
+        self.chunk_span = (last - first) / self.chunks or 1.0
+        # the bar spacing of the raw data decides when chunks are
+        # aggregated. The chunk starting at the last bar holds only that
+        # one, so sample the chunk before it.
+        sample = self._chunk(max(int((last - first) // self.chunk_span) - 1, 0))
+        self.spacing = float(np.median(np.diff(sample.index))) if len(sample) > 1 else 0.0
+
+        left = first if start is None else to_mpl_dates([_datetime64(start)])[0]
+        right = last if end is None else to_mpl_dates([_datetime64(end)])[0]
+        self._shown = None
+        self.ax_price.set_xlim(left, right)
+        self.fig.canvas.draw_idle()
+
+    def _chunk(self, key, level=0):
+        """ bars of chunk `key` at a level of detail, through the chunk cache """
+        return self.chunk_cache.get(self._read_chunk, key, level)
+
+    def _read_chunk(self, key, level):
+        """ load chunk `key` and aggregate it to buckets of 2 ** level bar
+        spacings, level 0 keeps the raw bars """
+        start = self.origin + key * self.chunk_span
+        bars = self.source.load(start, start + self.chunk_span)
+        if level:
+            bars = aggregate_ohlcv(bars, self._width(level), origin=self.origin)
+        return bars
+
+    def _level(self, bucket):
+        """ level of detail of the coarsest buckets not wider than bucket """
+        if self.spacing <= 0 or bucket < 2 * self.spacing:
+            return 0
+        return int(np.floor(np.log2(bucket / self.spacing)))
+
+    def _width(self, level):
+        return self.spacing * 2 ** level
+
+    def show_window(self, left, right):
+        """ load, aggregate and show the bars between left and right """
+        max_bars = self._max_bars()
+        bucket = (right - left) / max_bars
+        margin = (right - left) * self.margin
+        bars = self._load(left - margin, right + margin, bucket)
+        if len(bars) == 0:
+            return
+
+        indicators = compute_all(bars.low, bars.high, bars.close,
+                                 smas=self.smas,
+                                 rsi_setup=self.rsi_setup,
+                                 macd_setup=self.macd_setup,
+                                 bbands_setup=self.bbands_setup,
+                                 sstoch_setup=self.sstoch_setup)
+        # the margins only serve the loads and the indicator warmup, the
+        # bars shown are those in view and one beyond each edge
+        start = max(np.searchsorted(bars.index, left, side='left') - 1, 0)
+        end = min(np.searchsorted(bars.index, right, side='right') + 1, len(bars))
+        if end - start < 1:
+            return
+        columns = dict((name, values[start:end]) for name, values in indicators.columns.items())
+        self._show(bars[start:end], columns)
+
+    def _load(self, start, end, bucket):
+        """ bars with start <= date < end preceded by `warmup` bars, at
+        the raw resolution or aggregated to the level of detail of
+        bucket when that is coarser
+        :return: OHLCV
+        """
+        level = self._level(bucket)
+        step = self._width(level)
+        first = int(np.floor((start - self.warmup * step - self.origin) / self.chunk_span))
+        last = int(np.floor((end - self.origin) / self.chunk_span))
+        parts = []
+        for key in range(max(first, 0), min(last, self.chunks) + 1):
+            chunk = self._chunk(key, level)
+            if len(chunk):
+                parts.append(chunk)
+        if not parts:
+            empty = np.empty(0)
+            return OHLCV(empty, empty, empty, empty)
+
+        bars = concat(parts)
+        if level:
+            # merge the buckets which straddle two chunks
+            bars = aggregate_ohlcv(bars, self._width(level), origin=self.origin)
+        lo, hi = np.searchsorted(bars.index, [start, end])
+        return bars[max(lo - self.warmup, 0):hi]
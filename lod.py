@@ -0,0 +1,159 @@
+"""
+    Level of detail helpers. A chart axis is only a few thousand
+    pixels wide, so drawing more bars than there are pixel columns
+    only costs time without adding any information. The functions
+    here shrink the data to roughly one bar per pixel column while
+    keeping the visible shape of the series intact.
+"""
+import numpy as np
+
+from finplots.ohlcv import OHLCV
+from finplots.ohlcv import as_ohlcv
+
+
+def auto_max_bars(fig, left=0.0, right=1.0):
+    """ number of pixel columns available for the main axis
+    :param fig: matplotlib figure
+    :param left: left edge of the axis as a fraction of figure width
+    :param right: right edge of the axis as a fraction of figure width
+    :return: int
+    """
+    return max(int(fig.get_figwidth() * fig.dpi * (right - left)), 1)
+
+
+def _bucket_bounds(n, max_bars):
+    """ start and end (inclusive) positions of every bucket
+    :param n: number of rows
+    :param max_bars: maximum number of buckets
+    :return: (starts, ends) integer arrays
+    """
+    step = int(np.ceil(n / float(max_bars)))
+    starts = np.arange(0, n, step)
+    ends = np.minimum(starts + step, n) - 1
+    return starts, ends
+
+
+def resample_ohlcv(df, max_bars):
+    """ aggregate consecutive rows so that at most max_bars bars remain.
+    Each bar takes the first open, max high, min low, last close and
+    the summed volume of the rows it replaces. The date and index of
+    a bar are the ones of its first row.
+
+    :param df: price data accepted by as_ohlcv
+    :param max_bars: maximum number of bars to keep
+    :return: OHLCV
+    """
+    df = as_ohlcv(df)
+    n = len(df)
+    if max_bars is None or n <= max_bars:
+        return df
+
+    starts, ends = _bucket_bounds(n, max_bars)
+    volume = None
+    if 'volume' in df:
+        volume = np.add.reduceat(df.volume, starts)
+    return OHLCV(date=None if df.date is None else df.date[starts],
+                 index=df.index[starts],
+                 open=df.open[starts],
+                 high=np.maximum.reduceat(df.high, starts),
+                 low=np.minimum.reduceat(df.low, starts),
+                 close=df.close[ends],
+                 volume=volume)
+
+
+def bucket_keys(x, width, origin=0.0):
+    """ number of the bucket of width, counted from origin, every x
+    falls into. A bar dated on a bucket boundary can come out a hair
+    short of it as a date number, so keys are rounded up within a
+    millionth of a bucket.
+
+    :param x: index values
+    :param width: bucket width in index units
+    :param origin: index value of a bucket boundary
+    :return: float array of bucket numbers
+    """
+    return np.floor((np.asarray(x, dtype=float) - origin) / width + 1e-6)
+
+
+def aggregate_ohlcv(df, width, origin=0.0):
+    """ aggregate rows into bars of a fixed width on the x axis, e.g.
+    minute bars into hourly ones. Buckets are aligned on origin, so data
+    aggregated in pieces lines up. Empty buckets produce no bar. Each bar
+    takes the first open, max high, min low, last close and the summed
+    volume of its rows, and the date and index of its first row.
+
+    :param df: price data accepted by as_ohlcv, sorted by index
+    :param width: bucket width in index units (days for date numbers)
+    :param origin: index value of a bucket boundary
+    :return: OHLCV
+    """
+    df = as_ohlcv(df)
+    if len(df) == 0:
+        return df
+    keys = bucket_keys(df.index, width, origin)
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+    if len(starts) == len(df):
+        return df
+    ends = np.concatenate([starts[1:], [len(df)]]) - 1
+    volume = None
+    if 'volume' in df:
+        volume = np.add.reduceat(df.volume, starts)
+    return OHLCV(date=None if df.date is None else df.date[starts],
+                 index=df.index[starts],
+                 open=df.open[starts],
+                 high=np.maximum.reduceat(df.high, starts),
+                 low=np.minimum.reduceat(df.low, starts),
+                 close=df.close[ends],
+                 volume=volume)
+
+
+def align(x, series):
+    """ right align a series which is shorter than x, padding the
+    leading positions with NaN. Indicators like SMA loose their
+    first period - 1 values, this puts them back on the x grid.
+
+    :param x: x axis series
+    :param series: indicator values
+    :return: float array with len(x) elements
+    """
+    series = np.asarray(series, dtype=float)
+    if len(series) == len(x):
+        return series
+    out = np.full(len(x), np.nan)
+    out[len(x) - len(series):] = series
+    return out
+
+
+def decimate_minmax(x, max_points, *series):
+    """ min/max envelope decimation of one or more series sharing x.
+    Every bucket is reduced to two points placed at the first and the
+    last x of the bucket, holding the minimum and the maximum of the
+    bucket in the order in which the series moves through them. Spikes
+    are therefore never lost, as they would be with plain striding.
+
+    :param x: x axis series
+    :param max_points: maximum number of buckets
+    :param series: indicator values, right aligned to x
+    :return: tuple (x, series1, series2, ...)
+    """
+    n = len(x)
+    aligned = [align(x, s) for s in series]
+    if max_points is None or n <= 2 * max_points:
+        return (np.asarray(x),) + tuple(aligned)
+
+    starts, ends = _bucket_bounds(n, max_points)
+    x = np.asarray(x)
+    out_x = np.empty(2 * len(starts), dtype=x.dtype)
+    out_x[0::2] = x[starts]
+    out_x[1::2] = x[ends]
+
+    result = [out_x]
+    for s in aligned:
+        lo = np.fmin.reduceat(s, starts)
+        hi = np.fmax.reduceat(s, starts)
+        rising = s[ends] >= s[starts]
+        out = np.empty(2 * len(starts))
+        out[0::2] = np.where(rising, lo, hi)
+        out[1::2] = np.where(rising, hi, lo)
+        result.append(out)
+    return tuple(result)
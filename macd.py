@@ -1,43 +1,70 @@
-import matplotlib.pyplot as plt
-import pandas as pd
 import matplotlib.ticker as mticker
+from matplotlib.artist import setp
 
-from finfunctions import moving_average_convergence_divergence
-from finfunctions import exponential_moving_average
+from finplots.indicators import moving_average_convergence_divergence
+from finplots.indicators import exponential_moving_average
 
 from finplots import style
+from finplots.cache import indicator_cache
+from finplots.lod import decimate_minmax
+from finplots.ohlcv import as_ohlcv
+from finplots.themes import cached_kwargs
+from finplots.themes import style_panel
 
-def plot_macd(ax, df, style=style, slow=26, fast=12, ema=9):
+def plot_macd(ax, df, style=style, slow=26, fast=12, ema=9, max_points=None, indicators=None):
     """ plot macd given axis and dataframe
     :param ax: matplotlib axis
     :param df: dataframe object containing prices
     :param style: style
+    :param max_points: decimate the macd lines to this many x buckets
+    :param indicators: IndicatorSet holding the macd, computed when None
     :return: axis
     """
-    ema_fast, ema_slow, macd = moving_average_convergence_divergence(df.close)
-    ema9 = exponential_moving_average(macd, ema)
+    x, macd, ema9 = _macd_data(df, slow, fast, ema, max_points=max_points, indicators=indicators)
     legend_text = 'MACD %s, %s, %s' % (str(slow), str(fast), str(ema))
-    ax = _plot_macd(ax, df.index, macd, ema9,
-                    macd_line_color=style.macd_line_color,
-                    macd_line_width=style.macd_line_width,
-                    signal_line_color=style.macd_signal_line_color,
-                    signal_line_width=style.macd_signal_line_width,
-                    fill_color=style.macd_div_fill_color,
-                    edge_color=style.macd_div_edge_color,
-                    div_alpha=style.macd_div_alpha,
-                    label_color=style.macd_label_color,
-                    spine_color=style.macd_spine_color,
-                    tick_color=style.macd_tick_color,
-                    text_color=style.macd_text_color,
-                    grid_color=style.macd_grid_color,
-                    grid_alpha=style.macd_grid_alpha,
+    ax = _plot_macd(ax, x, macd, ema9,
                     legend_text = legend_text,
-                    legend_text_x=style.macd_legend_text_x,
-                    legend_text_y=style.legend_text_y
+                    **_macd_kwargs(style)
                     )
     # ax = _plot_macd(ax, df.index, macd, ema9)
     return ax
 
+
+def _macd_data(df, slow, fast, ema, max_points=None, indicators=None):
+    """ compute macd and its signal line from the close prices, or take
+    them from a precomputed IndicatorSet
+    :return: (x, macd, signal)
+    """
+    df = as_ohlcv(df)
+    lines = indicators.macd(slow, fast, ema) if indicators is not None else None
+    if lines is None:
+        ema_fast, ema_slow, macd = indicator_cache.get(moving_average_convergence_divergence, df.close,
+                                                       slow=slow,
+                                                       fast=fast)
+        lines = macd, indicator_cache.get(exponential_moving_average, macd, ema)
+    macd, ema9 = lines
+    return decimate_minmax(df.index, max_points, macd, ema9)
+
+
+@cached_kwargs
+def _macd_kwargs(style):
+    """ resolve _plot_macd style arguments from the style object """
+    return dict(macd_line_color=style.macd_line_color,
+                macd_line_width=style.macd_line_width,
+                signal_line_color=style.macd_signal_line_color,
+                signal_line_width=style.macd_signal_line_width,
+                fill_color=style.macd_div_fill_color,
+                edge_color=style.macd_div_edge_color,
+                div_alpha=style.macd_div_alpha,
+                label_color=style.macd_label_color,
+                spine_color=style.macd_spine_color,
+                tick_color=style.macd_tick_color,
+                text_color=style.macd_text_color,
+                grid_color=style.macd_grid_color,
+                grid_alpha=style.macd_grid_alpha,
+                legend_text_x=style.macd_legend_text_x,
+                legend_text_y=style.legend_text_y)
+
 def _plot_macd(ax, x, macd, ema,
                macd_line_color='yellow',
                macd_line_width=1.5,
@@ -75,25 +102,14 @@ def _plot_macd(ax, x, macd, ema,
     div = macd - ema
     ax.fill_between(x, div, 0, facecolor=fill_color, edgecolor=edge_color, alpha=div_alpha)
 
-    ax.yaxis.label.set_color(label_color)
-
-    # spine colors
-    ax.spines['bottom'].set_color(spine_color)
-    ax.spines['top'].set_color(spine_color)
-    ax.spines['left'].set_color(spine_color)
-    ax.spines['right'].set_color(spine_color)
-
-    # tick params color
-    ax.tick_params(axis='y', colors=tick_color)
-    ax.tick_params(axis='x', colors=tick_color)
-
-    # show tick params on right axis as well
-    ax.tick_params(labelright=True)
-
-    # plot the grids.
-    ax.grid(True, alpha=grid_alpha, color=grid_color)
-    plt.ylabel('MACD', color=label_color)
-    plt.setp(ax.get_xticklabels(), visible=False)
+    # label, spine, tick and grid colors
+    style_panel(ax, 'MACD',
+                label_color=label_color,
+                spine_color=spine_color,
+                tick_color=tick_color,
+                grid_color=grid_color,
+                grid_alpha=grid_alpha)
+    setp(ax.get_xticklabels(), visible=False)
 
     return ax
 
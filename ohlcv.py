@@ -0,0 +1,124 @@
+"""
+    Lightweight columnar OHLCV container. It holds one array per column
+    and is what the chart code works on internally. It can be built
+    without copying from a DataFrame, a NumPy structured array or a
+    dict of arrays, and slicing it (including reversing it) only creates
+    views on the original arrays.
+"""
+import sys
+
+import numpy as np
+
+from finplots.dates import frame_dates
+
+COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+PRICES = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _float_column(values):
+    """ float64 view of a column, converting only when needed """
+    if values is None:
+        return None
+    return np.asarray(values, dtype=np.float64)
+
+
+class OHLCV(object):
+    """ columnar ohlcv data sharing a common index
+
+    Columns are attributes holding NumPy arrays, the prices as float64.
+    `index` is the x coordinate of every bar and defaults to the dates.
+    """
+
+    def __init__(self, open, high, low, close, volume=None, date=None, index=None):
+        self.date = None if date is None else np.asarray(date)
+        self.open = _float_column(open)
+        self.high = _float_column(high)
+        self.low = _float_column(low)
+        self.close = _float_column(close)
+        self.volume = _float_column(volume)
+        if index is None:
+            index = self.date if self.date is not None else np.arange(len(self.close))
+        self.index = np.asarray(index)
+
+    def __len__(self):
+        return len(self.close)
+
+    def __contains__(self, name):
+        return name in COLUMNS and getattr(self, name) is not None
+
+    def __getitem__(self, key):
+        """ a column by name, or a new container for a slice or an
+        index array. Slices give views, index arrays give copies. """
+        if isinstance(key, str):
+            if key not in self:
+                raise KeyError(key)
+            return getattr(self, key)
+        return OHLCV(date=None if self.date is None else self.date[key],
+                     index=self.index[key],
+                     **dict((name, None if getattr(self, name) is None else getattr(self, name)[key])
+                            for name in PRICES))
+
+    @property
+    def nbytes(self):
+        arrays = [getattr(self, name) for name in COLUMNS] + [self.index]
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def to_frame(self):
+        """ copy the data into a DataFrame indexed by `index` """
+        data = dict((name, getattr(self, name)) for name in COLUMNS if name in self)
+        import pandas as pd
+        return pd.DataFrame(data, index=self.index, columns=[c for c in COLUMNS if c in data])
+
+
+def concat(parts):
+    """ join OHLCV containers end to end into one with copied columns.
+    A column is kept only when every part has it.
+    :param parts: sequence of OHLCV
+    :return: OHLCV
+    """
+    parts = list(parts)
+    if len(parts) == 1:
+        return parts[0]
+
+    def join(name):
+        columns = [getattr(part, name) for part in parts]
+        if any(column is None for column in columns):
+            return None
+        return np.concatenate(columns)
+    return OHLCV(index=np.concatenate([part.index for part in parts]),
+                 **dict((name, join(name)) for name in COLUMNS))
+
+
+def _is_frame(data, kind='DataFrame'):
+    """ isinstance check against a pandas type which does not import
+    pandas: when pandas has not been imported, data cannot be one """
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(data, getattr(pd, kind))
+
+
+def as_ohlcv(data):
+    """ wrap price data into an OHLCV container without copying
+    float64 columns
+
+    :param data: OHLCV, DataFrame, structured array with named fields
+        or dict of arrays. The dates come from a date column or from a
+        DatetimeIndex.
+    :return: OHLCV
+    """
+    if isinstance(data, OHLCV):
+        return data
+
+    if _is_frame(data):
+        date = None
+        if 'date' in data or _is_frame(data.index, 'DatetimeIndex'):
+            date = frame_dates(data)
+        columns = dict((name, data[name].values) for name in PRICES if name in data)
+        return OHLCV(date=date, index=data.index.values, **columns)
+
+    if isinstance(data, np.ndarray) and data.dtype.names:
+        names = data.dtype.names
+        columns = dict((name, data[name]) for name in PRICES if name in names)
+        return OHLCV(date=data['date'] if 'date' in names else None, **columns)
+
+    columns = dict((name, data[name]) for name in PRICES if name in data)
+    return OHLCV(date=data['date'] if 'date' in data else None, **columns)
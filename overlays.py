@@ -5,25 +5,50 @@
     plotted. They are co-plotted on an existing axis just to
     make the more insight to the main data.
 """
-import matplotlib.pyplot as plt
+import numpy as np
 import matplotlib.ticker as mticker
-from finfunctions import simple_moving_average
-from finfunctions import bollinger_bands
+import matplotlib.colors as mcolors
+from matplotlib.collections import PolyCollection
+from finplots.indicators import simple_moving_average
+from finplots.indicators import bollinger_bands
 
 from finplots import style
+from finplots.cache import indicator_cache
+from finplots.lod import decimate_minmax
+from finplots.lod import resample_ohlcv
+from finplots.ohlcv import as_ohlcv
+from finplots.themes import cached_kwargs
 
 
-def plot_sma(ax, df, period, color='cyan', style=style):
-    sma = simple_moving_average(df.close, period=period)
+def plot_sma(ax, df, period, color='cyan', style=style, max_points=None, indicators=None):
+    x, sma = _sma_data(df, period, max_points=max_points, indicators=indicators)
     legend_text = '%s SMA' % str(period)
-    ax = _plot_sma(ax, df.index, sma,
+    ax = _plot_sma(ax, x, sma,
                    color=color,
-                   line_width=style.sma_linewidth,
-                   alpha=style.sma_alpha,
-                   legend_text=legend_text)
+                   legend_text=legend_text,
+                   **_sma_kwargs(style))
     return ax
 
 
+def _sma_data(df, period, max_points=None, indicators=None):
+    """ compute the sma of the close prices, or take it from a
+    precomputed IndicatorSet
+    :return: (x, sma)
+    """
+    df = as_ohlcv(df)
+    sma = indicators.sma(period) if indicators is not None else None
+    if sma is None:
+        sma = indicator_cache.get(simple_moving_average, df.close, period=period)
+    return decimate_minmax(df.index, max_points, sma)
+
+
+@cached_kwargs
+def _sma_kwargs(style):
+    """ resolve _plot_sma style arguments from the style object """
+    return dict(line_width=style.sma_linewidth,
+                alpha=style.sma_alpha)
+
+
 def _plot_sma(ax, x, sma,
               color='cyan',
               line_width=1,
@@ -40,84 +65,159 @@ def _plot_sma(ax, x, sma,
     """
     ax.plot(x[-len(sma):], sma, color, label=legend_text, linewidth=line_width, alpha=alpha)
     if legend_text is not None:
-        plt.legend(loc=0, fancybox=True)
+        ax.legend(loc=0, fancybox=True)
     return ax
 
 
-def plot_volume(ax, df, style=style):
-    ax = _plot_volume(ax, df.index, df.volume,
-                      spine_color=style.spine_color,
-                      fill_color=style.volume_fill_color,
-                      fill_alpha=style.volume_fill_alpha,
-                      edge_color=style.volume_edge_color,
-                      line_width=style.volume_line_width,
-                      color=style.volume_line_color,
-                      tick_color=style.tick_color)
+def plot_volume(ax, df, style=style, max_points=None):
+    x, volume, up = _volume_data(df, max_points=max_points)
+    ax = _plot_volume(ax, x, volume, up, **_volume_kwargs(style))
     return ax
 
-def _plot_volume(ax, x, volume,
-                spine_color='blue',
-                fill_color=None,
-                fill_alpha=0.5,
-                edge_color='yellow',
-                line_width=1,
-                color='yellow',
-                tick_color='white'):
-    """ overlay volume data on the given axis
-    :param df: pandas dataframe containing OHLC data
+
+def _volume_data(df, max_points=None):
+    """ volume of the bars on the x grid, summed over the bars merged by
+    the level of detail, and whether each bar closed up
+    :return: (x, volume, up)
+    """
+    bars = resample_ohlcv(df, max_points)
+    volume = bars.volume if 'volume' in bars else np.zeros(len(bars))
+    return bars.index, volume, bars.close >= bars.open
+
+
+@cached_kwargs
+def _volume_kwargs(style):
+    """ resolve _plot_volume style arguments from the style object """
+    return dict(up_color=style.volume_up_color,
+                down_color=style.volume_down_color,
+                alpha=style.volume_alpha,
+                height=style.volume_height,
+                width=style.volume_width)
+
+
+def _volume_vertices(x, volume, up=None,
+                     height=0.125,
+                     width=0.8,
+                     up_color='green',
+                     down_color='red',
+                     alpha=0.5,
+                     peak=None,
+                     spacing=None):
+    """ compute the bar vertices and colors of the volume overlay. x is
+    in data coordinates, y in axes coordinates with the highest bar
+    reaching `height`.
+    :param up: boolean array, True where the bar closed up. All bars
+        take up_color when None.
+    :param width: bar width as a fraction of the typical bar spacing
+    :param peak: volume reaching `height`, the highest volume when None
+    :param spacing: typical bar spacing, the median spacing of x when None
+    :return: (n, 4, 2) vertices, (n, 4) rgba colors
+    """
+    x = np.asarray(x, dtype=float)
+    volume = np.nan_to_num(np.asarray(volume, dtype=float))
+    if peak is None:
+        peak = volume.max() if len(volume) else 0.0
+    top = volume * (height / (peak if peak > 0 else 1.0))
+    if spacing is None:
+        spacing = np.median(np.diff(x)) if len(x) > 1 else 1.0
+    half = width * spacing / 2.0
+
+    verts = np.zeros((len(x), 4, 2))
+    verts[:, 0, 0] = verts[:, 1, 0] = x - half
+    verts[:, 2, 0] = verts[:, 3, 0] = x + half
+    verts[:, 1, 1] = verts[:, 2, 1] = top
+
+    colors = np.empty((len(x), 4))
+    colors[:] = mcolors.to_rgba(up_color, alpha)
+    if up is not None:
+        colors[~np.asarray(up, dtype=bool)] = mcolors.to_rgba(down_color, alpha)
+    return verts, colors
+
+
+def _plot_volume(ax, x, volume, up=None,
+                 up_color='green',
+                 down_color='red',
+                 alpha=0.5,
+                 height=0.125,
+                 width=0.8):
+    """ overlay volume bars along the bottom of the given axis. The bars
+    are a single collection in blended coordinates, x in data and y in
+    axes units, so they need no axis of their own and do not take part
+    in the y limits of the prices.
     :param ax: axis on which it has to be overlayed.
+    :param x: x of every bar
+    :param volume: volume of every bar
+    :param up: boolean array, True where the bar closed up
+    :param height: height of the highest bar as a fraction of the axis
+    :param width: bar width as a fraction of the typical bar spacing
     :return: axis
     """
-    axv = ax.twinx()
-    axv.fill_between(x, volume,
-                     facecolor=fill_color,
-                     alpha=fill_alpha,
-                     linewidth=line_width,
-                     color=color,
-                     edgecolor=edge_color)
-
-    # remove all the tick labels on the y-axis
-    axv.axes.yaxis.set_ticklabels([])
-
-    # set spine color, because it gets reset due to twinx
-    axv.spines['bottom'].set_color(spine_color)
-    axv.spines['top'].set_color(spine_color)
-    axv.spines['left'].set_color(spine_color)
-    axv.spines['right'].set_color(spine_color)
-
-    # limit the height pf the plot
-    axv.set_ylim(0, 8 * volume.max())
-    # axv.tick_params(axis='x', colors=style.tick_params_color)
-
-    # set tick colors because it gets reset due to twinx
-    axv.tick_params(axis='y', colors=tick_color)
+    verts, colors = _volume_vertices(x, volume, up,
+                                     height=height,
+                                     width=width,
+                                     up_color=up_color,
+                                     down_color=down_color,
+                                     alpha=alpha)
+    bars = PolyCollection(verts,
+                          facecolors=colors,
+                          edgecolors='none',
+                          antialiaseds=False,
+                          transform=ax.get_xaxis_transform(),
+                          zorder=1)
+    ax.add_collection(bars, autolim=False)
     return ax
 
 
-def plot_bollinger_bands(ax, df, period=20, multiplier=2):
+def plot_bollinger_bands(ax, df, period=20, multiplier=2, max_points=None, style=style, indicators=None):
     """ plot bollinger bands
     :param ax: mpl axis on which to plot
     :param df: dataframe object
     :param period: period for calculating bollinger bands
+    :param max_points: decimate the bands to this many x buckets
+    :param style: style object
+    :param indicators: IndicatorSet holding the bands, computed when None
     :return: axis
     """
-    lower, middle, upper = bollinger_bands(df.close, period=period, multiplier=multiplier)
+    x, lower, middle, upper = _bollinger_data(df, period, multiplier,
+                                              max_points=max_points,
+                                              indicators=indicators)
     legend_text = 'Bollinger Bands (%s, %s)' % (str(period), str(multiplier))
-    ax = _plot_bollinger_bands(ax, df.index, lower, middle, upper,
-                               mid_line_color=style.bbands_mid_line_color,
-                               mid_line_width=style.bbands_mid_line_width,
-                               fill_color=style.bbands_fill_color,
-                               fill_alpha=style.bbands_fill_alpha,
-                               edge_color=style.bbands_edge_color,
-                               edge_line_width=style.bbands_edge_line_width,
-                               text_color=style.bbands_text_color,
+    ax = _plot_bollinger_bands(ax, x, lower, middle, upper,
                                legend_text=legend_text,
-                               legend_text_x=style.bbands_legend_text_x,
-                               legend_text_y=style.bbands_legend_text_y)
+                               **_bollinger_kwargs(style))
 
     #ax = _plot_bollinger_bands(ax, df.index, lower, middle, upper)
     return ax
 
+
+def _bollinger_data(df, period, multiplier, max_points=None, indicators=None):
+    """ compute the bollinger bands of the close prices, or take them
+    from a precomputed IndicatorSet
+    :return: (x, lower, middle, upper)
+    """
+    df = as_ohlcv(df)
+    bands = indicators.bollinger_bands(period, multiplier) if indicators is not None else None
+    if bands is None:
+        bands = indicator_cache.get(bollinger_bands, df.close,
+                                    period=period,
+                                    multiplier=multiplier)
+    lower, middle, upper = bands
+    return decimate_minmax(df.index, max_points, lower, middle, upper)
+
+
+@cached_kwargs
+def _bollinger_kwargs(style):
+    """ resolve _plot_bollinger_bands style arguments from the style object """
+    return dict(mid_line_color=style.bbands_mid_line_color,
+                mid_line_width=style.bbands_mid_line_width,
+                fill_color=style.bbands_fill_color,
+                fill_alpha=style.bbands_fill_alpha,
+                edge_color=style.bbands_edge_color,
+                edge_line_width=style.bbands_edge_line_width,
+                text_color=style.bbands_text_color,
+                legend_text_x=style.bbands_legend_text_x,
+                legend_text_y=style.bbands_legend_text_y)
+
 def _plot_bollinger_bands(ax, x, lower, middle, upper,
                           mid_line_color='red',
                           mid_line_width=1,
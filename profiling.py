@@ -0,0 +1,193 @@
+"""
+    Per stage timing of the chart code. A Profiler records the wall
+    time and the memory allocated by every stage it is asked to time
+    (data preparation, each indicator, the artists of each panel, the
+    layout and the canvas draw) and hands the records over as a
+    ProfileReport, optionally passing each one to a callback as well.
+
+    Code paths take a profiler argument which defaults to NULL_PROFILER,
+    whose stages do nothing, so charts drawn without profiling do not
+    pay for it.
+"""
+import threading
+import time
+import tracemalloc
+
+
+class _NullStage(object):
+    """ context manager which does nothing """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullProfiler(object):
+    """ profiler which records nothing, used when profiling is off """
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Stage(object):
+    """ times one stage of a Profiler """
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit(self)
+        return False
+
+
+class Profiler(object):
+    """ record wall time and allocated memory per stage
+
+        profiler = Profiler()
+        with profiler.stage('indicators'):
+            ...
+        print(profiler.report())
+
+    Memory is traced with tracemalloc, which is started on the first
+    stage unless it is tracing already and stopped again by report().
+    Every record holds the net memory allocated by the stage and its
+    peak above the memory in use when the stage started. tracemalloc
+    counts the allocations of all threads, so stages which run
+    concurrently see each other's memory. Tracing slows down stages
+    which allocate a lot, notably the canvas draw; use memory=False
+    for accurate timings.
+    """
+    enabled = True
+
+    def __init__(self, memory=True, callback=None):
+        """
+        :param memory: trace memory as well as time
+        :param callback: called with every record as soon as its stage
+            ends, e.g. to forward it to a metrics system
+        """
+        self.memory = memory
+        self.callback = callback
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self._created = time.perf_counter()
+
+    def stage(self, name):
+        """ context manager timing the stage `name` """
+        return _Stage(self, name)
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _enter(self, stage):
+        stack = self._stack()
+        stage.depth = len(stack)
+        stage.peak = 0
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            stage.memory_start = tracemalloc.get_traced_memory()[0]
+            for outer in stack:
+                outer.peak = max(outer.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(stage)
+        stage.started = time.perf_counter()
+
+    def _exit(self, stage):
+        seconds = time.perf_counter() - stage.started
+        stack = self._stack()
+        stack.pop()
+        allocated = peak = 0
+        if self.memory:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            peak_abs = max(stage.peak, traced_peak)
+            allocated = current - stage.memory_start
+            peak = peak_abs - stage.memory_start
+            for outer in stack:
+                outer.peak = max(outer.peak, peak_abs)
+        record = dict(stage=stage.name,
+                      depth=stage.depth,
+                      start=stage.started - self._created,
+                      seconds=seconds,
+                      allocated=allocated,
+                      peak=peak)
+        with self._lock:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def report(self):
+        """ stop tracing memory, when the profiler started it
+        :return: ProfileReport of the records so far
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        with self._lock:
+            return ProfileReport(sorted(self.records, key=lambda r: r['start']))
+
+
+class ProfileReport(object):
+    """ records of a Profiler in the order in which their stages started
+
+    Each record is a dict with the stage name, its nesting depth, its
+    start in seconds after the profiler was created, the wall time in
+    seconds and the net allocated and peak memory in bytes.
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, name):
+        """ the record of stage `name` """
+        for record in self.records:
+            if record['stage'] == name:
+                return record
+        raise KeyError(name)
+
+    @property
+    def seconds(self):
+        """ wall time from the start of the first stage to the end of the
+        last one """
+        if not self.records:
+            return 0.0
+        return (max(r['start'] + r['seconds'] for r in self.records) -
+                min(r['start'] for r in self.records))
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.records, columns=['stage', 'depth', 'start', 'seconds', 'allocated', 'peak'])
+
+    def __str__(self):
+        lines = ['%-28s %10s %12s %12s' % ('stage', 'ms', 'alloc KiB', 'peak KiB')]
+        for r in self.records:
+            lines.append('%-28s %10.2f %12.1f %12.1f' % ('  ' * r['depth'] + r['stage'],
+                                                        r['seconds'] * 1000.0,
+                                                        r['allocated'] / 1024.0,
+                                                        r['peak'] / 1024.0))
+        lines.append('%-28s %10.2f' % ('total', self.seconds * 1000.0))
+        return '\n'.join(lines)
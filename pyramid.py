@@ -0,0 +1,252 @@
+"""
+    Multi timeframe OHLCV pyramid. The base bars (e.g. one minute) are
+    aggregated once into every coarser standard timeframe, each level
+    from the finest level it can be built from, so that switching a
+    chart between timeframes is a slice instead of a resample of the
+    whole history:
+
+        pyramid = OHLCVPyramid(minute_bars)
+        candlestick_plot(pyramid.window('1h', last=500))
+        pyramid.append(new_minute_bars)
+
+    Bars are aggregated with aggregate_ohlcv: first open, max high, min
+    low, last close and summed volume, in buckets aligned on midnight
+    (weeks on Monday midnight), dated by their first base bar. Levels
+    store their columns in arrays with spare capacity. Appending bars
+    only rebuilds the buckets they fall into, level by level, and
+    a bar dated like the last base bar replaces it, which is how a
+    forming bar is updated.
+
+    Windows are OHLCV views indexed by date numbers, which candlestick_plot
+    and the plot_* wrappers of overlays, rsi, macd and stochastics take
+    as they are. Views share memory with the pyramid, copy them to keep
+    them unchanged across appends.
+"""
+import numpy as np
+
+from finplots.candlestick import _prepare_frame
+from finplots.dates import to_mpl_dates
+from finplots.lod import aggregate_ohlcv
+from finplots.lod import bucket_keys
+from finplots.ohlcv import OHLCV
+from finplots.ohlcv import PRICES
+
+MINUTE = 1.0 / 1440
+
+# standard timeframes and their width in days
+TIMEFRAMES = (('1min', MINUTE),
+              ('5min', 5 * MINUTE),
+              ('15min', 15 * MINUTE),
+              ('30min', 30 * MINUTE),
+              ('1h', 60 * MINUTE),
+              ('4h', 240 * MINUTE),
+              ('1d', 1.0),
+              ('1w', 7.0))
+
+_COLUMNS = ('index',) + PRICES
+
+
+def _origin(width):
+    """ bucket boundary of a timeframe: midnight, or Monday midnight for
+    weeks """
+    monday = np.datetime64('1970-01-05') if width == 7.0 else np.datetime64('1970-01-01')
+    return float(to_mpl_dates([monday])[0])
+
+
+def _nests(fine, coarse):
+    """ whether every bucket of coarse is a union of buckets of fine """
+    ratio = coarse.width / fine.width
+    shift = (coarse.origin - fine.origin) / fine.width
+    return abs(ratio - round(ratio)) < 1e-9 and abs(shift - round(shift)) < 1e-6
+
+
+class _Level(object):
+    """ bars of one timeframe in columns with spare capacity """
+
+    def __init__(self, name, width, capacity=1024):
+        self.name = name
+        self.width = width
+        self.origin = _origin(width) if width else 0.0
+        # level the bars are aggregated from
+        self.source = None
+        self.size = 0
+        self._columns = dict((name, np.empty(capacity)) for name in _COLUMNS)
+
+    def key(self, x):
+        """ bucket number of date numbers """
+        return bucket_keys(x, self.width, self.origin)
+
+    def bucket_start(self, index, key):
+        """ position of the first of the sorted date numbers in index
+        which falls into bucket key or a later one """
+        # search from a bucket earlier, then settle it on the keys,
+        # which only have to be computed for that stretch
+        lo = np.searchsorted(index, self.origin + (key - 1) * self.width)
+        return lo + np.searchsorted(self.key(index[lo:]), key)
+
+    def column(self, name):
+        return self._columns[name][:self.size]
+
+    def truncate(self, size):
+        self.size = size
+
+    def extend(self, bars):
+        """ append the bars of an OHLCV """
+        size = self.size + len(bars)
+        capacity = len(self._columns['index'])
+        if size > capacity:
+            capacity = max(size, 2 * capacity)
+            for name, values in self._columns.items():
+                grown = np.empty(capacity)
+                grown[:self.size] = values[:self.size]
+                self._columns[name] = grown
+        for name in _COLUMNS:
+            self._columns[name][self.size:size] = getattr(bars, name)
+        self.size = size
+
+    def add_bar(self, x, open, high, low, close, volume):
+        """ fold a single bar later than the stored ones into the last
+        bar when it falls into the same bucket, append it otherwise """
+        columns = self._columns
+        last = self.size - 1
+        if self.size and self.key(x) == self.key(columns['index'][last]):
+            columns['high'][last] = max(columns['high'][last], high)
+            columns['low'][last] = min(columns['low'][last], low)
+            columns['close'][last] = close
+            columns['volume'][last] += volume
+        else:
+            self.extend(OHLCV(date=[x], index=[x], open=[open], high=[high],
+                              low=[low], close=[close], volume=[volume]))
+
+    def view(self, lo=0, hi=None):
+        """ OHLCV of views on bars lo to hi """
+        columns = dict((name, self.column(name)[lo:hi]) for name in _COLUMNS)
+        index = columns.pop('index')
+        return OHLCV(date=index, index=index, **columns)
+
+
+class OHLCVPyramid(object):
+    """ base bars together with their aggregation into coarser timeframes """
+
+    def __init__(self, df=None, timeframes=TIMEFRAMES, base=None):
+        """
+        :param df: base bars, as accepted by candlestick_plot
+        :param timeframes: (name, width in days) pairs of the levels
+        :param base: name of the base timeframe, the timeframe matching
+            the typical spacing of df when None, or 'base' when the bars
+            are finer than every timeframe. Only coarser timeframes get a
+            level.
+        """
+        self.timeframes = tuple(timeframes)
+        self.base_name = base
+        self.base = None
+        self.levels = {}
+        if df is not None:
+            self.append(df)
+
+    def _build(self, bars):
+        """ set up the levels from the first base bars """
+        if self.base_name is None:
+            spacing = float(np.median(np.diff(bars.index))) if len(bars) > 1 else MINUTE
+            # the coarsest timeframe not wider than the bar spacing
+            fitting = [name for name, width in self.timeframes if width <= spacing * (1 + 1e-6)]
+            self.base_name = fitting[-1] if fitting else 'base'
+        # a base finer than every timeframe gets them all as levels
+        base_width = dict(self.timeframes).get(self.base_name, 0.0)
+        self.base = _Level(self.base_name, 0.0, capacity=max(1024, 2 * len(bars)))
+        self.base.extend(bars)
+        self.levels = {self.base_name: self.base}
+
+        # every level aggregates the finest level built so far whose
+        # buckets nest into its own, the base bars when there is none
+        built = []
+        for name, width in sorted(self.timeframes, key=lambda item: item[1]):
+            if width <= base_width:
+                continue
+            level = _Level(name, width)
+            level.source = next((fine for fine in reversed(built) if _nests(fine, level)), self.base)
+            level.extend(aggregate_ohlcv(level.source.view(), width, origin=level.origin))
+            self.levels[name] = level
+            built.append(level)
+
+    def append(self, df):
+        """ add base bars later than the stored ones, a bar dated like
+        the last stored one replaces it
+        :param df: bars as accepted by candlestick_plot
+        """
+        bars, _ = _prepare_frame(df)
+        if len(bars) == 0:
+            return
+        if self.base is None or self.base.size == 0:
+            self._build(bars)
+            return
+
+        base = self.base
+        first = bars.index[0]
+        last = base.column('index')[-1]
+        if first < last:
+            raise ValueError('appended bars must not be earlier than the stored ones')
+        if first > last and len(bars) == 1:
+            # a new bar on its own only touches the last bucket of every
+            # level, which is updated in place
+            base.extend(bars)
+            values = [float(getattr(bars, name)[0]) for name in _COLUMNS]
+            for level in self.levels.values():
+                if level is not base:
+                    level.add_bar(*values)
+            return
+        if first == last:
+            base.truncate(base.size - 1)
+        base.extend(bars)
+
+        # finest first, so that every source is up to date when used
+        for level in self.levels.values():
+            if level is base:
+                continue
+            # drop the buckets the new bars fall into and rebuild them
+            # from the source level
+            key = level.key(first)
+            level.truncate(level.bucket_start(level.column('index'), key))
+            source = level.source
+            start = level.bucket_start(source.column('index'), key)
+            level.extend(aggregate_ohlcv(source.view(start), level.width, origin=level.origin))
+
+    def append_bar(self, date, open, high, low, close, volume=0.0):
+        """ add or replace a single base bar, see append """
+        self.append(dict(date=[date], open=[open], high=[high], low=[low],
+                         close=[close], volume=[volume]))
+
+    def timeframe_names(self):
+        """ :return: names of the levels, finest first """
+        return sorted(self.levels, key=lambda name: self.levels[name].width)
+
+    def window(self, timeframe, start=None, end=None, last=None, warmup=0):
+        """ bars of a timeframe between two dates
+
+        :param timeframe: name of the level, see timeframe_names
+        :param start: first date, the start of the history when None
+        :param end: last date (inclusive), the end of the history when None
+        :param last: keep only this many of the most recent bars of
+            the window
+        :param warmup: number of bars before the window included for
+            indicators to settle
+        :return: OHLCV of views indexed by date numbers
+        """
+        try:
+            level = self.levels[timeframe]
+        except KeyError:
+            raise KeyError('unknown timeframe %r, the pyramid has %s'
+                           % (timeframe, ', '.join(self.timeframe_names())))
+        index = level.column('index')
+        lo, hi = 0, level.size
+        if start is not None:
+            lo = np.searchsorted(index, to_mpl_dates([start])[0])
+        if end is not None:
+            hi = np.searchsorted(index, to_mpl_dates([end])[0], side='right')
+        if last is not None:
+            lo = max(lo, hi - last)
+        return level.view(max(lo - warmup, 0), hi)
+
+    @property
+    def nbytes(self):
+        return sum(level.size * len(_COLUMNS) * 8 for level in self.levels.values())
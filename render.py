@@ -0,0 +1,60 @@
+"""
+    Headless rendering of figures into memory or file objects, for
+    processes like chart servers which never show a window. Figures
+    are drawn on the Agg canvas and closed as soon as they are encoded
+    so that a long running process does not accumulate figures.
+
+    new_figure creates figures on the Agg canvas without going through
+    pyplot, so headless code neither imports pyplot nor selects a GUI
+    backend, and its figures are never registered with pyplot. The
+    figure and canvas modules are imported on first use.
+"""
+import io
+import sys
+
+
+def new_figure(figsize=None, facecolor=None):
+    """ figure drawn on the Agg canvas, unknown to pyplot
+    :param figsize: (width, height) in inches, the rcParams default when None
+    :param facecolor: figure background color
+    :return: figure
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, facecolor=facecolor)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def render_figure(fig, fmt='png', dpi=100, fp=None, close=True):
+    """ encode a figure as an image
+
+    :param fig: matplotlib figure
+    :param fmt: image format, e.g. 'png' or 'svg'
+    :param dpi: resolution of the image
+    :param fp: writable binary file object, when None the image is
+        rendered into an in-memory buffer
+    :param close: close the figure once it has been encoded
+    :return: image bytes, or None when written to fp
+    """
+    from matplotlib.backend_bases import FigureCanvasBase
+
+    try:
+        # savefig prints through a temporary canvas of the right type, so
+        # the canvas of a pyplot or GUI figure is left in place. Only a
+        # figure without any canvas of its own gets an Agg one.
+        if type(fig.canvas) is FigureCanvasBase:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            FigureCanvasAgg(fig)
+        buf = io.BytesIO() if fp is None else fp
+        fig.savefig(buf, format=fmt, dpi=dpi, facecolor=fig.get_facecolor())
+        if fp is None:
+            return buf.getvalue()
+        return None
+    finally:
+        # figures from new_figure are not registered with pyplot, and
+        # none are when pyplot was never imported
+        pyplot = sys.modules.get('matplotlib.pyplot')
+        if close and pyplot is not None:
+            pyplot.close(fig)
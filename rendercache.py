@@ -0,0 +1,243 @@
+"""
+    Content addressed disk cache of rendered charts.
+
+    A rendered chart is fully determined by the price data, the chart
+    arguments (indicator setups, style, figsize, ...) and the image
+    format and resolution. RenderCache hashes all of them into a key and
+    keeps the encoded image in a file named after it, so a repeated
+    request reads the file instead of drawing the chart again:
+
+        cache = RenderCache('/var/cache/finplots')
+        png = render_candlestick(df, cache=cache)
+
+    Files are written to a temporary name and renamed into place, so
+    readers never see a partial image, and several processes can share
+    one cache directory. Hits refresh the modification time of the file,
+    which is what the least recently used files are evicted by once the
+    directory grows beyond its byte budget. Eviction takes an advisory
+    lock where the platform has one, so that only one process trims the
+    directory at a time.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+from finplots.cache import fingerprint
+from finplots.ohlcv import COLUMNS
+from finplots.ohlcv import as_ohlcv
+
+# bump to invalidate existing cache directories when the drawing changes
+VERSION = 1
+
+# candlestick_plot arguments which do not change the image, apart from
+# the dpi of fig which is accounted for in the resolved max_bars
+_IGNORED = ('df', 'fig', 'show', 'workers', 'profile')
+
+_LOCK = '.lock'
+
+_signature = None
+
+
+def _plot_arguments(kwargs):
+    """ candlestick_plot arguments with their defaults filled in, so that
+    passing a default explicitly gives the same key as omitting it, and
+    with max_bars='auto' replaced by the number of bars it stands for """
+    global _signature
+    if _signature is None:
+        import inspect
+        from finplots.candlestick import candlestick_plot
+        _signature = inspect.signature(candlestick_plot)
+    bound = _signature.bind(None, **kwargs)
+    bound.apply_defaults()
+    arguments = dict((name, value) for name, value in bound.arguments.items() if name not in _IGNORED)
+    if arguments['max_bars'] == 'auto':
+        arguments['max_bars'] = _auto_max_bars(arguments['figsize'], kwargs.get('fig'))
+    return arguments
+
+
+def _auto_max_bars(figsize, fig):
+    """ max_bars='auto' as candlestick_plot resolves it. The figure is
+    resized to figsize but keeps its dpi, which therefore decides the
+    level of detail of the image along with the width. """
+    from finplots.candlestick import LAYOUT
+    if fig is None:
+        import matplotlib
+        dpi = matplotlib.rcParams['figure.dpi']
+    else:
+        dpi = fig.dpi
+    return max(int(figsize[0] * dpi * (LAYOUT['right'] - LAYOUT['left'])), 1)
+
+
+def _style_digest(style):
+    """ digest of the values of a style, cached on the compiled style """
+    from finplots.themes import _ATTRIBUTES
+    from finplots.themes import compile_style
+
+    def build(style):
+        values = repr(tuple(getattr(style, attr) for attr in _ATTRIBUTES))
+        return hashlib.blake2b(values.encode(), digest_size=16).hexdigest()
+    return compile_style(style).bundle('render_cache_digest', build)
+
+
+def render_key(df, fmt='png', dpi=100, **kwargs):
+    """ cache key of a chart rendered by render_candlestick
+    :param df: price data as accepted by candlestick_plot
+    :param fmt: image format
+    :param dpi: resolution of the image
+    :param kwargs: candlestick_plot arguments
+    :return: hex digest
+    """
+    data = as_ohlcv(df)
+    arguments = _plot_arguments(kwargs)
+    style = arguments.pop('style')
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((VERSION, fmt, dpi, sorted(arguments.items()))).encode())
+    digest.update(_style_digest(style).encode())
+    for name in COLUMNS:
+        digest.update(fingerprint(getattr(data, name)).encode())
+    return digest.hexdigest()
+
+
+class RenderCache(object):
+    """ disk cache of encoded chart images bounded by a byte budget """
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        """
+        :param root: cache directory, created when missing
+        :param max_bytes: size of the cached images beyond which the
+            least recently used ones are removed
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(root):
+            os.makedirs(root, exist_ok=True)
+        # bytes in the directory as far as this process knows, other
+        # processes add to it unseen until the next trim rescans
+        self.nbytes = sum(size for _, _, size in self._files())
+
+    def _path(self, key, fmt):
+        return os.path.join(self.root, key[:2], '%s.%s' % (key, fmt))
+
+    def _files(self):
+        """ :return: list of (mtime, path, size) of the cached images """
+        files = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            for item in os.scandir(entry.path):
+                if item.name.startswith('.'):
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, item.path, stat.st_size))
+        return files
+
+    def get(self, key, fmt='png'):
+        """ cached image bytes, None on a miss """
+        path = self._path(key, fmt)
+        try:
+            with open(path, 'rb') as fp:
+                image = fp.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # also when another process evicted it between read and utime
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return image
+
+    def put(self, key, image, fmt='png'):
+        """ store image bytes and evict old images beyond the byte budget """
+        if len(image) > self.max_bytes:
+            return
+        path = self._path(key, fmt)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        handle, tmp = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as fp:
+                fp.write(image)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        with self._lock:
+            self.nbytes += len(image)
+            full = self.nbytes > self.max_bytes
+        if full:
+            self.trim()
+
+    def trim(self):
+        """ remove the least recently used images until the directory
+        fits the byte budget """
+        with open(os.path.join(self.root, _LOCK), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            files = sorted(self._files())
+            total = sum(size for _, _, size in files)
+            for _, path, size in files:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        with self._lock:
+            self.nbytes = total
+
+    def render(self, df, fmt='png', dpi=100, fp=None, **kwargs):
+        """ image of the chart, from the cache or rendered and stored
+        :param kwargs: passed on to render_candlestick
+        :return: image bytes, or None when written to fp
+        """
+        key = render_key(df, fmt=fmt, dpi=dpi, **kwargs)
+        image = self.get(key, fmt)
+        if image is None:
+            from finplots.candlestick import render_candlestick
+            image = render_candlestick(df, fmt=fmt, dpi=dpi, **kwargs)
+            self.put(key, image, fmt)
+        if fp is None:
+            return image
+        fp.write(image)
+        return None
+
+    def clear(self):
+        """ remove all images and reset the counters """
+        with open(os.path.join(self.root, _LOCK), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            for _, path, _ in self._files():
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ hit/miss counters and disk usage of the cache
+        :return: dict
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return dict(hits=self.hits,
+                        misses=self.misses,
+                        hit_rate=float(self.hits) / total if total else 0.0,
+                        nbytes=self.nbytes,
+                        max_bytes=self.max_bytes)
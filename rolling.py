@@ -0,0 +1,242 @@
+"""
+    Incremental indicator state for streaming charts. Every indicator
+    keeps just enough state to produce its next value in constant time
+    when a bar is appended, and to revise its latest value when the
+    forming bar changes because a tick was folded into it.
+
+    append(...) commits the previous bar and adds a new one,
+    amend(...) replaces the values of the latest bar.
+"""
+import math
+from collections import deque
+
+nan = float('nan')
+
+
+class RollingSMA(object):
+    """ simple moving average over the last `period` values """
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+
+    def append(self, value):
+        self.window.append(value)
+        self.total += value
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        return self.value
+
+    def amend(self, value):
+        self.total += value - self.window[-1]
+        self.window[-1] = value
+        return self.value
+
+    @property
+    def value(self):
+        if len(self.window) < self.period:
+            return nan
+        return self.total / self.period
+
+
+class RollingBollinger(object):
+    """ bollinger bands from a running sum and sum of squares """
+
+    def __init__(self, period=20, multiplier=2):
+        self.period = period
+        self.multiplier = multiplier
+        self.window = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def append(self, value):
+        self.window.append(value)
+        self.total += value
+        self.total_sq += value * value
+        if len(self.window) > self.period:
+            old = self.window.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        return self.value
+
+    def amend(self, value):
+        old = self.window[-1]
+        self.total += value - old
+        self.total_sq += value * value - old * old
+        self.window[-1] = value
+        return self.value
+
+    @property
+    def value(self):
+        """ (lower, middle, upper) """
+        if len(self.window) < self.period:
+            return nan, nan, nan
+        mean = self.total / self.period
+        std = math.sqrt(max(self.total_sq / self.period - mean * mean, 0.0))
+        return mean - self.multiplier * std, mean, mean + self.multiplier * std
+
+
+class RollingEMA(object):
+    """ exponential moving average seeded with the first value """
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self._prev = None
+        self.value = nan
+
+    def append(self, value):
+        self._prev = None if self.value != self.value else self.value
+        return self.amend(value)
+
+    def amend(self, value):
+        if self._prev is None:
+            self.value = value
+        else:
+            self.value = self._prev + self.alpha * (value - self._prev)
+        return self.value
+
+
+class RollingRSI(object):
+    """ relative strength index with Wilder smoothing, seeded with the
+    mean gain and loss of the first `period` changes """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.count = 0
+        self.close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        # state before the latest bar, needed to amend it
+        self._committed = (None, 0.0, 0.0)
+
+    def append(self, close):
+        self._committed = (self.close, self.avg_gain, self.avg_loss)
+        self.count += 1
+        return self._update(close)
+
+    def amend(self, close):
+        return self._update(close)
+
+    def _update(self, close):
+        prev_close, avg_gain, avg_loss = self._committed
+        self.close = close
+        if prev_close is None:
+            return nan
+        change = close - prev_close
+        # a running mean over the first `period` changes seeds the
+        # averages, wilder's smoothing takes over from there
+        alpha = 1.0 / min(self.count - 1, self.period)
+        self.avg_gain = avg_gain + alpha * (max(change, 0.0) - avg_gain)
+        self.avg_loss = avg_loss + alpha * (max(-change, 0.0) - avg_loss)
+        return self.value
+
+    @property
+    def value(self):
+        if self.count <= self.period:
+            return nan
+        if self.avg_loss == 0:
+            return 100.0 if self.avg_gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+
+class RollingMACD(object):
+    """ macd line (fast ema - slow ema) and its signal ema """
+
+    def __init__(self, slow=26, fast=12, ema=9):
+        self.fast = RollingEMA(fast)
+        self.slow = RollingEMA(slow)
+        self.signal = RollingEMA(ema)
+
+    def append(self, close):
+        macd = self.fast.append(close) - self.slow.append(close)
+        return macd, self.signal.append(macd)
+
+    def amend(self, close):
+        macd = self.fast.amend(close) - self.slow.amend(close)
+        return macd, self.signal.amend(macd)
+
+
+class RollingStochastic(object):
+    """ slow stochastic: %K is the smoothed fast stochastic,
+    %D the moving average of %K """
+
+    def __init__(self, period=14, smoothing=3):
+        self.period = period
+        self.highs = deque(maxlen=period)
+        self.lows = deque(maxlen=period)
+        self.k = RollingSMA(smoothing)
+        self.d = RollingSMA(smoothing)
+        self._fed_d = False
+
+    def _fast_k(self, close):
+        if len(self.highs) < self.period:
+            return nan
+        lowest = min(self.lows)
+        spread = max(self.highs) - lowest
+        if spread == 0:
+            return 50.0
+        return 100.0 * (close - lowest) / spread
+
+    def append(self, high, low, close):
+        self.highs.append(high)
+        self.lows.append(low)
+        fast_k = self._fast_k(close)
+        if fast_k != fast_k:
+            self._fed_d = False
+            return nan, nan
+        k = self.k.append(fast_k)
+        self._fed_d = k == k
+        return k, self.d.append(k) if self._fed_d else nan
+
+    def amend(self, high, low, close):
+        self.highs[-1] = high
+        self.lows[-1] = low
+        fast_k = self._fast_k(close)
+        if fast_k != fast_k:
+            return nan, nan
+        k = self.k.amend(fast_k)
+        return k, self.d.amend(k) if self._fed_d else nan
+
+
+class IndicatorState(object):
+    """ rolling state of every indicator shown by a candlestick chart
+
+    append/amend return a dict of column name -> latest value with
+    sma_<period>, bb_lower, bb_middle, bb_upper, rsi, macd,
+    macd_signal, sstoch_k and sstoch_d entries.
+    """
+
+    def __init__(self,
+                 smas=[100, 50, 5, 10],
+                 rsi_setup=dict(period=14),
+                 macd_setup=dict(slow=26, fast=12, ema=8),
+                 bbands_setup=dict(period=20, multiplier=2),
+                 sstoch_setup=dict(period=14, smoothing=3)):
+        self.smas = [(period, RollingSMA(period)) for period in smas]
+        self.bbands = RollingBollinger(**bbands_setup)
+        self.rsi = RollingRSI(**rsi_setup)
+        self.macd = RollingMACD(**macd_setup)
+        self.sstoch = RollingStochastic(**sstoch_setup)
+
+    def columns(self):
+        """ names of the values produced by append and amend """
+        return (['sma_%s' % period for period, _ in self.smas] +
+                ['bb_lower', 'bb_middle', 'bb_upper', 'rsi',
+                 'macd', 'macd_signal', 'sstoch_k', 'sstoch_d'])
+
+    def append(self, high, low, close):
+        return self._values('append', high, low, close)
+
+    def amend(self, high, low, close):
+        return self._values('amend', high, low, close)
+
+    def _values(self, method, high, low, close):
+        values = dict(('sma_%s' % period, getattr(sma, method)(close))
+                      for period, sma in self.smas)
+        values['bb_lower'], values['bb_middle'], values['bb_upper'] = getattr(self.bbands, method)(close)
+        values['rsi'] = getattr(self.rsi, method)(close)
+        values['macd'], values['macd_signal'] = getattr(self.macd, method)(close)
+        values['sstoch_k'], values['sstoch_d'] = getattr(self.sstoch, method)(high, low, close)
+        return values
@@ -10,45 +10,68 @@
     the style object.
 """
 
-import matplotlib.pyplot as plt
-import pandas as pd
 import matplotlib.ticker as mticker
 
-from finfunctions import relative_strength_index
+from finplots.indicators import relative_strength_index
 
 from finplots import style
+from finplots.cache import indicator_cache
+from finplots.lod import decimate_minmax
+from finplots.ohlcv import as_ohlcv
+from finplots.themes import cached_kwargs
+from finplots.themes import style_panel
 
-def plot_rsi(ax, df, period=14, style=style):
+def plot_rsi(ax, df, period=14, style=style, max_points=None, indicators=None):
     """ plot rsi
     :param ax: axis
     :param df: price dataframe
     :param style: style object
+    :param max_points: decimate the rsi line to this many x buckets
+    :param indicators: IndicatorSet holding the rsi, computed when None
     :return: axis
     """
-    rsi_data = relative_strength_index(df.close, n=period)
+    x, rsi_data = _rsi_data(df, period, max_points=max_points, indicators=indicators)
     legend_text = 'RSI %s' % str(period)
-    ax = _plot_rsi(ax, df.index, rsi_data,
-                   line_color=style.rsi_line_color,
-                   line_width=style.rsi_linewidth,
-                   signal_line_color=style.rsi_signal_line_color,
-                   signal_line_alpha=style.rsi_signal_line_alpha,
-                   fill_alpha=style.rsi_fill_alpha,
-                   overbought_color=style.rsi_overbought_color,
-                   oversold_color=style.rsi_oversold_color,
-                   edge_color=style.rsi_edge_color,
-                   label_color=style.rsi_label_color,
-                   text_color=style.rsi_text_color,
-                   spine_color=style.rsi_spine_color,
-                   grid_alpha=style.rsi_grid_alpha,
-                   grid_color=style.rsi_grid_color,
-                   tick_color=style.rsi_tick_color,
+    ax = _plot_rsi(ax, x, rsi_data,
                    legend_text=legend_text,
-                   legend_text_x=style.legend_text_x,
-                   legend_text_y=style.legend_text_y)
+                   **_rsi_kwargs(style))
     # ax = _plot_rsi(ax, df.index, rsi_data)
     return ax
 
 
+def _rsi_data(df, period, max_points=None, indicators=None):
+    """ compute the rsi of the close prices, or take it from a
+    precomputed IndicatorSet
+    :return: (x, rsi)
+    """
+    df = as_ohlcv(df)
+    rsi_data = indicators.rsi(period) if indicators is not None else None
+    if rsi_data is None:
+        rsi_data = indicator_cache.get(relative_strength_index, df.close, n=period)
+    return decimate_minmax(df.index, max_points, rsi_data)
+
+
+@cached_kwargs
+def _rsi_kwargs(style):
+    """ resolve _plot_rsi style arguments from the style object """
+    return dict(line_color=style.rsi_line_color,
+                line_width=style.rsi_linewidth,
+                signal_line_color=style.rsi_signal_line_color,
+                signal_line_alpha=style.rsi_signal_line_alpha,
+                fill_alpha=style.rsi_fill_alpha,
+                overbought_color=style.rsi_overbought_color,
+                oversold_color=style.rsi_oversold_color,
+                edge_color=style.rsi_edge_color,
+                label_color=style.rsi_label_color,
+                text_color=style.rsi_text_color,
+                spine_color=style.rsi_spine_color,
+                grid_alpha=style.rsi_grid_alpha,
+                grid_color=style.rsi_grid_color,
+                tick_color=style.rsi_tick_color,
+                legend_text_x=style.legend_text_x,
+                legend_text_y=style.legend_text_y)
+
+
 def _plot_rsi(ax, x, rsi_data,
               line_color='cyan',
               line_width=1,
@@ -87,7 +110,7 @@ def _plot_rsi(ax, x, rsi_data,
     ax.plot(x, rsi_data, line_color, linewidth=line_width)
 
     # prune the yaxis
-    plt.gca().yaxis.set_major_locator(mticker.MaxNLocator(prune='upper'))
+    ax.yaxis.set_major_locator(mticker.MaxNLocator(prune='upper'))
 
     # put markers for signal line
     # following line needs as many stuff as there are markers
@@ -123,24 +146,12 @@ def _plot_rsi(ax, x, rsi_data,
                 color=text_color,
                 transform=ax.transAxes)
 
-    # label color
-    ax.yaxis.label.set_color(label_color)
-
-    # spine colors
-    ax.spines['bottom'].set_color(spine_color)
-    ax.spines['top'].set_color(spine_color)
-    ax.spines['left'].set_color(spine_color)
-    ax.spines['right'].set_color(spine_color)
-
-    # tick params color
-    ax.tick_params(axis='y', colors=tick_color)
-    ax.tick_params(axis='x', colors=tick_color)
-
-    # show tick params on right axis as well
-    ax.tick_params(labelright=True)
-
-    # plot the grids.
-    ax.grid(True, alpha=grid_alpha, color=grid_color)
-    plt.ylabel('RSI', color=label_color)
+    # label, spine, tick and grid colors
+    style_panel(ax, 'RSI',
+                label_color=label_color,
+                spine_color=spine_color,
+                tick_color=tick_color,
+                grid_color=grid_color,
+                grid_alpha=grid_alpha)
 
     return ax
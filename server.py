@@ -0,0 +1,309 @@
+"""
+    Asyncio front end for serving rendered charts, meant to sit behind
+    the handlers of a web service.
+
+    ChartServer accepts render requests on the event loop and draws them
+    in a bounded pool of headless worker processes. Requests for the
+    same chart (same data, arguments, style, format and dpi, see
+    finplots.rendercache.render_key) which arrive while it is being
+    rendered wait for that one render instead of starting their own.
+    At most max_pending distinct charts are queued or rendering, further
+    requests are rejected with Overloaded so that the caller can answer
+    with a 503 instead of letting the backlog grow, and every request
+    gives up after its timeout. A chart whose requests all gave up
+    before a worker picked it up is dropped from the queue. Hashing the
+    request and the render cache lookups run in the default executor of
+    the loop, so that large price data or a slow disk do not stall it.
+
+        async with ChartServer(workers=4, cache=RenderCache('/tmp/charts')) as server:
+            png = await server.render(df, smas=[20, 50])
+
+    LocalClient answers requests the way a web handler would, with a
+    status, content type and body, which is handy in tests and as the
+    body of a handler. stats() reports the queue depth, counters and
+    latency percentiles.
+
+    As with finplots.batch, the worker processes are spawned, so scripts
+    starting a ChartServer must guard their entry point with
+    ``if __name__ == '__main__':``.
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import deque
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+from finplots.batch import _init_worker
+from finplots.rendercache import render_key
+
+# number of recent requests the latency percentiles are computed over
+LATENCY_WINDOW = 1024
+
+CONTENT_TYPES = {'png': 'image/png',
+                 'svg': 'image/svg+xml',
+                 'pdf': 'application/pdf',
+                 'jpg': 'image/jpeg',
+                 'jpeg': 'image/jpeg'}
+
+Response = namedtuple('Response', 'status content_type body')
+
+# figure reused by every render of a worker process or thread
+_local = threading.local()
+
+
+def _render_image(df, fmt, dpi, plot_kwargs):
+    """ render a chart in a worker, on a figure kept across renders
+    :return: image bytes
+    """
+    from finplots.candlestick import render_candlestick
+    from finplots.render import new_figure
+
+    if getattr(_local, 'figure', None) is None:
+        _local.figure = new_figure()
+    return render_candlestick(df, fmt=fmt, dpi=dpi, fig=_local.figure, **plot_kwargs)
+
+
+def _percentiles(values):
+    if not values:
+        return dict(count=0, p50=0.0, p95=0.0, p99=0.0, max=0.0)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+    return dict(count=len(values), p50=p50, p95=p95, p99=p99, max=max(values))
+
+
+def _consume(task):
+    """ retrieve the outcome of a render nobody waits for any more, so
+    that asyncio does not log it as never retrieved """
+    if not task.cancelled():
+        task.exception()
+
+
+class Overloaded(RuntimeError):
+    """ raised when a chart is requested while max_pending charts are
+    already queued or rendering """
+
+
+class RenderCancelled(RuntimeError):
+    """ raised to the requests of a chart whose render was cancelled by
+    the server, e.g. because it is closing """
+
+
+class _Render(object):
+    """ a chart being rendered and the requests waiting for it """
+    __slots__ = ('task', 'waiters', 'started')
+
+    def __init__(self):
+        self.task = None
+        self.waiters = 0
+        self.started = False
+
+
+class ChartServer(object):
+    """ renders charts requested on the event loop in a pool of worker
+    processes, coalescing identical requests """
+
+    def __init__(self, workers=None, max_pending=64, timeout=30.0, cache=None, executor=None):
+        """
+        :param workers: number of charts rendered at once and of worker
+            processes, defaults to the cpu count
+        :param max_pending: number of distinct charts queued or
+            rendering beyond which requests are rejected
+        :param timeout: seconds a request waits for its chart, None
+            waits forever
+        :param cache: finplots.rendercache.RenderCache looked up before
+            rendering and filled afterwards
+        :param executor: concurrent.futures executor to render in
+            instead of a process pool, e.g. a ThreadPoolExecutor in
+            tests. It is not shut down by close.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.cache = cache
+        self._executor = executor
+        self._own_executor = executor is None
+        self._slots = None
+        self._inflight = {}
+        self.running = 0
+        self.requests = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.render_seconds = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        """ start the worker processes
+        :return: self
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker)
+        self._slots = asyncio.Semaphore(self.workers)
+        return self
+
+    async def close(self):
+        """ cancel the pending charts and stop the worker processes """
+        for render in list(self._inflight.values()):
+            render.task.cancel()
+        self._inflight.clear()
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def render(self, df, fmt='png', dpi=100, timeout=None, **kwargs):
+        """ image of a chart, rendered by a worker or shared with an
+        identical request in progress
+
+        :param df: price data as accepted by candlestick_plot
+        :param fmt: image format
+        :param dpi: resolution of the image
+        :param timeout: seconds to wait, the server timeout when None
+        :param kwargs: passed on to candlestick_plot
+        :return: image bytes
+        :raises Overloaded: when max_pending charts are pending already
+        :raises asyncio.TimeoutError: when the chart took too long
+        :raises RenderCancelled: when the server cancelled the render
+        """
+        if self._slots is None:
+            raise RuntimeError('the server has not been started')
+        started = time.perf_counter()
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        key = await loop.run_in_executor(None, functools.partial(render_key, df, fmt=fmt, dpi=dpi, **kwargs))
+
+        if self.cache is not None:
+            image = await loop.run_in_executor(None, self.cache.get, key, fmt)
+            if image is not None:
+                self.cache_hits += 1
+                self.latencies.append(time.perf_counter() - started)
+                return image
+
+        render = self._inflight.get(key)
+        if render is not None:
+            self.coalesced += 1
+        elif len(self._inflight) >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded('%d charts are pending already' % len(self._inflight))
+        else:
+            render = self._inflight[key] = _Render()
+            render.task = asyncio.ensure_future(self._run(key, render, df, fmt, dpi, kwargs))
+            render.task.add_done_callback(_consume)
+
+        render.waiters += 1
+        try:
+            image = await asyncio.wait_for(asyncio.shield(render.task),
+                                           self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            # the shared render is only done here when it was cancelled
+            # itself, otherwise this request was
+            if render.task.cancelled():
+                raise RenderCancelled('the render was cancelled')
+            raise
+        finally:
+            render.waiters -= 1
+            if render.waiters == 0 and not render.started:
+                render.task.cancel()
+                # a request arriving before the task has unwound must
+                # start a new render instead of joining the cancelled one
+                self._forget(key, render)
+        self.latencies.append(time.perf_counter() - started)
+        return image
+
+    async def _run(self, key, render, df, fmt, dpi, kwargs):
+        """ wait for a worker, render the chart and cache it """
+        try:
+            async with self._slots:
+                render.started = True
+                self.running += 1
+                started = time.perf_counter()
+                try:
+                    loop = asyncio.get_running_loop()
+                    image = await loop.run_in_executor(self._executor, _render_image, df, fmt, dpi, kwargs)
+                finally:
+                    self.running -= 1
+                self.render_seconds.append(time.perf_counter() - started)
+            self.renders += 1
+            if self.cache is not None:
+                await loop.run_in_executor(None, self.cache.put, key, image, fmt)
+            return image
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._forget(key, render)
+
+    def _forget(self, key, render):
+        """ remove a render from the pending ones, unless a newer render
+        of the same chart took its place """
+        if self._inflight.get(key) is render:
+            del self._inflight[key]
+
+    def stats(self):
+        """ queue depth, counters and latency percentiles in seconds
+        :return: dict
+        """
+        pending = len(self._inflight)
+        return dict(pending=pending,
+                    running=self.running,
+                    queued=pending - self.running,
+                    requests=self.requests,
+                    renders=self.renders,
+                    coalesced=self.coalesced,
+                    cache_hits=self.cache_hits,
+                    rejected=self.rejected,
+                    timeouts=self.timeouts,
+                    errors=self.errors,
+                    latency=_percentiles(self.latencies),
+                    render_seconds=_percentiles(self.render_seconds))
+
+
+class LocalClient(object):
+    """ in process client turning the outcome of a request into the
+    response a web handler would send """
+
+    def __init__(self, server):
+        """
+        :param server: started ChartServer
+        """
+        self.server = server
+
+    async def get(self, df, fmt='png', **kwargs):
+        """ request a chart
+        :param kwargs: passed on to ChartServer.render
+        :return: Response, 200 with the image, 503 when overloaded or
+            the render was cancelled, 504 on timeout and 500 when the
+            render failed
+        """
+        # a CancelledError reaching here cancels the request itself and
+        # is passed on, renders cancelled by the server raise
+        # RenderCancelled instead
+        try:
+            image = await self.server.render(df, fmt=fmt, **kwargs)
+        except (Overloaded, RenderCancelled) as error:
+            return Response(503, 'text/plain', str(error).encode())
+        except asyncio.TimeoutError:
+            return Response(504, 'text/plain', b'timed out')
+        except Exception as error:
+            return Response(500, 'text/plain', ('%s: %s' % (type(error).__name__, error)).encode())
+        return Response(200, CONTENT_TYPES.get(fmt, 'application/octet-stream'), image)
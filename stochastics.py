@@ -1,42 +1,69 @@
-import matplotlib.pyplot as plt
-import pandas as pd
 import matplotlib.ticker as mticker
+from matplotlib.artist import setp
 
-from finfunctions import slow_stochastic
+from finplots.indicators import slow_stochastic
 
 from finplots import style
+from finplots.cache import indicator_cache
+from finplots.lod import decimate_minmax
+from finplots.ohlcv import as_ohlcv
+from finplots.themes import cached_kwargs
+from finplots.themes import style_panel
 
 
-def plot_slow_stochastic(ax, df, period=14, smoothing=3):
+def plot_slow_stochastic(ax, df, period=14, smoothing=3, max_points=None, style=style, indicators=None):
     """ plot slow stochastic
     :param ax:
     :param df:
     :param period:
     :param smoothing:
+    :param max_points: decimate %K and %D to this many x buckets
+    :param style: style object
+    :param indicators: IndicatorSet holding %K and %D, computed when None
     :return:
     """
-    k, d = slow_stochastic(df.low, df.high, df.close, period=14, smoothing=3)
+    x, k, d = _sstoch_data(df, period, smoothing, max_points=max_points, indicators=indicators)
     legend_text = 'SLOW STOCH %s, %s' % (str(period), str(smoothing))
-    ax = _plot_slow_stochastic(ax, df.index, k, d,
-                               k_line_color=style.sstoch_k_line_color,
-                               k_line_width=style.sstoch_k_line_width,
-                               d_line_color=style.sstoch_d_line_color,
-                               d_line_width=style.sstoch_d_line_width,
-                               text_color=style.sstoch_text_color,
-                               label_color=style.sstoch_label_color,
-                               spine_color=style.sstoch_spine_color,
-                               tick_color=style.sstoch_tick_color,
-                               grid_color=style.sstoch_grid_color,
-                               grid_alpha=style.sstoch_grid_alpha,
-                               legend_text_x=style.sstoch_legend_text_x,
-                               legend_text_y=style.sstoch_legend_text_y,
-                               hline_color=style.sstoch_hline_color,
-                               hline_width=style.sstoch_hline_width,
-                               hline_alpha=style.sstoch_hline_alpha,
-                               legend_text=legend_text)
+    ax = _plot_slow_stochastic(ax, x, k, d,
+                               legend_text=legend_text,
+                               **_sstoch_kwargs(style))
     return ax
 
 
+def _sstoch_data(df, period, smoothing, max_points=None, indicators=None):
+    """ compute %K and %D of the slow stochastic, or take them from a
+    precomputed IndicatorSet
+    :return: (x, k, d)
+    """
+    df = as_ohlcv(df)
+    lines = indicators.slow_stochastic(period, smoothing) if indicators is not None else None
+    if lines is None:
+        lines = indicator_cache.get(slow_stochastic, df.low, df.high, df.close,
+                                    period=period, smoothing=smoothing)
+    k, d = lines
+    return decimate_minmax(df.index, max_points, k, d)
+
+
+@cached_kwargs
+def _sstoch_kwargs(style):
+    """ resolve _plot_slow_stochastic style arguments from the style object """
+    return dict(k_line_color=style.sstoch_k_line_color,
+                k_line_width=style.sstoch_k_line_width,
+                d_line_color=style.sstoch_d_line_color,
+                d_line_width=style.sstoch_d_line_width,
+                text_color=style.sstoch_text_color,
+                label_color=style.sstoch_label_color,
+                spine_color=style.sstoch_spine_color,
+                tick_color=style.sstoch_tick_color,
+                grid_color=style.sstoch_grid_color,
+                grid_alpha=style.sstoch_grid_alpha,
+                legend_text_x=style.sstoch_legend_text_x,
+                legend_text_y=style.sstoch_legend_text_y,
+                hline_color=style.sstoch_hline_color,
+                hline_width=style.sstoch_hline_width,
+                hline_alpha=style.sstoch_hline_alpha)
+
+
 def _plot_slow_stochastic(ax, x, k, d,
                           k_line_color='orange',
                           k_line_width=1,
@@ -78,7 +105,7 @@ def _plot_slow_stochastic(ax, x, k, d,
     ax.plot(x[-len(d):], d, linewidth=d_line_width, color=d_line_color)
 
     # prune the y axis
-    plt.gca().yaxis.set_major_locator(mticker.MaxNLocator(prune='upper'))
+    ax.yaxis.set_major_locator(mticker.MaxNLocator(prune='upper'))
 
     # put markers for signal line
     # following line needs as many stuff as there are markers
@@ -101,25 +128,13 @@ def _plot_slow_stochastic(ax, x, k, d,
                 color=text_color,
                 transform=ax.transAxes)
 
-    # label color
-    ax.yaxis.label.set_color(label_color)
-
-    # spine colors
-    ax.spines['bottom'].set_color(spine_color)
-    ax.spines['top'].set_color(spine_color)
-    ax.spines['left'].set_color(spine_color)
-    ax.spines['right'].set_color(spine_color)
-
-    # tick params color
-    ax.tick_params(axis='y', colors=tick_color)
-    ax.tick_params(axis='x', colors=tick_color)
-
-    # show tick params on right axis as well
-    ax.tick_params(labelright=True)
-
-    # plot the grids.
-    ax.grid(True, alpha=grid_alpha, color=grid_color)
-    plt.ylabel('S STOCH', color=label_color)
-    plt.setp(ax.get_xticklabels(), visible=False)
+    # label, spine, tick and grid colors
+    style_panel(ax, 'S STOCH',
+                label_color=label_color,
+                spine_color=spine_color,
+                tick_color=tick_color,
+                grid_color=grid_color,
+                grid_alpha=grid_alpha)
+    setp(ax.get_xticklabels(), visible=False)
 
     return ax
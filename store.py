@@ -0,0 +1,191 @@
+"""
+    On-disk columnar store for OHLCV history.
+
+    Every symbol is a directory, named after the percent encoded symbol
+    so that names like BRK/B stay inside the store, holding one fixed
+    width little endian file per column (int64 nanosecond dates, float64 prices and volume)
+    and a small json header. Reading memory-maps the column files, so
+    opening a symbol costs nothing and a date window is located by a
+    binary search on the date column. The window is handed to the
+    charts as zero-copy views on the mapped files.
+
+        write_symbol('/data/bars', 'INFY', df)
+        store = OHLCVStore('/data/bars')
+        bars = store.window('INFY', '2015-01-01', '2015-06-30')
+        candlestick_plot(bars)
+"""
+import os
+import json
+import datetime
+from urllib.parse import quote
+from urllib.parse import unquote
+
+import numpy as np
+
+from finplots.ohlcv import OHLCV
+from finplots.ohlcv import as_ohlcv
+
+COLUMN_DTYPES = [('date', '<i8'),
+                 ('open', '<f8'),
+                 ('high', '<f8'),
+                 ('low', '<f8'),
+                 ('close', '<f8'),
+                 ('volume', '<f8')]
+HEADER = 'header.json'
+
+NS_PER_DAY = 86400 * 10 ** 9
+
+
+def _symbol_dir(root, symbol):
+    """ directory of a symbol, percent encoded like the file names of
+    finplots.batch. A leading dot is encoded as well, so that no symbol
+    names '.', '..' or a hidden directory. """
+    name = quote(str(symbol), safe=' -_.^=+@')
+    if not name:
+        raise ValueError('empty symbol name')
+    if name.startswith('.'):
+        name = '%2E' + name[1:]
+    return os.path.join(root, name)
+
+
+def _read_header(path):
+    with open(os.path.join(path, HEADER)) as f:
+        return json.load(f)
+
+
+def _write_header(path, rows):
+    tmp = os.path.join(path, HEADER + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(dict(rows=rows, columns=COLUMN_DTYPES), f)
+    os.replace(tmp, os.path.join(path, HEADER))
+
+
+def _to_ns(dates):
+    """ int64 nanoseconds since the epoch """
+    dates = np.asarray(dates)
+    if not np.issubdtype(dates.dtype, np.datetime64):
+        import pandas as pd
+        index = pd.DatetimeIndex(pd.to_datetime(dates))
+        if index.tz is not None:
+            index = index.tz_convert(None)
+        dates = index.values
+    return dates.astype('datetime64[ns]').view(np.int64)
+
+
+def _is_day(date):
+    """ whether a date has no time of day: a date string without one, a
+    datetime.date or a datetime64 in days """
+    if isinstance(date, str):
+        return ':' not in date and 'T' not in date.upper()
+    if isinstance(date, datetime.datetime):
+        return False
+    if isinstance(date, datetime.date):
+        return True
+    if isinstance(date, np.datetime64):
+        return np.datetime_data(date.dtype)[0] == 'D'
+    return False
+
+
+def write_symbol(root, symbol, df, append=False):
+    """ write price data of a symbol into the store
+
+    :param root: store directory
+    :param symbol: symbol name, percent encoded into the directory name
+    :param df: price data accepted by as_ohlcv, with dates
+    :param append: add the rows to the existing data of the symbol. The
+        rows must all be later than the last stored row.
+    :return: number of rows stored for the symbol
+    """
+    data = as_ohlcv(df)
+    if data.date is None:
+        raise ValueError('price data needs a date column or a DatetimeIndex')
+    dates = _to_ns(data.date)
+    order = np.argsort(dates, kind='mergesort')
+    columns = dict(date=dates[order])
+    for name, _ in COLUMN_DTYPES[1:]:
+        values = getattr(data, name)
+        columns[name] = np.zeros(len(dates)) if values is None else values[order]
+
+    path = _symbol_dir(root, symbol)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    rows = 0
+    if append and os.path.exists(os.path.join(path, HEADER)):
+        rows = _read_header(path)['rows']
+        if rows and len(dates):
+            last = np.memmap(os.path.join(path, 'date.i8'), dtype='<i8', mode='r',
+                             offset=8 * (rows - 1), shape=(1,))[0]
+            if columns['date'][0] <= last:
+                raise ValueError('appended rows must be later than the stored ones')
+
+    for name, dtype in COLUMN_DTYPES:
+        filename = os.path.join(path, '%s.%s' % (name, dtype[1:]))
+        values = np.asarray(columns[name], dtype=dtype)
+        if rows:
+            with open(filename, 'r+b') as f:
+                # drop anything beyond the header, e.g. left by an interrupted append
+                f.truncate(rows * 8)
+                f.seek(rows * 8)
+                values.tofile(f)
+        else:
+            # replace the file instead of truncating it, maps held by
+            # readers keep the old file and would fault past a truncation
+            tmp = filename + '.tmp'
+            with open(tmp, 'wb') as f:
+                values.tofile(f)
+            os.replace(tmp, filename)
+
+    # the header goes last, readers only see rows written completely
+    rows += len(dates)
+    _write_header(path, rows)
+    return rows
+
+
+class OHLCVStore(object):
+    """ read access to a directory written by write_symbol """
+
+    def __init__(self, root):
+        self.root = root
+
+    def symbols(self):
+        """ names of the symbols in the store """
+        return sorted(unquote(name) for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, HEADER)))
+
+    def open(self, symbol):
+        """ memory-map all the columns of a symbol
+        :return: OHLCV with the dates as datetime64[ns]
+        """
+        path = _symbol_dir(self.root, symbol)
+        rows = _read_header(path)['rows']
+        columns = {}
+        for name, dtype in COLUMN_DTYPES:
+            filename = os.path.join(path, '%s.%s' % (name, dtype[1:]))
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(filename, dtype=dtype, mode='r', shape=(rows,))
+        columns['date'] = columns['date'].view('datetime64[ns]')
+        return OHLCV(**columns)
+
+    def window(self, symbol, start=None, end=None):
+        """ the bars of a symbol between start and end, both inclusive,
+        as views on the mapped files
+
+        :param symbol: symbol name
+        :param start: first date, None for the beginning of the history
+        :param end: last date, None for the end of the history. A date
+            without a time of day ('2015-06-30', datetime.date or
+            datetime64[D]) includes the bars of that whole day, a
+            timestamp is an instant.
+        :return: OHLCV
+        """
+        data = self.open(symbol)
+        lo, hi = 0, len(data)
+        if start is not None:
+            lo = np.searchsorted(data.date, _to_ns([start]).view('datetime64[ns]')[0], side='left')
+        if end is not None:
+            last = _to_ns([end])[0] + (NS_PER_DAY - 1 if _is_day(end) else 0)
+            hi = np.searchsorted(data.date, np.int64(last).view('datetime64[ns]'), side='right')
+        return data[lo:hi]
@@ -0,0 +1,305 @@
+"""
+    Streaming candlestick chart for live intraday data.
+
+    New bars are appended with append_bar() and ticks are folded into
+    the forming bar with tick(). Indicators are updated in constant time
+    through the rolling state in finplots.rolling instead of being
+    recomputed over the whole history.
+
+    The chart is split in two layers. The static layer holds all but the
+    most recent bars and is drawn once into a cached background. The
+    recent bars and the indicator tails are drawn by animated artists
+    which are blitted over that background on every update. Only when
+    more than `tail_bars` bars have accumulated in the tail is the static
+    layer rebuilt.
+"""
+import numpy as np
+from matplotlib.collections import PolyCollection
+
+from finplots.chart import CandlestickChart
+from finplots.chart import _capture
+from finplots.chart import _fill_verts
+from finplots.candlestick import _prepare_frame
+from finplots.candlestick import _candle_width
+from finplots.candlestick import _candlestick_collections
+from finplots.candlestick import _candlestick_vertices
+from finplots.dates import to_mpl_dates
+from finplots.lod import decimate_minmax
+from finplots.lod import resample_ohlcv
+from finplots.ohlcv import OHLCV
+from finplots.overlays import _plot_volume
+from finplots.overlays import _volume_kwargs
+from finplots.overlays import _volume_vertices
+from finplots.rolling import IndicatorState
+
+OHLCV_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+
+class _GrowingArray(object):
+    """ float64 array with amortised constant time append """
+
+    def __init__(self, capacity=1024):
+        self._data = np.empty(capacity)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self._data):
+            data = np.empty(2 * len(self._data))
+            data[:self.size] = self._data
+            self._data = data
+        self._data[self.size] = value
+        self.size += 1
+
+    def set_last(self, value):
+        self._data[self.size - 1] = value
+
+    @property
+    def values(self):
+        return self._data[:self.size]
+
+
+def _to_num(date):
+    """ matplotlib date number of a datetime like or a float """
+    if isinstance(date, (int, float, np.floating)):
+        return float(date)
+    return float(to_mpl_dates([date])[0])
+
+
+class StreamingChart(CandlestickChart):
+    """ candlestick chart updated bar by bar and tick by tick
+
+        chart = StreamingChart(history_df, bar_length='1min')
+        chart.tick(101.5, volume=200, time=now)
+        chart.append_bar(date, open, high, low, close, volume)
+    """
+
+    def __init__(self, df=None, bar_length=None, tail_bars=64, **kwargs):
+        """
+        :param df: optional history, as accepted by candlestick_plot
+        :param bar_length: duration of a bar, e.g. '1min', used by tick()
+            to decide when a new bar starts
+        :param tail_bars: number of recent bars drawn by blitting before
+            the static layer is rebuilt
+        :param kwargs: passed on to CandlestickChart
+        """
+        CandlestickChart.__init__(self, **kwargs)
+        self.bar_length = None
+        if bar_length is not None:
+            import pandas as pd
+            self.bar_length = pd.Timedelta(bar_length) / pd.Timedelta(days=1)
+        self.tail_bars = tail_bars
+        self.state = IndicatorState(smas=self.smas,
+                                    rsi_setup=self.rsi_setup,
+                                    macd_setup=self.macd_setup,
+                                    bbands_setup=self.bbands_setup,
+                                    sstoch_setup=self.sstoch_setup)
+        self.columns = dict((name, _GrowingArray()) for name in OHLCV_COLUMNS + self.state.columns())
+        self._static_size = 0
+        self._width = 0.5
+        self._spacing = 1.0
+        # volume of the highest static volume bar, the tail is scaled alike
+        self._volume_peak = 0.0
+        self._background = None
+        self._create_tail_artists()
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+        if df is not None:
+            df, _ = _prepare_frame(df)
+            for row in zip(*[df[name] for name in OHLCV_COLUMNS]):
+                self._append(*row)
+            self._refresh_static()
+
+    def _create_tail_artists(self):
+        """ animated copies of the candles, volume bars, bollinger fill
+        and indicator lines """
+        ax = self.ax_price
+        x = np.zeros(1)
+        _, collections = _capture(ax, lambda: _plot_volume(ax, x, x, **_volume_kwargs(self.style)))
+        self.tail_volume = collections[0]
+        self.tail_bbands_fill = PolyCollection([np.zeros((0, 2))])
+        self.tail_bbands_fill.update_from(self.bbands_fill)
+        self.tail_bbands_fill.set_zorder(self.bbands_fill.get_zorder())
+        self.tail_bbands_fill.set_label(None)
+        # an edge would close the polygon with a seam where the tail starts
+        self.tail_bbands_fill.set_edgecolor('none')
+        ax.add_collection(self.tail_bbands_fill, autolim=False)
+        self.tail_wicks, self.tail_bodies = _candlestick_collections(ax, x, x, x, x, x)
+        for artist in (self.tail_volume, self.tail_bbands_fill, self.tail_wicks, self.tail_bodies):
+            artist.set_animated(True)
+
+        pairs = [(line, 'sma_%s' % period) for line, period in zip(self.sma_lines, self.smas)]
+        pairs += [(self.bbands_mid_line, 'bb_middle'),
+                  (self.rsi_line, 'rsi'),
+                  (self.macd_line, 'macd'),
+                  (self.macd_signal_line, 'macd_signal'),
+                  (self.sstoch_k_line, 'sstoch_k'),
+                  (self.sstoch_d_line, 'sstoch_d')]
+        self.tail_lines = []
+        for line, column in pairs:
+            tail, = line.axes.plot([], [])
+            tail.update_from(line)
+            tail.set_label(None)
+            tail.set_animated(True)
+            self.tail_lines.append((tail, column))
+
+    def _append(self, date, open, high, low, close, volume):
+        for name, value in zip(OHLCV_COLUMNS, (date, open, high, low, close, volume)):
+            self.columns[name].append(value)
+        for name, value in self.state.append(high, low, close).items():
+            self.columns[name].append(value)
+
+    def append_bar(self, date, open, high, low, close, volume=0):
+        """ add a completed or newly opened bar
+        :param date: datetime like or matplotlib date number
+        """
+        self._append(_to_num(date), open, high, low, close, volume)
+        if self.size - self._static_size > self.tail_bars:
+            self._refresh_static()
+        else:
+            self._blit_tail()
+
+    def tick(self, price, volume=0, time=None):
+        """ fold a trade into the forming bar, or open a new bar when
+        `time` lies beyond the end of the forming bar
+
+        :param price: trade price
+        :param volume: traded volume
+        :param time: datetime like or matplotlib date number of the trade
+        """
+        if time is not None:
+            time = _to_num(time)
+        if self.size == 0 or (time is not None and self.bar_length is not None and
+                              time >= self.columns['date'].values[-1] + self.bar_length):
+            start = time
+            if time is not None and self.bar_length is not None:
+                start = np.floor(time / self.bar_length) * self.bar_length
+            return self.append_bar(start, price, price, price, price, volume)
+
+        high = max(self.columns['high'].values[-1], price)
+        low = min(self.columns['low'].values[-1], price)
+        self.columns['high'].set_last(high)
+        self.columns['low'].set_last(low)
+        self.columns['close'].set_last(price)
+        self.columns['volume'].set_last(self.columns['volume'].values[-1] + volume)
+        for name, value in self.state.amend(high, low, price).items():
+            self.columns[name].set_last(value)
+
+        bottom, top = self.ax_price.get_ylim()
+        if low < bottom or high > top:
+            self._refresh_static()
+        else:
+            self._blit_tail()
+
+    @property
+    def size(self):
+        return self.columns['date'].size
+
+    def _refresh_static(self):
+        """ rebuild the static layer from all but the forming bar and
+        redraw the whole figure, which also refreshes the background """
+        n = self.size
+        if n == 0:
+            return
+        static = max(n - 1, 1)
+        values = dict((name, column.values[:static]) for name, column in self.columns.items())
+        max_bars = self._max_bars()
+        x = values['date']
+
+        bars = resample_ohlcv(OHLCV(**dict((name, values[name]) for name in OHLCV_COLUMNS)),
+                              max_bars)
+        series = dict(smas=[decimate_minmax(x, max_bars, values['sma_%s' % period])
+                            for period in self.smas],
+                      bbands=decimate_minmax(x, max_bars, values['bb_lower'],
+                                             values['bb_middle'], values['bb_upper']),
+                      rsi=decimate_minmax(x, max_bars, values['rsi']),
+                      macd=decimate_minmax(x, max_bars, values['macd'], values['macd_signal']),
+                      sstoch=decimate_minmax(x, max_bars, values['sstoch_k'], values['sstoch_d']))
+        self._set_data(bars, series)
+        self._static_size = static
+        self._volume_peak = bars.volume.max() if 'volume' in bars and len(bars) else 0.0
+
+        # leave room on the right for the bars streamed into the tail
+        dates = self.columns['date'].values
+        spacing = self.bar_length or (np.median(np.diff(dates)) if n > 1 else 1.0)
+        self._spacing = spacing
+        self._width = _candle_width(dates[-2:]) if n > 1 else 0.5 * spacing
+        left, _ = self.ax_price.get_xlim()
+        self.ax_price.set_xlim(left, dates[-1] + (self.tail_bars + 1) * spacing)
+
+        bottom, top = self.ax_price.get_ylim()
+        lows = self.columns['low'].values[static:]
+        highs = self.columns['high'].values[static:]
+        if len(lows):
+            self.ax_price.set_ylim(min(bottom, lows.min()), max(top, highs.max()))
+
+        self.fig.canvas.draw()
+
+    def _update_tail(self):
+        start = self._static_size
+        columns = self.columns
+        segments, verts, colors = _candlestick_vertices(columns['date'].values[start:],
+                                                        columns['open'].values[start:],
+                                                        columns['high'].values[start:],
+                                                        columns['low'].values[start:],
+                                                        columns['close'].values[start:],
+                                                        width=self._width,
+                                                        up_color=self.style.cdl_up_color,
+                                                        down_color=self.style.cdl_down_color)
+        self.tail_wicks.set_segments(segments)
+        self.tail_wicks.set_color(colors)
+        self.tail_bodies.set_verts(verts)
+        self.tail_bodies.set_facecolor(colors)
+        self.tail_bodies.set_edgecolor(colors)
+
+        verts, colors = _volume_vertices(columns['date'].values[start:],
+                                         columns['volume'].values[start:],
+                                         columns['close'].values[start:] >= columns['open'].values[start:],
+                                         peak=self._volume_peak,
+                                         spacing=self._spacing,
+                                         **_volume_kwargs(self.style))
+        self.tail_volume.set_verts(verts)
+        self.tail_volume.set_facecolor(colors)
+
+        # start one bar early so that the tail joins the static line
+        start = max(start - 1, 0)
+        x = columns['date'].values[start:]
+        self.tail_bbands_fill.set_verts([_fill_verts(x, columns['bb_upper'].values[start:],
+                                                     columns['bb_lower'].values[start:])])
+        for tail, column in self.tail_lines:
+            tail.set_data(x, columns[column].values[start:])
+
+    def _tail_artists(self):
+        return ([self.tail_volume, self.tail_bbands_fill, self.tail_wicks, self.tail_bodies] +
+                [tail for tail, _ in self.tail_lines])
+
+    def _draw_tail(self):
+        self._update_tail()
+        for artist in self._tail_artists():
+            artist.axes.draw_artist(artist)
+
+    def _on_draw(self, event):
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_tail()
+
+    def _blit_tail(self):
+        """ restore the cached background and draw only the tail """
+        canvas = self.fig.canvas
+        if self._background is None:
+            canvas.draw()
+            return
+        canvas.restore_region(self._background)
+        self._draw_tail()
+        canvas.blit(self.fig.bbox)
+
+    def render(self, fmt='png', dpi=100, fp=None):
+        """ encode the chart including the animated tail """
+        self._update_tail()
+        artists = self._tail_artists()
+        for artist in artists:
+            artist.set_animated(False)
+        try:
+            return CandlestickChart.render(self, fmt=fmt, dpi=dpi, fp=fp)
+        finally:
+            for artist in artists:
+                artist.set_animated(True)
+            self._background = None
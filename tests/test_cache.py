@@ -0,0 +1,47 @@
+"""
+    Counters and LRU eviction of finplots.cache.IndicatorCache.
+"""
+import numpy as np
+
+from finplots import indicators
+from finplots.cache import IndicatorCache
+
+
+def test_hits_and_misses():
+    cache = IndicatorCache()
+    close = np.arange(100.0)
+    first = cache.get(indicators.simple_moving_average, close, 10)
+    # equal content hits, whatever the array object
+    assert cache.get(indicators.simple_moving_average, close.copy(), 10) is first
+    cache.get(indicators.simple_moving_average, close, 20)
+    cache.get(indicators.simple_moving_average, close, period=10)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 3, 3)
+    assert stats['nbytes'] == 3 * close.nbytes
+
+
+def test_evicts_least_recently_used():
+    close = np.arange(100.0)
+    # room for two results of 800 bytes
+    cache = IndicatorCache(max_bytes=2 * close.nbytes)
+    cache.get(indicators.simple_moving_average, close, 5)
+    cache.get(indicators.simple_moving_average, close, 10)
+    cache.get(indicators.simple_moving_average, close, 5)
+    cache.get(indicators.simple_moving_average, close, 20)
+    # period 10 was the least recently used
+    cache.get(indicators.simple_moving_average, close, 5)
+    cache.get(indicators.simple_moving_average, close, 10)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 4)
+    assert stats['nbytes'] <= cache.max_bytes
+
+
+def test_disabled_and_clear():
+    cache = IndicatorCache()
+    close = np.arange(100.0)
+    cache.get(indicators.simple_moving_average, close, 5)
+    cache.clear()
+    assert cache.stats()['entries'] == 0 and cache.nbytes == 0 and cache.misses == 0
+    cache.enabled = False
+    cache.get(indicators.simple_moving_average, close, 5)
+    assert cache.stats()['entries'] == 0 and cache.misses == 0
@@ -0,0 +1,128 @@
+"""
+    Accuracy of finplots.indicators against pandas rolling and ewm
+    computations, and of compute_all against the single indicators.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from finplots import indicators
+from finplots.rolling import RollingRSI
+from finplots.benchmarks.indicators import CHART
+from finplots.benchmarks.indicators import _separately
+from finplots.benchmarks.indicators import make_prices
+
+TOLERANCE = 1e-6
+
+low, high, close = make_prices(20000)
+
+
+def _pandas_rsi(close, n):
+    """ standard rsi: Wilder smoothing, ewm(alpha=1/n), of the gains and
+    losses seeded with their mean over the first n changes """
+    change = pd.Series(close).diff()
+    gain, loss = change.clip(lower=0), -change.clip(upper=0)
+    gain.iloc[n] = gain.iloc[1:n + 1].mean()
+    loss.iloc[n] = loss.iloc[1:n + 1].mean()
+    avg_gain = gain.iloc[n:].ewm(alpha=1.0 / n, adjust=False).mean().reindex(gain.index)
+    avg_loss = loss.iloc[n:].ewm(alpha=1.0 / n, adjust=False).mean().reindex(loss.index)
+    rsi = (100 - 100 / (1 + avg_gain / avg_loss)).to_numpy(copy=True)
+    rsi[:n] = np.nan
+    return rsi
+
+
+def _pandas_stochastic(low, high, close, period, smoothing):
+    lowest = pd.Series(low).rolling(period).min()
+    highest = pd.Series(high).rolling(period).max()
+    fast_k = 100 * (pd.Series(close) - lowest) / (highest - lowest)
+    k = fast_k.rolling(smoothing).mean()
+    return k.values, k.rolling(smoothing).mean().values
+
+
+def _references():
+    """ (name, computed, expected) for every indicator """
+    s = pd.Series(close)
+    mean = s.rolling(20).mean()
+    std = s.rolling(20).std(ddof=0)
+    lower, middle, upper = indicators.bollinger_bands(close, 20, 2)
+    _, _, macd = indicators.moving_average_convergence_divergence(close, 26, 12)
+    k, d = indicators.slow_stochastic(low, high, close, 14, 3)
+    expected_k, expected_d = _pandas_stochastic(low, high, close, 14, 3)
+    fused = indicators.compute_all(low, high, close, **CHART)
+
+    return [
+        ('sma', indicators.simple_moving_average(close, 50), s.rolling(50).mean().values),
+        ('ema', indicators.exponential_moving_average(close, 9), s.ewm(span=9, adjust=False).mean().values),
+        ('bbands middle', middle, mean.values),
+        ('bbands upper', upper, (mean + 2 * std).values),
+        ('bbands lower', lower, (mean - 2 * std).values),
+        ('rsi', indicators.relative_strength_index(close, 14), _pandas_rsi(close, 14)),
+        ('macd', macd, (s.ewm(span=12, adjust=False).mean() - s.ewm(span=26, adjust=False).mean()).values),
+        ('rolling max', indicators.rolling_max(high, 14), pd.Series(high).rolling(14).max().values),
+        ('rolling min', indicators.rolling_min(low, 14), pd.Series(low).rolling(14).min().values),
+        ('stoch k', k, expected_k),
+        ('stoch d', d, expected_d),
+    ] + [('all ' + name, fused[name], expected)
+         for name, expected in _separately(low, high, close).items()]
+
+
+@pytest.mark.parametrize('name, computed, expected', _references(), ids=lambda value: value
+                         if isinstance(value, str) else '')
+def test_matches_reference(name, computed, expected):
+    np.testing.assert_array_equal(np.isnan(computed), np.isnan(expected))
+    valid = ~np.isnan(expected)
+    np.testing.assert_allclose(computed[valid], expected[valid], rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('n', [1, 2, 14, 50])
+def test_rsi_short_histories(n):
+    # from the first defined value on, also when the history barely
+    # covers the seed
+    for size in (n, n + 1, n + 2, 3 * n + 5):
+        expected = _pandas_rsi(close[:size], n) if size > n else np.full(size, np.nan)
+        for computed in (indicators.relative_strength_index(close[:size], n),
+                         indicators.compute_all(low[:size], high[:size], close[:size],
+                                                **dict(CHART, rsi_setup=dict(period=n)))['rsi']):
+            np.testing.assert_array_equal(np.isnan(computed), np.isnan(expected))
+            np.testing.assert_allclose(computed[n:], expected[n:], rtol=0, atol=TOLERANCE)
+
+
+def test_streamed_rsi_matches():
+    rolling = RollingRSI(14)
+    streamed = []
+    for price in close[:500]:
+        # a forming bar amended by a tick before it settles
+        rolling.append(price + 1.0)
+        streamed.append(rolling.amend(price))
+    expected = _pandas_rsi(close[:500], 14)
+    np.testing.assert_array_equal(np.isnan(streamed), np.isnan(expected))
+    np.testing.assert_allclose(np.array(streamed)[14:], expected[14:], rtol=0, atol=TOLERANCE)
+
+
+def test_nans_only_spoil_their_windows():
+    gaps = [100, 5000, 5001]
+    gappy_low, gappy_high, gappy_close = low.copy(), high.copy(), close.copy()
+    for values in (gappy_low, gappy_high, gappy_close):
+        values[gaps] = np.nan
+    s = pd.Series(gappy_close)
+    mean = s.rolling(20).mean()
+    std = s.rolling(20).std(ddof=0)
+    expected = {'sma_10': s.rolling(10).mean().values,
+                'bb_lower': (mean - 2 * std).values,
+                'bb_middle': mean.values,
+                'bb_upper': (mean + 2 * std).values}
+    expected['sstoch_k'], expected['sstoch_d'] = _pandas_stochastic(gappy_low, gappy_high,
+                                                                    gappy_close, 14, 3)
+    fused = indicators.compute_all(gappy_low, gappy_high, gappy_close, **CHART)
+    lower, middle, upper = indicators.bollinger_bands(gappy_close, 20, 2)
+    k, d = indicators.slow_stochastic(gappy_low, gappy_high, gappy_close, 14, 3)
+    computed = [('sma_10', indicators.simple_moving_average(gappy_close, 10)),
+                ('bb_lower', lower), ('bb_middle', middle), ('bb_upper', upper),
+                ('sstoch_k', k), ('sstoch_d', d)]
+    computed += [(name, fused[name]) for name in expected]
+    for name, values in computed:
+        np.testing.assert_array_equal(np.isnan(values), np.isnan(expected[name]), err_msg=name)
+        valid = ~np.isnan(expected[name])
+        np.testing.assert_allclose(values[valid], expected[name][valid], rtol=0, atol=TOLERANCE,
+                                   err_msg=name)
+    assert np.isnan(fused['sma_10']).sum() < 40
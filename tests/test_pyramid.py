@@ -0,0 +1,81 @@
+"""
+    Levels of finplots.pyramid against pandas resampling, after building
+    and after appends.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from finplots.dates import to_mpl_dates
+from finplots.pyramid import OHLCVPyramid
+
+# pyramid timeframe, pandas frequency and bucket origin
+RESAMPLES = [('5min', '5min', 'epoch'),
+             ('1h', '1h', 'epoch'),
+             ('4h', '4h', 'epoch'),
+             ('1d', '24h', 'epoch'),
+             ('1w', '168h', pd.Timestamp('1970-01-05'))]
+
+
+def _minute_bars(days=15, seed=0):
+    """ minute bars of the trading hours, starting on a Wednesday """
+    index = pd.date_range('2020-01-01 09:15', periods=days * 1440, freq='min')
+    index = index[(index.hour >= 9) & (index.hour < 16)]
+    r = np.random.RandomState(seed)
+    close = 100 + np.cumsum(r.randn(len(index)))
+    open = close + r.randn(len(index)) * 0.2
+    df = pd.DataFrame(dict(open=open,
+                           high=np.maximum(open, close) + r.rand(len(index)),
+                           low=np.minimum(open, close) - r.rand(len(index)),
+                           close=close,
+                           volume=r.randint(1, 1000, len(index)).astype(float)),
+                      index=index)
+    df.index.name = 'date'
+    return df
+
+
+def _check_levels(pyramid, df):
+    for timeframe, freq, origin in RESAMPLES:
+        resampler = df.resample(freq, origin=origin)
+        expected = pd.DataFrame(dict(open=resampler.open.first(),
+                                     high=resampler.high.max(),
+                                     low=resampler.low.min(),
+                                     close=resampler.close.last(),
+                                     volume=resampler.volume.sum(),
+                                     first=df.index.to_series().resample(freq, origin=origin).first()))
+        expected = expected.dropna()
+        bars = pyramid.window(timeframe)
+        assert len(bars) == len(expected), timeframe
+        np.testing.assert_allclose(bars.index, to_mpl_dates(expected['first'].values), rtol=0,
+                                   atol=1e-9, err_msg=timeframe)
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            np.testing.assert_allclose(getattr(bars, name), expected[name].values, err_msg=timeframe)
+
+
+def test_levels_match_resample():
+    df = _minute_bars()
+    _check_levels(OHLCVPyramid(df), df)
+
+
+@pytest.mark.parametrize('pieces', [2, 7, 40])
+def test_levels_match_resample_after_appends(pieces):
+    df = _minute_bars()
+    bounds = np.linspace(0, len(df), pieces + 1).astype(int)
+    pyramid = OHLCVPyramid(df.iloc[:bounds[1]])
+    for lo, hi in zip(bounds[1:-1], bounds[2:]):
+        pyramid.append(df.iloc[lo:hi])
+    _check_levels(pyramid, df)
+
+
+def test_append_bar_replaces_the_forming_bar():
+    df = _minute_bars(days=8)
+    pyramid = OHLCVPyramid(df.iloc[:-1])
+    # a new bar, then updates of it while it is forming
+    row = df.iloc[-1]
+    pyramid.append_bar(df.index[-1], row.open, row.high, row.low, row.close, row.volume)
+    df = df.copy()
+    for high, close, volume in [(row.high + 5, row.close + 1, 2000.0), (row.high + 6, row.close - 1, 2500.0)]:
+        pyramid.append_bar(df.index[-1], row.open, high, row.low, close, volume)
+        df.iloc[-1, df.columns.get_indexer(['high', 'close', 'volume'])] = [high, close, volume]
+    _check_levels(pyramid, df)
+    assert len(pyramid.window('1min')) == len(df)
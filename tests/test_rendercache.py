@@ -0,0 +1,85 @@
+"""
+    Hits, misses, keys and eviction of finplots.rendercache.
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from finplots.rendercache import RenderCache
+from finplots.rendercache import render_key
+
+
+def _frame(n=120):
+    close = 100 + np.cumsum(np.random.RandomState(0).randn(n))
+    df = pd.DataFrame(dict(open=close, high=close + 1, low=close - 1, close=close,
+                           volume=np.ones(n)),
+                      index=pd.date_range('2020-01-01', periods=n))
+    df.index.name = 'date'
+    return df
+
+
+def _age(cache, key, seconds):
+    path = cache._path(key, 'png')
+    when = time.time() - seconds
+    os.utime(path, (when, when))
+
+
+def test_miss_then_hit(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    assert cache.get('ab12', 'png') is None
+    cache.put('ab12', b'image', 'png')
+    assert cache.get('ab12', 'png') == b'image'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['nbytes']) == (1, 1, 5)
+
+
+def test_trims_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=250)
+    image = b'x' * 100
+    cache.put('aa01', image)
+    cache.put('bb02', image)
+    _age(cache, 'aa01', 30)
+    _age(cache, 'bb02', 20)
+    # the hit makes aa01 the most recently used
+    assert cache.get('aa01') == image
+    cache.put('cc03', image)
+    assert cache.get('bb02') is None
+    assert cache.get('aa01') == image and cache.get('cc03') == image
+    assert cache.nbytes == 200
+
+
+def test_render_key():
+    df = _frame()
+    key = render_key(df)
+    assert render_key(df.copy()) == key
+    # defaults passed explicitly give the same key
+    assert render_key(df, fmt='png', dpi=100, style='dark') == key
+    assert render_key(df, dpi=200) != key
+    assert render_key(df, style='light') != key
+    assert render_key(df, smas=[20]) != key
+    changed = df.copy()
+    changed.iloc[-1, changed.columns.get_loc('close')] += 1
+    assert render_key(changed) != key
+
+
+def test_render_key_resolves_max_bars():
+    from finplots.render import new_figure
+    df = _frame()
+    fig = new_figure()
+    # 'auto' stands for one bar per pixel column, 1619 on a figure of
+    # 18 inches at 100 dpi, more than the 120 rows of the frame
+    assert render_key(df, fig=fig) == render_key(df) == render_key(df, max_bars=1619)
+    # at 5 dpi the 120 rows are aggregated into 80 bars
+    fig.set_dpi(5)
+    assert render_key(df, fig=fig) != render_key(df)
+    assert render_key(df, fig=fig) == render_key(df, max_bars=80)
+
+
+def test_render_through_cache(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    first = cache.render(_frame())
+    assert first.startswith(b'\x89PNG')
+    assert cache.render(_frame()) == first
+    assert cache.stats()['hits'] == 1
@@ -0,0 +1,136 @@
+"""
+    ChartServer through LocalClient, rendering in a thread pool.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finplots import server as chart_server
+from finplots.rendercache import RenderCache
+from finplots.server import ChartServer
+from finplots.server import LocalClient
+
+
+def _frame(seed, n=120):
+    r = np.random.RandomState(seed)
+    close = 100 + np.cumsum(r.randn(n))
+    df = pd.DataFrame(dict(open=close, high=close + 1, low=close - 1, close=close,
+                           volume=np.ones(n)),
+                      index=pd.date_range('2020-01-01', periods=n))
+    df.index.name = 'date'
+    return df
+
+
+def _serve(test, **kwargs):
+    """ run test(server, client) against a started server """
+    executor = ThreadPoolExecutor(4)
+
+    async def main():
+        async with ChartServer(executor=executor, **kwargs) as server:
+            return await test(server, LocalClient(server))
+    try:
+        return asyncio.run(main())
+    finally:
+        executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """ renders block until the event is set """
+    event = threading.Event()
+
+    def render(df, fmt, dpi, kwargs):
+        event.wait(10)
+        return b'image %d' % len(df)
+    monkeypatch.setattr(chart_server, '_render_image', render)
+    yield event
+    event.set()
+
+
+def test_renders_and_caches(tmp_path):
+    async def test(server, client):
+        first = await client.get(_frame(0))
+        second = await client.get(_frame(0))
+        return first, second, server.stats()
+
+    first, second, stats = _serve(test, workers=1, cache=RenderCache(str(tmp_path)))
+    assert first.status == 200 and first.content_type == 'image/png'
+    assert first.body.startswith(b'\x89PNG')
+    assert second.body == first.body
+    assert stats['renders'] == 1 and stats['cache_hits'] == 1
+
+
+def test_coalesces_identical_requests(gate):
+    async def test(server, client):
+        requests = [asyncio.ensure_future(client.get(_frame(0))) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await asyncio.gather(*requests), server.stats()
+
+    responses, stats = _serve(test, workers=2)
+    assert [response.status for response in responses] == [200] * 3
+    assert stats['renders'] == 1 and stats['coalesced'] == 2 and stats['pending'] == 0
+
+
+def test_overloaded(gate):
+    async def test(server, client):
+        pending = asyncio.ensure_future(client.get(_frame(0)))
+        await asyncio.sleep(0.05)
+        rejected = await client.get(_frame(1))
+        gate.set()
+        return rejected, await pending
+
+    rejected, served = _serve(test, workers=1, max_pending=1)
+    assert rejected.status == 503 and served.status == 200
+
+
+def test_timeout_then_retry(gate):
+    async def test(server, client):
+        # the only worker is busy, the second chart times out in the queue
+        busy = asyncio.ensure_future(client.get(_frame(0)))
+        await asyncio.sleep(0.05)
+        timed_out = await client.get(_frame(1), timeout=0.01)
+        asyncio.get_running_loop().call_later(0.05, gate.set)
+        # retried before the cancelled render task unwound, which must
+        # not be joined
+        retry = await client.get(_frame(1))
+        return timed_out, await busy, retry, server.stats()
+
+    timed_out, busy, retry, stats = _serve(test, workers=1)
+    assert timed_out.status == 504
+    assert busy.status == 200 and retry.status == 200
+    assert stats['timeouts'] == 1 and stats['renders'] == 2
+
+
+def test_client_cancel_propagates(gate):
+    async def test(server, client):
+        request = asyncio.ensure_future(client.get(_frame(0)))
+        await asyncio.sleep(0.05)
+        request.cancel()
+        try:
+            await request
+        except asyncio.CancelledError:
+            return True
+        finally:
+            gate.set()
+        return False
+
+    assert _serve(test, workers=1)
+
+
+def test_close_answers_queued_requests(gate):
+    async def test(server, client):
+        busy = asyncio.ensure_future(client.get(_frame(0)))
+        queued = asyncio.ensure_future(client.get(_frame(1)))
+        await asyncio.sleep(0.05)
+        await server.close()
+        gate.set()
+        await asyncio.gather(busy, return_exceptions=True)
+        return await queued, server.stats()
+
+    queued, stats = _serve(test, workers=1)
+    assert queued.status == 503 and stats['pending'] == 0
@@ -0,0 +1,63 @@
+"""
+    Writing and reading symbols of finplots.store.
+"""
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from finplots.store import OHLCVStore
+from finplots.store import write_symbol
+
+
+def _frame(n, freq='min', start='2015-06-29'):
+    close = np.arange(n, dtype=float)
+    df = pd.DataFrame(dict(open=close, high=close + 1, low=close - 1, close=close, volume=close),
+                      index=pd.date_range(start, periods=n, freq=freq))
+    df.index.name = 'date'
+    return df
+
+
+def test_rewrite_leaves_open_windows_intact(tmp_path):
+    df = _frame(50000)
+    write_symbol(str(tmp_path), 'X', df)
+    window = OHLCVStore(str(tmp_path)).window('X')
+    write_symbol(str(tmp_path), 'X', df.iloc[:10])
+    # the old window still maps the old file
+    assert window.close[-1] == df.close.iloc[-1]
+    assert len(OHLCVStore(str(tmp_path)).window('X')) == 10
+
+
+def test_append(tmp_path):
+    df = _frame(100)
+    write_symbol(str(tmp_path), 'X', df.iloc[:60])
+    assert write_symbol(str(tmp_path), 'X', df.iloc[60:], append=True) == 100
+    np.testing.assert_array_equal(OHLCVStore(str(tmp_path)).window('X').close, df.close.values)
+
+
+def test_symbols_stay_inside_the_store(tmp_path):
+    root = tmp_path / 'store'
+    root.mkdir()
+    df = _frame(10)
+    for symbol in ('BRK/B', '../x', '..', '.hidden', 'INFY', '100%'):
+        write_symbol(str(root), symbol, df)
+    assert sorted(os.listdir(str(tmp_path))) == ['store']
+    store = OHLCVStore(str(root))
+    assert store.symbols() == sorted(['BRK/B', '../x', '..', '.hidden', 'INFY', '100%'])
+    for symbol in store.symbols():
+        assert len(store.window(symbol)) == 10
+
+
+def test_window_end_date_covers_the_day(tmp_path):
+    # minute bars from 29 June to 1 July
+    df = _frame(3 * 1440)
+    write_symbol(str(tmp_path), 'X', df)
+    store = OHLCVStore(str(tmp_path))
+    for end in ('2015-06-30', datetime.date(2015, 6, 30), np.datetime64('2015-06-30')):
+        bars = store.window('X', '2015-06-30', end)
+        assert len(bars) == 1440
+        assert bars.date[-1] == np.datetime64('2015-06-30T23:59')
+    # timestamps are instants
+    assert len(store.window('X', '2015-06-30', '2015-06-30 00:00')) == 1
+    assert len(store.window('X', '2015-06-30', pd.Timestamp('2015-06-30 12:00'))) == 721
@@ -0,0 +1,184 @@
+"""
+    Compiled styles and named themes.
+
+    A Style is a plain object with about a hundred attributes which the
+    plot functions read one by one, every time they draw. compile_style
+    turns it into a read only CompiledStyle with __slots__, which also
+    caches the keyword arguments each _plot_* primitive is called with,
+    so that resolving the styling of a panel is a dict lookup after the
+    first chart. Compiling the same, unchanged Style again returns the
+    same CompiledStyle.
+
+    Themes are compiled styles registered under a name. candlestick_plot
+    and CandlestickChart accept a theme name wherever they take a style:
+
+        register_theme('mine', my_style)
+        candlestick_plot(df, style='mine')
+"""
+import functools
+import threading
+
+from finplots import Style
+from finplots import style as default_style
+
+# every attribute a Style defines
+_ATTRIBUTES = tuple(vars(Style()))
+
+# compiled styles by the values of their attributes
+_compiled = {}
+_compiled_lock = threading.Lock()
+MAX_COMPILED = 64
+
+_themes = {}
+
+
+def _freeze(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class CompiledStyle(object):
+    """ read only snapshot of a Style with cached per panel keyword
+    arguments. Attributes are read like those of a Style. """
+    __slots__ = _ATTRIBUTES + ('name', '_bundles')
+
+    def __init__(self, style, name=None):
+        """
+        :param style: Style to take the attributes from
+        :param name: theme name, if any
+        """
+        for attr in _ATTRIBUTES:
+            object.__setattr__(self, attr, _freeze(getattr(style, attr)))
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, '_bundles', {})
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('compiled styles are read only, change a Style '
+                             'from to_style() and compile it again')
+
+    def __reduce__(self):
+        return CompiledStyle, (self.to_style(), self.name)
+
+    def __repr__(self):
+        return 'CompiledStyle(%r)' % self.name if self.name else 'CompiledStyle()'
+
+    def bundle(self, key, build):
+        """ keyword arguments cached under key, built with build(self)
+        on first use """
+        bundles = self._bundles
+        if key not in bundles:
+            bundles.setdefault(key, build(self))
+        return bundles[key]
+
+    def to_style(self):
+        """ mutable Style with the same attributes """
+        style = Style()
+        for attr in _ATTRIBUTES:
+            value = getattr(self, attr)
+            setattr(style, attr, list(value) if isinstance(value, tuple) else value)
+        return style
+
+
+def compile_style(style):
+    """ compiled form of a style
+    :param style: Style, CompiledStyle or theme name
+    :return: CompiledStyle
+    """
+    if isinstance(style, CompiledStyle):
+        return style
+    if isinstance(style, str):
+        return get_theme(style)
+
+    key = tuple(_freeze(getattr(style, attr)) for attr in _ATTRIBUTES)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        with _compiled_lock:
+            if len(_compiled) >= MAX_COMPILED:
+                _compiled.clear()
+            compiled = _compiled.setdefault(key, CompiledStyle(style))
+    return compiled
+
+
+def cached_kwargs(resolve):
+    """ decorator for the _*_kwargs(style) resolvers of the plot
+    modules, caching their result on compiled styles. Callers unpack
+    the result, so the cached dict is never changed. """
+    key = resolve.__name__
+
+    @functools.wraps(resolve)
+    def wrapper(style):
+        if isinstance(style, CompiledStyle):
+            return style.bundle(key, resolve)
+        return resolve(style)
+    return wrapper
+
+
+def style_panel(ax, ylabel=None,
+                label_color='white',
+                spine_color='blue',
+                tick_color='white',
+                tick_axis='both',
+                grid_color='white',
+                grid_alpha=1):
+    """ apply the common styling of a chart panel in bulk: label, spine,
+    tick and grid colors, and tick labels on the right as well
+    :param ax: axis
+    :param ylabel: y axis label, none when None
+    :param tick_axis: 'x', 'y' or 'both', the axes whose ticks are colored
+    :return: axis
+    """
+    ax.spines[:].set_color(spine_color)
+    ax.tick_params(axis=tick_axis, colors=tick_color)
+    ax.tick_params(labelright=True)
+    ax.grid(True, alpha=grid_alpha, color=grid_color)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel, color=label_color)
+    return ax
+
+
+def register_theme(name, style):
+    """ register a style under a name
+    :param name: theme name
+    :param style: Style or CompiledStyle
+    :return: CompiledStyle of the theme
+    """
+    if isinstance(style, CompiledStyle):
+        style = style.to_style()
+    theme = _themes[name] = CompiledStyle(style, name=name)
+    return theme
+
+
+def get_theme(name):
+    """ :return: CompiledStyle registered under name """
+    try:
+        return _themes[name]
+    except KeyError:
+        raise KeyError('unknown theme %r, registered themes are %s'
+                       % (name, ', '.join(theme_names())))
+
+
+def theme_names():
+    """ :return: sorted names of the registered themes """
+    return sorted(_themes)
+
+
+def _light_style():
+    light = Style(text_color='black',
+                  label_color='black',
+                  spine_color='#8c8c8c',
+                  axis_bg_color='white',
+                  face_color='white',
+                  tick_color='black',
+                  grid_color='grey',
+                  edge_color='black',
+                  fill_color='lightskyblue',
+                  cdl_up_color='forestgreen',
+                  cdl_down_color='crimson')
+    light.rsi_line_color = 'darkorange'
+    light.rsi_signal_line_color = 'black'
+    light.macd_signal_line_color = 'royalblue'
+    light.sstoch_hline_color = 'black'
+    return light
+
+
+register_theme('dark', default_style)
+register_theme('light', _light_style())
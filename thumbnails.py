@@ -0,0 +1,219 @@
+"""
+    Tiny price thumbnails for search results and list views, rasterized
+    with NumPy straight into RGBA arrays and encoded to PNG with zlib.
+    No matplotlib figure, axes or canvas is involved, only the colors of
+    the style are resolved through matplotlib.colors.
+
+    Every thumbnail is reduced to one value per pixel column first: the
+    bars are aggregated to at most one per column and every column is
+    mapped to the bar whose slot it falls in. The pixels are then filled
+    by comparing the row numbers with the per column bounds, which works
+    on a whole batch of thumbnails at once.
+
+        png = render_thumbnail(df)
+        pngs = render_thumbnails(frames, kind='line', volume=False)
+"""
+import struct
+import zlib
+
+import numpy as np
+import matplotlib.colors as mcolors
+
+from finplots import style
+from finplots.candlestick import _prepare_frame
+from finplots.lod import resample_ohlcv
+from finplots.themes import compile_style
+
+# pixels kept free above and below the prices
+PADDING = 2
+
+# fraction of the height taken by the tallest volume bar
+VOLUME_HEIGHT = 0.25
+
+# number of thumbnails rasterized together, which bounds the memory of
+# the intermediate (batch, height, width) masks
+CHUNK = 256
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _rgba(color, alpha=None):
+    return np.array(mcolors.to_rgba(color, alpha)) * 255
+
+
+def _columns(df, width, height, last):
+    """ per pixel column geometry of one thumbnail
+    :return: dict of (width,) arrays: wick and body flags, the rows of
+        high, low, body top, body bottom and close, up flags and volume
+    """
+    frame, _ = _prepare_frame(df)
+    if last:
+        frame = frame[-last:]
+    bars = resample_ohlcv(frame, width)
+    m = len(bars)
+    j = np.arange(width)
+    if m == 0:
+        nothing = np.zeros(width, dtype=bool)
+        return dict(wick=nothing, body=nothing, high=j * 0, low=j * 0 - 1,
+                    top=j * 0, bottom=j * 0 - 1, close=np.zeros(width),
+                    up=nothing, volume=np.zeros(width))
+
+    # the bar whose slot every column falls in, and the slot centres
+    bar = j * m // width
+    slot = width / float(m)
+    centre = ((2 * np.arange(m) + 1) * width) // (2 * m)
+    wick = j == centre[bar]
+    body = np.abs(j + 0.5 - (bar + 0.5) * slot) <= 0.35 * slot if slot >= 3 else np.ones(width, dtype=bool)
+
+    lo, hi = np.nanmin(bars.low), np.nanmax(bars.high)
+    scale = (height - 1 - 2 * PADDING) / (hi - lo if hi > lo else 1.0)
+
+    def rows(prices):
+        return np.rint(PADDING + (hi - np.asarray(prices, dtype=float)) * scale)
+
+    open, close = bars.open[bar], bars.close[bar]
+    volume = bars.volume[bar] if 'volume' in bars else np.zeros(width)
+    return dict(wick=wick,
+                body=body,
+                high=rows(bars.high[bar]),
+                low=rows(bars.low[bar]),
+                top=rows(np.maximum(open, close)),
+                bottom=rows(np.minimum(open, close)),
+                # the close line runs through the slot centres
+                close=np.interp(j, centre, PADDING + (hi - bars.close) * scale),
+                up=close >= open,
+                volume=np.nan_to_num(volume))
+
+
+def _palette(style):
+    """ colors indexed by the codes _rasterize fills in, as uint8 RGBA """
+    background = _rgba(style.axis_bg_color)
+    up_color = _rgba(style.cdl_up_color)
+    down_color = _rgba(style.cdl_down_color)
+    alpha = style.thumbnail_volume_alpha
+    return np.rint([background,
+                    (1 - alpha) * background + alpha * up_color,
+                    (1 - alpha) * background + alpha * down_color,
+                    up_color,
+                    down_color,
+                    _rgba(style.thumbnail_line_color)]).astype(np.uint8)
+
+
+def _rasterize(columns, height, kind, volume, style):
+    """ fill a batch of thumbnails from their stacked column geometry.
+    Every pixel gets the code of its color first, the codes are then
+    looked up in the palette in one go.
+    :param columns: dict of (n, width) arrays, see _columns
+    :return: (n, height, width, 4) uint8 array
+    """
+    n, width = columns['up'].shape
+    rows = np.arange(height)[None, :, None]
+    # 0 background, 1 and 2 up and down volume, 3 and 4 up and down
+    # candles, 5 the close line
+    down = (~columns['up'])[:, None, :].astype(np.uint8)
+    codes = np.zeros((n, height, width), dtype=np.uint8)
+
+    if volume:
+        peak = columns['volume'].max(axis=1, keepdims=True)
+        bars = columns['volume'] / np.where(peak > 0, peak, 1.0) * VOLUME_HEIGHT * (height - 1)
+        top = (height - 1 - np.rint(bars))[:, None, :]
+        mask = (rows >= top) & (columns['volume'] > 0)[:, None, :]
+        np.copyto(codes, 1 + down, where=mask)
+
+    if kind == 'candles':
+        def span(top, bottom):
+            return (rows >= columns[top][:, None, :]) & (rows <= columns[bottom][:, None, :])
+        mask = (columns['wick'][:, None, :] & span('high', 'low')) | \
+               (columns['body'][:, None, :] & span('top', 'bottom'))
+        np.copyto(codes, 3 + down, where=mask)
+    elif kind == 'line':
+        # join every column to the previous one with a vertical run
+        close = columns['close']
+        previous = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+        lo = np.rint(np.minimum(close, previous))[:, None, :]
+        hi = np.rint(np.maximum(close, previous))[:, None, :]
+        codes[(rows >= lo) & (rows <= hi)] = 5
+    else:
+        raise ValueError("kind is 'candles' or 'line', not %r" % kind)
+    return _palette(style)[codes]
+
+
+def thumbnails(frames, width=200, height=80, kind='candles', volume=True, last=None, style=style):
+    """ rasterize a thumbnail per symbol
+
+    :param frames: dict of symbol -> price data, or iterable of
+        (symbol, price data), price data as accepted by candlestick_plot
+    :param width: width in pixels
+    :param height: height in pixels
+    :param kind: 'candles' for OHLC bars, 'line' for a close line
+    :param volume: draw the volume along the bottom
+    :param last: number of most recent bars shown, all when None
+    :param style: Style, CompiledStyle or theme name
+    :return: (symbols, (n, height, width, 4) uint8 RGBA array)
+    """
+    style = compile_style(style)
+    items = list(frames.items()) if hasattr(frames, 'items') else list(frames)
+    symbols = [symbol for symbol, _ in items]
+    images = np.empty((len(items), height, width, 4), dtype=np.uint8)
+    for start in range(0, len(items), CHUNK):
+        chunk = [_columns(df, width, height, last) for _, df in items[start:start + CHUNK]]
+        stacked = dict((name, np.stack([c[name] for c in chunk])) for name in chunk[0])
+        images[start:start + len(chunk)] = _rasterize(stacked, height, kind, volume, style)
+    return symbols, images
+
+
+def thumbnail(df, **kwargs):
+    """ rasterize a single thumbnail, see thumbnails for the arguments
+    :return: (height, width, 4) uint8 RGBA array
+    """
+    return thumbnails([(None, df)], **kwargs)[1][0]
+
+
+def encode_png(rgba, compress_level=6):
+    """ encode an RGBA array as PNG
+    :param rgba: (height, width, 4) uint8 array
+    :param compress_level: zlib level, 1 is fastest
+    :return: PNG bytes
+    """
+    height, width = rgba.shape[:2]
+    pixels = np.ascontiguousarray(rgba, dtype=np.uint8).reshape(height, -1)
+    # every scanline is stored with the Up filter, as its difference to
+    # the line above, which turns the flat areas of a chart into zeros
+    # and compresses faster and smaller than the raw lines
+    raw = np.empty((height, 1 + 4 * width), dtype=np.uint8)
+    raw[:, 0] = 2
+    raw[0, 1:] = pixels[0]
+    np.subtract(pixels[1:], pixels[:-1], out=raw[1:, 1:])
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data +
+                struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    return b''.join([_PNG_SIGNATURE,
+                     chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)),
+                     chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level)),
+                     chunk(b'IEND', b'')])
+
+
+def render_thumbnail(df, fp=None, compress_level=6, **kwargs):
+    """ render a thumbnail to PNG
+    :param fp: writable binary file object, when None the PNG bytes are
+        returned
+    :param kwargs: passed on to thumbnails
+    :return: PNG bytes, or None when written to fp
+    """
+    png = encode_png(thumbnail(df, **kwargs), compress_level=compress_level)
+    if fp is None:
+        return png
+    fp.write(png)
+    return None
+
+
+def render_thumbnails(frames, compress_level=6, **kwargs):
+    """ render a thumbnail per symbol to PNG
+    :param kwargs: passed on to thumbnails
+    :return: dict of symbol -> PNG bytes
+    """
+    symbols, images = thumbnails(frames, **kwargs)
+    return dict((symbol, encode_png(image, compress_level=compress_level))
+                for symbol, image in zip(symbols, images))